@@ -1,23 +1,439 @@
 from __future__ import annotations
 
+import functools
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import date
 
-from fastapi import FastAPI, HTTPException
-
-from core.decklist import fetch_decklist
-from core.analysis import analyze_decklists
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from starlette.middleware.gzip import GZipMiddleware
+
+from core.analysis import analyze_decklists, placement_weight
+from core.approx import (
+    DEFAULT_TARGET_ERROR,
+    REFINER,
+    proportion_interval,
+    sample_size,
+    stratified_sample,
+)
+from core.archetype import classify_rows, relabel_rows
+from core.card_index import CARD_INDEX, METRICS, index_shared_store, index_snapshot, parse_decklist_text
+from core.deadline import DeadlineExceeded, deadline_scope, partial_stages
 from core.pokeapi import build_candidates, resolve_pokemon_name_from_candidates
-from core.limitless_jp import find_pokemon_in_limitless_since, list_winner_decks_since
+from core.limitless_jp import DEFAULT_SOURCE, known_listing_version, listing_version
+from core.row_index import (
+    ALL_SOURCES,
+    cached_decklists,
+    crawl_for_decklists,
+    crawl_sources,
+    fetch_decklists,
+    find_pokemon_in_sources,
+    resolve_sources,
+)
+from core.trend import BUCKETS, CardTrend
+from core.name_index import NameIndex, build_name_index
+from core.stream import iter_deck_analysis
+from core.jobs import DEFAULT_JOBS_DB, JobQueue, WorkerPool
+from core.shared_store import get_shared_store
+from core.snapshot import DEFAULT_SNAPSHOT_PATH, load_snapshot
+from core.standings import get_standings_store, standings_decklists
+
+try:
+    import orjson
+except ImportError:  # opcional
+    orjson = None
 
 DEFAULT_MIN_DATE = date(2026, 1, 23)
 
-app = FastAPI(title="PokemonAnalisys API", version="1.0.0")
+API_VERSION = "1.0.0"
+
+# Cache HTTP das respostas /v1/*
+CACHE_CONTROL = "public, max-age=60, must-revalidate"
+RESPONSE_CACHE_SIZE = 256
+GZIP_MIN_SIZE = 1024
+
+# prazo padrão dos endpoints /v1/deck/* (0 = sem prazo); ?deadline_ms= sobrescreve
+DEFAULT_DEADLINE_MS = int(os.environ.get("POKEMON_DEADLINE_MS", "15000"))
+PARTIAL_HEADER = "X-Partial-Result"  # resposta parcial (prazo): fora do cache de ETag
+APPROX_HEADER = "X-Approximate-Result"  # approx=true sobre amostra: idem (a exata vem depois)
+ERRORS_HEADER = "X-Decklist-Errors"  # decklists que falharam: idem (a próxima tentativa pode baixar)
+
+MAX_PLACEMENTS = 32  # ?top= / jobs "standings": colocações por torneio
+
+
+if orjson is not None:
+    class FastJSONResponse(JSONResponse):
+        """Serializa com orjson quando instalado (aceita numpy e chaves não-str, como a matriz de cartas)."""
+
+        def render(self, content) -> bytes:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+else:
+    FastJSONResponse = JSONResponse
+
+
+JOBS = JobQueue(os.environ.get("POKEMON_JOBS_DB", DEFAULT_JOBS_DB))
+
+
+CARD_SYNC_S = 30.0  # intervalo mínimo entre leituras das decks do cache compartilhado
+
+# de onde vieram as decks do índice de cartas (além das baixadas por este processo)
+_card_seeds = {"snapshot": 0, "shared_store": 0, "shared_synced_at": 0.0, "shared_fetched_at": 0.0}
+_card_seeds_lock = threading.Lock()
+
+
+def _seed_card_index() -> None:
+    # sem snapshot nem POKEMON_SHARED_DB, o índice se forma só com as decks baixadas pelos endpoints
+    snap = load_snapshot(os.environ.get("POKEMON_SNAPSHOT", DEFAULT_SNAPSHOT_PATH))
+    if snap is not None:
+        added = index_snapshot(snap)
+        with _card_seeds_lock:
+            _card_seeds["snapshot"] += added
+    _sync_card_index()
+
+
+def _sync_card_index() -> None:
+    """Decks gravadas no cache compartilhado por outros processos (workers, jobs) entram no índice."""
+    store = get_shared_store()
+    if store is None:
+        return
+    with _card_seeds_lock:
+        if time.monotonic() - _card_seeds["shared_synced_at"] < CARD_SYNC_S:
+            return
+        _card_seeds["shared_synced_at"] = time.monotonic()
+        added, newest = index_shared_store(store, _card_seeds["shared_fetched_at"])
+        _card_seeds["shared_store"] += added
+        _card_seeds["shared_fetched_at"] = newest
+
+
+def _card_population(since: date, source: str) -> dict:
+    with _card_seeds_lock:
+        seeded = {"snapshot": _card_seeds["snapshot"], "shared_store": _card_seeds["shared_store"]}
+    return {
+        **CARD_INDEX.population(since=since, source=None if source == ALL_SOURCES else source),
+        "seeded_from": seeded,
+    }
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # workers da fila de jobs (POKEMON_JOB_WORKERS=0 desliga); com uvicorn
+    # --workers N, só o worker que pegar o lock do banco sobe o pool
+    pool = WorkerPool(JOBS.db_path)
+    if pool.workers > 0:
+        pool.start()
+    # índice de cartas começa com o snapshot, se houver (em segundo plano)
+    threading.Thread(target=_seed_card_index, daemon=True).start()
+    try:
+        yield
+    finally:
+        pool.stop()
+
+
+app = FastAPI(
+    title="PokemonAnalisys API",
+    version=API_VERSION,
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
+)
+
+# etag -> (media_type, corpo já serializado)
+_response_cache: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+
+
+def _make_etag(request: Request, data_version: str) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    raw = f"{API_VERSION}|{data_version}|{request.url.path}?{query}"
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [t.strip() for t in if_none_match.split(",")]
+
+
+@app.middleware("http")
+async def http_cache(request: Request, call_next):
+    """
+    ETag forte = hash(versão da API + versão dos dados + rota + query).
+    A versão dos dados só muda quando entra torneio novo no Limitless, então:
+      - If-None-Match igual -> 304 sem recalcular nada;
+      - mesma ETag já servida -> devolve o corpo serializado guardado.
+    A versão vem da memória (known_listing_version): a revalidação da página 1
+    roda em segundo plano, fora do caminho da requisição. Sem versão conhecida
+    (processo recém-iniciado), a resposta sai sem ETag.
+    """
+    if (
+        request.method != "GET"
+        or not request.url.path.startswith("/v1/")
+        or request.url.path.endswith("/stream")
+        or request.url.path.startswith("/v1/jobs")
+        or request.url.path.startswith("/v1/cards")  # índice cresce sem mudar a listagem
+        or request.query_params.get("top", "1") not in ("", "1")  # idem, banco de standings
+    ):
+        return await call_next(request)
+
+    try:
+        sources = resolve_sources(request.query_params.get("source", DEFAULT_SOURCE))
+    except Exception:
+        return await call_next(request)
+    data_version = known_listing_version(sources)
+    if data_version is None:
+        # sem versão confiável -> sem cache
+        return await call_next(request)
+
+    etag = _make_etag(request, data_version)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    cached = _response_cache.get(etag)
+    if cached is not None:
+        _response_cache.move_to_end(etag)
+        media_type, body = cached
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code != 200 or any(
+        h in response.headers for h in (PARTIAL_HEADER, APPROX_HEADER, ERRORS_HEADER)
+    ):
+        return response
+    if known_listing_version(sources) != data_version:
+        # a listagem mudou durante a requisição: o corpo pode não bater com a ETag
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    media_type = response.media_type or response.headers.get("content-type", "application/json")
+
+    _response_cache[etag] = (media_type, body)
+    while len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+# adicionado depois -> fica por fora: comprime também as respostas do cache
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
+
+# (fontes, versão dos dados) -> índice de nomes
+_name_index_cache: dict[tuple, NameIndex] = {}
+
+
+def _get_name_index(sources: list[str]) -> NameIndex:
+    key = (tuple(sources), listing_version(sources))
+    index = _name_index_cache.get(key)
+    if index is None:
+        rows = crawl_sources(DEFAULT_MIN_DATE, sources).all()
+        index = build_name_index(r.alts for r in rows)
+        _name_index_cache.clear()
+        _name_index_cache[key] = index
+    return index
+
+
+def _resamples(ci: bool, resamples: int) -> int:
+    # modo estatístico (bootstrap) é opcional; limita o custo por requisição
+    return max(100, min(resamples, 20000)) if ci else 0
+
+
+def _ci_fields(iv) -> dict:
+    return {
+        "presence_ci": [round(iv.presence_lo, 1), round(iv.presence_hi, 1)],
+        "qty_ci": [round(iv.qty_lo, 2), round(iv.qty_hi, 2)] if iv.qty_lo is not None else None,
+        "core_prob": round(iv.core_prob, 3),
+    }
+
+
+def _approx_sample(rows: list, target_error: float) -> tuple[list, dict]:
+    """
+    approx=true: se faltar alguma decklist no cache, devolve uma amostra
+    estratificada por mês (tamanho por sample_size(target_error)).
+    Com tudo em cache (ou amostra = população), devolve as próprias linhas.
+    """
+    target_error = max(0.005, min(target_error, 0.5))
+    urls = {r.decklist_url for r in rows if r.decklist_url}
+    n = sample_size(target_error, len(rows))
+    if n >= len(rows) or not (urls - cached_decklists(urls)):
+        return rows, {"approx": False}
+    return stratified_sample(rows, n), {
+        "approx": True,
+        "target_error": target_error,
+        "sample_size": n,
+        "population": len(rows),
+    }
+
+
+_REFINE_IGNORED = ("approx", "target_error", "deadline_ms")
+
+
+def _data_version(params: dict) -> str | None:
+    try:
+        return known_listing_version(resolve_sources(params.get("source", DEFAULT_SOURCE)))
+    except ValueError:
+        return None
+
+
+def _exact_result(fn, params: dict):
+    """Refino: fn com approx=false, sem prazo. (versão dos dados, resultado) ou None."""
+    version = _data_version(params)
+    try:
+        result = fn(**{**params, "approx": False})
+    except HTTPException:
+        return None
+    if not isinstance(result, dict) or result.get("partial") or result.get("errors_count"):
+        return None
+    if version is None or _data_version(params) != version:
+        return None  # listagem mudou no meio: não dá para dizer de qual versão é
+    result["approx"] = False
+    return version, result
+
+
+def _refined(fn):
+    """
+    approx=true: a resposta aproximada dispara em segundo plano a mesma chamada
+    com approx=false e guarda o resultado exato no REFINER, sob a chave da
+    requisição; a próxima requisição igual (mesma versão dos dados) sai com
+    ele, mesmo que as decklists já tenham saído do cache em memória.
+    """
+    @functools.wraps(fn)
+    def wrapper(**params):
+        if not params.get("approx"):
+            return fn(**params)
+        key = (fn.__name__,) + tuple(sorted((k, v) for k, v in params.items() if k not in _REFINE_IGNORED))
+        refined = REFINER.result(key)
+        if refined is not None and refined[0] == _data_version(params):
+            return dict(refined[1])
+        result = fn(**params)
+        if isinstance(result, dict) and result.get("approx"):
+            REFINER.start(key, _exact_result, fn, params)
+            result["exact_pending"] = REFINER.running(key)
+        return result
+
+    return wrapper
+
+
+def _presence_bounds(present: int, n: int, population: int) -> list[float]:
+    _, lo, hi = proportion_interval(present, n, population)
+    return [round(lo * 100, 1), round(hi * 100, 1)]
+
+
+def _approx_response(result: dict):
+    """Resposta sobre amostra: sai com APPROX_HEADER e fora do cache."""
+    return FastJSONResponse(
+        result,
+        headers={APPROX_HEADER: f"{result['sample_size']}/{result['population']}", "Cache-Control": "no-store"},
+    )
+
+
+def _with_deadline(fn):
+    """
+    Roda o endpoint dentro de um deadline_scope (resolve, varredura e downloads
+    respeitam o mesmo prazo). Se o prazo acabar antes de haver listas, 504;
+    resultado parcial (listas puladas ou listagem cortada no meio) sai com
+    PARTIAL_HEADER e, se alguma decklist falhou, com ERRORS_HEADER; nenhum dos
+    dois entra no cache.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        ms = kwargs.get("deadline_ms")
+        ms = DEFAULT_DEADLINE_MS if ms is None else ms
+        with deadline_scope(ms / 1000 if ms > 0 else None):
+            try:
+                result = fn(*args, **kwargs)
+            except DeadlineExceeded as e:
+                raise HTTPException(
+                    status_code=504,
+                    detail={"error": "Prazo esgotado.", "stage": str(e), "deadline_ms": ms},
+                )
+            except HTTPException as e:
+                # 404 sobre uma listagem cortada pelo prazo não prova que não há nada
+                if e.status_code == 404 and partial_stages():
+                    raise HTTPException(
+                        status_code=504,
+                        detail={"error": "Prazo esgotado.", "stage": partial_stages()[0], "deadline_ms": ms},
+                    )
+                raise
+            stages = partial_stages()
+        if isinstance(result, dict) and stages:
+            result["partial"] = True
+            result["partial_stages"] = stages
+        if not isinstance(result, dict):
+            return result
+        headers = {}
+        if result.get("partial"):
+            headers[PARTIAL_HEADER] = str(result.get("skipped_lists", 0))
+        if result.get("errors_count"):
+            headers[ERRORS_HEADER] = str(result["errors_count"])
+        if headers:
+            headers["Cache-Control"] = "no-store"
+            return FastJSONResponse(result, headers=headers)
+        if result.get("approx"):
+            return _approx_response(result)
+        return result
+
+    return wrapper
+
+
+def _no_decklists(errors: list[dict]) -> HTTPException:
+    if any(e.get("skipped") for e in errors):
+        return HTTPException(
+            status_code=504,
+            detail={"error": "Prazo esgotado antes de baixar qualquer decklist.", "errors": errors[:5]},
+        )
+    return HTTPException(
+        status_code=502,
+        detail={"error": "Nenhuma decklist pôde ser baixada/parseada.", "errors": errors[:5]},
+    )
+
+
+def _partial_fields(errors: list[dict]) -> dict:
+    skipped = sum(1 for e in errors if e.get("skipped"))
+    return {"partial": skipped > 0, "skipped_lists": skipped}
+
+
+def _check_source(source: str) -> list[str]:
+    try:
+        return resolve_sources(source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/v1/pokemon/suggest")
+def suggest_pokemon(q: str, limit: int = 10, source: str = DEFAULT_SOURCE):
+    if not q or not q.strip():
+        raise HTTPException(status_code=400, detail="Parâmetro 'q' é obrigatório.")
+    sources = _check_source(source)
+
+    limit = max(1, min(limit, 50))
+    suggestions = _get_name_index(sources).suggest(q, limit=limit)
+
+    return {
+        "q": q,
+        "source": source,
+        "count": len(suggestions),
+        "suggestions": [
+            {"name": s.name, "distance": s.distance, "wins": s.wins}
+            for s in suggestions
+        ],
+    }
 
 
 @app.get("/v1/limitless/count")
-def count_in_limitless(pokemon: str):
+def count_in_limitless(pokemon: str, source: str = DEFAULT_SOURCE):
     if not pokemon or not pokemon.strip():
         raise HTTPException(status_code=400, detail="Parâmetro 'pokemon' é obrigatório.")
+    _check_source(source)
 
     min_date = DEFAULT_MIN_DATE
 
@@ -32,19 +448,69 @@ def count_in_limitless(pokemon: str):
         )
 
     # 2) Busca no Limitless
-    matches = find_pokemon_in_limitless_since(found, min_date)
+    matches = find_pokemon_in_sources(found, min_date, source)
 
     return {
         "pokemon_input": pokemon,
         "pokemon_found": found,
+        "source": source,
         "min_date": str(min_date),
         "count": len(matches),
     }
 
+def _placement_decklists(found: str, min_date: date, source: str, top: int) -> tuple[list, list, list]:
+    """
+    Colocações top-N do Pokémon no banco de standings (job "standings") e suas
+    decks: (colocações, [(colocação, deck)], erros). Decks que a varredura
+    ainda não gravou são baixadas aqui.
+    """
+    store = get_standings_store()
+    placements = store.find(found, min_date, None if source == ALL_SOURCES else source, top_n=top)
+    if not placements:
+        raise HTTPException(
+            status_code=404,
+            detail=(
+                f"Nenhuma colocação de '{found}' no top {top} desde {min_date} no banco de standings. "
+                "Rode um job 'standings' (POST /v1/jobs) antes."
+            ),
+        )
+    fetched, missing = standings_decklists(store, placements)
+    errors: list[dict] = []
+    if missing:
+        more, errors = fetch_decklists(missing)
+        fetched += more
+    return placements, fetched, errors
+
+
 @app.get("/v1/deck/core")
-def deck_core(pokemon: str):
+@_with_deadline
+@_refined
+def deck_core(
+    pokemon: str,
+    source: str = DEFAULT_SOURCE,
+    ci: bool = False,
+    resamples: int = 2000,
+    top: int = 1,
+    weighted: bool = False,
+    approx: bool = False,
+    target_error: float = DEFAULT_TARGET_ERROR,
+    classify: bool = False,
+    deadline_ms: int | None = None,
+):
+    """
+    top=1: só as listas vencedoras (listagem). top>1: top-N de cada torneio,
+    do banco de standings. weighted=true pondera cada lista pela colocação
+    (placement_weight). approx=true (top=1) analisa uma amostra com erro
+    <= target_error na presença e completa o cache em segundo plano.
+    classify=true (top=1): as listas do Pokémon são as que o classificador
+    por conteúdo rotula como seu arquétipo, não as que têm o sprite
+    (baixa as decklists de todo o meta, como o top10 com classify).
+    """
     if not pokemon or not pokemon.strip():
         raise HTTPException(status_code=400, detail="Parâmetro 'pokemon' é obrigatório.")
+    _check_source(source)
+    if classify and top > 1:
+        raise HTTPException(status_code=400, detail="classify=true só vale com top=1.")
 
     min_date = DEFAULT_MIN_DATE  # travado
 
@@ -58,45 +524,54 @@ def deck_core(pokemon: str):
             detail={"error": "Pokémon não encontrado na PokéAPI", "candidates": candidates},
         )
 
-    # 2) Busca no Limitless
-    matches = find_pokemon_in_limitless_since(found, min_date)
-    if not matches:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Não foram encontradas listas vencedoras de '{found}' desde {min_date}.",
-        )
-
-    # 3) Baixa decklists e analisa
-    decklists = []
-    errors = []
-
-    for m in matches:
-        if not m.decklist_url:
-            errors.append({"date": str(m.row_date), "error": "decklist_url ausente"})
-            continue
-        try:
-            deck = fetch_decklist(m.decklist_url)
-            decklists.append(deck)
-        except Exception as e:
-            errors.append({"date": str(m.row_date), "decklist_url": m.decklist_url, "error": str(e)})
+    top = max(1, min(top, MAX_PLACEMENTS))
+
+    # 2) Busca no Limitless (ou no banco de standings) e baixa as decklists
+    classified = {}
+    if classify:
+        matches, fetched, errors, classified = _classified_decklists(found, min_date, source)
+        approx_info = {"approx": False} if approx else {}
+    elif top == 1:
+        matches = find_pokemon_in_sources(found, min_date, source)
+        if not matches:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Não foram encontradas listas vencedoras de '{found}' desde {min_date}.",
+            )
+        sample, approx_info = matches, {}
+        if approx:
+            sample, approx_info = _approx_sample(matches, target_error)
+        fetched, errors = fetch_decklists(sample)
+    else:
+        matches, fetched, errors = _placement_decklists(found, min_date, source, top)
+        approx_info = {"approx": False} if approx else {}
+
+    decklists = [deck for _, deck in fetched]
 
     if not decklists:
-        raise HTTPException(
-            status_code=502,
-            detail={"error": "Nenhuma decklist pôde ser baixada/parseada.", "errors": errors[:5]},
-        )
+        raise _no_decklists(errors)
 
-    result = analyze_decklists(decklists)
+    # 3) Analisa
+    weights = [placement_weight(getattr(r, "placing", 1)) for r, _ in fetched] if weighted else None
+    result = analyze_decklists(decklists, bootstrap=_resamples(ci, resamples), weights=weights)
 
     core_list = []
     for name, qty in sorted(result.core.items(), key=lambda x: x[0].lower()):
         cat = next((s.category for s in result.all_stats if s.name == name), "Trainer")
-        core_list.append({"name": name, "qty": qty, "category": cat})
+        item = {"name": name, "qty": qty, "category": cat}
+        if name in result.intervals:
+            item.update(_ci_fields(result.intervals[name]))
+        if approx_info.get("approx"):
+            item["presence_bounds"] = _presence_bounds(result.n_lists, result.n_lists, len(matches))
+        core_list.append(item)
 
     return {
         "pokemon_input": pokemon,
         "pokemon_found": found,
+        "source": source,
         "min_date_fixed": str(min_date),
+        "top": top,
+        "weighted": weighted,
         "matches_found": len(matches),
         "decklists_parsed": len(decklists),
         "ace_spec": result.ace_spec,
@@ -104,12 +579,97 @@ def deck_core(pokemon: str):
         "core_total_cards": result.core_count_cards,
         "core": core_list,
         "errors_count": len(errors),
+        **classified,
+        **_partial_fields(errors),
+        **approx_info,
+    }
+
+
+def _classified_decklists(found: str, min_date: date, source: str) -> tuple[list, list, list, dict]:
+    """
+    Linhas do arquétipo `found` pelo conteúdo da decklist (relabel_rows sobre
+    todo o meta): (linhas, [(linha, deck)], erros, campos da resposta).
+    """
+    rows = crawl_for_decklists(min_date, source).all()
+    all_fetched, errors = fetch_decklists(rows)
+    decks = {id(r): d for r, d in all_fetched}
+    labeled = [lr for lr in relabel_rows([(r, decks.get(id(r))) for r in rows]) if lr.label == found]
+    if not labeled:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Nenhuma lista classificada como '{found}' desde {min_date}.",
+        )
+    sprite_rows = sum(1 for r in rows if found in (a.strip().lower() for a in r.alts))
+    fields = {
+        "classified": True,
+        "sprite_matches": sprite_rows,
+        "relabeled_rows": sum(1 for lr in labeled if lr.label != lr.sprite_label),
     }
+    fetched = [(lr.row, lr.deck) for lr in labeled if lr.deck is not None]
+    return [lr.row for lr in labeled], fetched, errors, fields
+
+
+def _sse(event: dict) -> bytes:
+    data = orjson.dumps(event) if orjson is not None else json.dumps(event, ensure_ascii=False).encode("utf-8")
+    return b"event: " + event["event"].encode("ascii") + b"\ndata: " + data + b"\n\n"
+
+
+@app.get("/v1/deck/core/stream")
+def deck_core_stream(pokemon: str, source: str = DEFAULT_SOURCE):
+    """
+    Versão em streaming (Server-Sent Events) de /v1/deck/core: progresso da
+    varredura, cada decklist assim que é parseada, análises parciais e o
+    resultado final (eventos descritos em core.stream.iter_deck_analysis).
+    """
+    if not pokemon or not pokemon.strip():
+        raise HTTPException(status_code=400, detail="Parâmetro 'pokemon' é obrigatório.")
+    _check_source(source)
+
+    min_date = DEFAULT_MIN_DATE
+
+    # 1) Resolve/valida na PokéAPI (antes de abrir o stream, para poder dar 404)
+    candidates = build_candidates(pokemon)
+    found = resolve_pokemon_name_from_candidates(candidates)
+
+    if not found:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": "Pokémon não encontrado na PokéAPI", "candidates": candidates},
+        )
+
+    def body():
+        yield _sse({
+            "event": "resolved",
+            "pokemon_input": pokemon,
+            "pokemon_found": found,
+            "source": source,
+            "min_date_fixed": str(min_date),
+        })
+        for ev in iter_deck_analysis(found, min_date, source):
+            yield _sse(ev)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @app.get("/v1/deck/above50")
-def cards_above_50_not_core(pokemon: str):
+@_with_deadline
+@_refined
+def cards_above_50_not_core(
+    pokemon: str,
+    source: str = DEFAULT_SOURCE,
+    ci: bool = False,
+    resamples: int = 2000,
+    approx: bool = False,
+    target_error: float = DEFAULT_TARGET_ERROR,
+    deadline_ms: int | None = None,
+):
     if not pokemon or not pokemon.strip():
         raise HTTPException(status_code=400, detail="Parâmetro 'pokemon' é obrigatório.")
+    _check_source(source)
 
     min_date = DEFAULT_MIN_DATE
 
@@ -124,34 +684,25 @@ def cards_above_50_not_core(pokemon: str):
         )
 
     # 2) Busca no Limitless
-    matches = find_pokemon_in_limitless_since(found, min_date)
+    matches = find_pokemon_in_sources(found, min_date, source)
     if not matches:
         raise HTTPException(
             status_code=404,
             detail=f"Não foram encontradas listas vencedoras de '{found}' desde {min_date}.",
         )
 
-    # 3) Baixa decklists
-    decklists = []
-    errors = []
-
-    for m in matches:
-        if not m.decklist_url:
-            errors.append({"date": str(m.row_date), "error": "decklist_url ausente"})
-            continue
-        try:
-            decklists.append(fetch_decklist(m.decklist_url))
-        except Exception as e:
-            errors.append({"date": str(m.row_date), "decklist_url": m.decklist_url, "error": str(e)})
+    # 3) Baixa decklists (approx=true: só uma amostra, o resto em segundo plano)
+    sample, approx_info = matches, {}
+    if approx:
+        sample, approx_info = _approx_sample(matches, target_error)
+    fetched, errors = fetch_decklists(sample)
+    decklists = [deck for _, deck in fetched]
 
     if not decklists:
-        raise HTTPException(
-            status_code=502,
-            detail={"error": "Nenhuma decklist pôde ser baixada/parseada.", "errors": errors[:5]},
-        )
+        raise _no_decklists(errors)
 
     # 4) Analisa
-    result = analyze_decklists(decklists)
+    result = analyze_decklists(decklists, bootstrap=_resamples(ci, resamples))
 
     core_names = set(result.core.keys())
 
@@ -161,14 +712,19 @@ def cards_above_50_not_core(pokemon: str):
         if s.name in core_names:
             continue
         if s.presence_pct > 50.0:
-            filtered.append({
+            item = {
                 "name": s.name,
                 "category": s.category,
                 "present_in": s.present_in,
                 "n_lists": result.n_lists,
                 "presence_pct": int(round(s.presence_pct)),
                 "avg_qty": s.avg_qty_round,
-            })
+            }
+            if s.name in result.intervals:
+                item.update(_ci_fields(result.intervals[s.name]))
+            if approx_info.get("approx"):
+                item["presence_bounds"] = _presence_bounds(s.present_in, result.n_lists, len(matches))
+            filtered.append(item)
 
     # ordena por % desc, depois nome
     filtered.sort(key=lambda x: (-x["presence_pct"], x["name"].lower()))
@@ -176,6 +732,7 @@ def cards_above_50_not_core(pokemon: str):
     return {
         "pokemon_input": pokemon,
         "pokemon_found": found,
+        "source": source,
         "min_date_fixed": str(min_date),
         "matches_found": len(matches),
         "decklists_parsed": len(decklists),
@@ -183,13 +740,17 @@ def cards_above_50_not_core(pokemon: str):
         "count": len(filtered),
         "cards": filtered,
         "errors_count": len(errors),
+        **_partial_fields(errors),
+        **approx_info,
     }
 
 
 @app.get("/v1/deck/base")
-def build_base_deck(pokemon: str):
+@_with_deadline
+def build_base_deck(pokemon: str, source: str = DEFAULT_SOURCE, deadline_ms: int | None = None):
     if not pokemon or not pokemon.strip():
         raise HTTPException(status_code=400, detail="Parâmetro 'pokemon' é obrigatório.")
+    _check_source(source)
 
     min_date = DEFAULT_MIN_DATE
 
@@ -204,7 +765,7 @@ def build_base_deck(pokemon: str):
         )
 
     # 2) Busca no Limitless
-    matches = find_pokemon_in_limitless_since(found, min_date)
+    matches = find_pokemon_in_sources(found, min_date, source)
     if not matches:
         raise HTTPException(
             status_code=404,
@@ -212,22 +773,11 @@ def build_base_deck(pokemon: str):
         )
 
     # 3) Baixa decklists
-    decklists = []
-    errors = []
-    for m in matches:
-        if not m.decklist_url:
-            errors.append({"date": str(m.row_date), "error": "decklist_url ausente"})
-            continue
-        try:
-            decklists.append(fetch_decklist(m.decklist_url))
-        except Exception as e:
-            errors.append({"date": str(m.row_date), "decklist_url": m.decklist_url, "error": str(e)})
+    fetched, errors = fetch_decklists(matches)
+    decklists = [deck for _, deck in fetched]
 
     if not decklists:
-        raise HTTPException(
-            status_code=502,
-            detail={"error": "Nenhuma decklist pôde ser baixada/parseada.", "errors": errors[:5]},
-        )
+        raise _no_decklists(errors)
 
     # 4) Analisa
     result = analyze_decklists(decklists)
@@ -306,6 +856,7 @@ def build_base_deck(pokemon: str):
     return {
         "pokemon_input": pokemon,
         "pokemon_found": found,
+        "source": source,
         "min_date_fixed": str(min_date),
         "matches_found": len(matches),
         "decklists_parsed": len(decklists),
@@ -316,13 +867,88 @@ def build_base_deck(pokemon: str):
         "total_cards": total_cards,
         "deck_base": base_deck,  # lista por categoria com qty e % presença
         "errors_count": len(errors),
+        **_partial_fields(errors),
+    }
+
+@app.get("/v1/deck/trend")
+@_with_deadline
+def deck_trend(pokemon: str, bucket: str = "week", source: str = DEFAULT_SOURCE, deadline_ms: int | None = None):
+    if not pokemon or not pokemon.strip():
+        raise HTTPException(status_code=400, detail="Parâmetro 'pokemon' é obrigatório.")
+    _check_source(source)
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Parâmetro 'bucket' deve ser um de {list(BUCKETS)}.")
+
+    min_date = DEFAULT_MIN_DATE
+
+    # 1) Resolve/valida na PokéAPI
+    candidates = build_candidates(pokemon)
+    found = resolve_pokemon_name_from_candidates(candidates)
+
+    if not found:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": "Pokémon não encontrado na PokéAPI", "candidates": candidates},
+        )
+
+    # 2) Busca no Limitless
+    matches = find_pokemon_in_sources(found, min_date, source)
+    if not matches:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Não foram encontradas listas vencedoras de '{found}' desde {min_date}.",
+        )
+
+    # 3) Baixa decklists (com a data de cada uma)
+    fetched, errors = fetch_decklists(matches)
+    dated_decks = [(m.row_date, deck) for m, deck in fetched]
+
+    if not dated_decks:
+        raise _no_decklists(errors)
+
+    # 4) Séries por carta (prefix sums sobre as decks ordenadas por data)
+    series = CardTrend(dated_decks).series(bucket)
+
+    return {
+        "pokemon_input": pokemon,
+        "pokemon_found": found,
+        "source": source,
+        "min_date_fixed": str(min_date),
+        "bucket": bucket,
+        "matches_found": len(matches),
+        "decklists_parsed": len(dated_decks),
+        "buckets": series["buckets"],
+        "cards": series["cards"],
+        "errors_count": len(errors),
+        **_partial_fields(errors),
     }
 
 @app.get("/v1/limitless/top10")
-def top10_winner_decks():
+def top10_winner_decks(
+    source: str = DEFAULT_SOURCE,
+    classify: bool = False,
+    approx: bool = False,
+    target_error: float = DEFAULT_TARGET_ERROR,
+):
+    """
+    approx=true (com classify=true, o caso que baixa todas as decklists):
+    classifica uma amostra estratificada por mês e estima vitórias por
+    arquétipo com limites de erro; o resultado exato é calculado em segundo
+    plano. Sem classify as contagens já são exatas (só a listagem).
+    """
+    out = _top10(source=source, classify=classify, approx=approx, target_error=target_error)
+    if out.get("approx"):
+        return _approx_response(out)
+    return out
+
+
+@_refined
+def _top10(source: str, classify: bool, approx: bool, target_error: float) -> dict:
+    sources = _check_source(source)
+
     min_date = DEFAULT_MIN_DATE
 
-    rows = list_winner_decks_since(min_date=min_date)
+    rows = crawl_sources(min_date, sources).all()
 
     if not rows:
         raise HTTPException(
@@ -330,16 +956,32 @@ def top10_winner_decks():
             detail=f"Nenhum torneio encontrado desde {min_date}.",
         )
 
+    # classify=true: arquétipo pelo conteúdo da decklist (baixa todas as listas)
+    labels = {}
+    relabeled = 0
+    counted, approx_info = rows, {}
+    if classify:
+        if approx:
+            counted, approx_info = _approx_sample(rows, target_error)
+        for lr in classify_rows(counted):
+            labels[id(lr.row)] = lr.label
+            if lr.label != lr.sprite_label:
+                relabeled += 1
+    elif approx:
+        approx_info = {"approx": False}
+
     counts = {}
     examples = {}
 
-    for r in rows:
+    for r in counted:
 
-        if not r.alts:
+        if classify:
+            main = labels[id(r)]
+        elif not r.alts:
             continue
-
-        # usa apenas o primeiro alt (pokémon principal)
-        main = r.alts[0].strip().lower()
+        else:
+            # usa apenas o primeiro alt (pokémon principal)
+            main = r.alts[0].strip().lower()
 
         counts[main] = counts.get(main, 0) + 1
 
@@ -364,20 +1006,191 @@ def top10_winner_decks():
 
         ex = examples[pokemon]
 
-        top10.append(
-            {
-                "rank": i,
-                "main_pokemon": pokemon,
-                "wins_count": cnt,
-                "example_date": ex["example_date"],
-                "example_tournament_url": ex["example_tournament_url"],
-                "example_decklist_url": ex["example_decklist_url"],
-            }
-        )
-
-    return {
+        item = {
+            "rank": i,
+            "main_pokemon": pokemon,
+            "wins_count": cnt,
+            "example_date": ex["example_date"],
+            "example_tournament_url": ex["example_tournament_url"],
+            "example_decklist_url": ex["example_decklist_url"],
+        }
+        if approx_info.get("approx"):
+            # fatia na amostra -> vitórias estimadas na população
+            n, total = len(counted), len(rows)
+            share, lo, hi = proportion_interval(cnt, n, total)
+            item["wins_count"] = int(round(share * total))
+            item["wins_count_bounds"] = [int(math.floor(lo * total)), int(math.ceil(hi * total))]
+            item["wins_in_sample"] = cnt
+        top10.append(item)
+
+    out = {
+        "source": source,
         "min_date_fixed": str(min_date),
         "total_rows_scanned": len(rows),
         "unique_main_pokemon": len(counts),
         "top10": top10,
     }
+    if classify:
+        out["classified"] = True
+        out["relabeled_rows"] = relabeled
+    out.update(approx_info)
+    return out
+
+
+# ================== CARTAS ==================
+
+@app.get("/v1/cards/usage")
+def card_usage(name: str, source: str = ALL_SOURCES, since: date | None = None):
+    """
+    Quais arquétipos jogam a carta e em que quantidade, sobre as decks do
+    índice invertido (sem baixar nada): snapshot, cache compartilhado
+    (POKEMON_SHARED_DB) e as baixadas por este processo. "population" diz
+    quantas decks entraram na conta.
+    """
+    if not name or not name.strip():
+        raise HTTPException(status_code=400, detail="Parâmetro 'name' é obrigatório.")
+    _check_source(source)
+
+    since = since or DEFAULT_MIN_DATE
+    _sync_card_index()
+    usage = CARD_INDEX.usage(name, since=since, source=None if source == ALL_SOURCES else source)
+    if usage is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": f"Carta '{name}' não aparece em nenhuma decklist indexada.",
+                "indexed_decks": len(CARD_INDEX),
+                "population": _card_population(since, source),
+                "similar": CARD_INDEX.similar(name),
+            },
+        )
+
+    return {
+        "source": source,
+        "since": str(since),
+        "indexed_decks": len(CARD_INDEX),
+        "population": _card_population(since, source),
+        **usage,
+    }
+
+
+class SimilarRequest(BaseModel):
+    decklist: str               # uma carta por linha: "N Nome"
+    k: int = 10
+    metric: str = "jaccard"     # "jaccard" (ponderado) ou "cosine"
+    approx: bool = False        # só decks que jogam as cartas mais raras da lista
+    source: str = ALL_SOURCES
+    since: date | None = None
+
+
+@app.post("/v1/deck/similar")
+def similar_decks(req: SimilarRequest):
+    """
+    Listas vencedoras mais próximas de uma lista colada, com as diferenças carta
+    a carta, entre as decks do índice de cartas ("population", como em /v1/cards/usage).
+    """
+    _check_source(req.source)
+    if req.metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Campo 'metric' deve ser um de {list(METRICS)}.")
+
+    query = parse_decklist_text(req.decklist)
+    if not query:
+        raise HTTPException(status_code=400, detail="Nenhuma linha no formato 'N Nome' na decklist.")
+
+    since = req.since or DEFAULT_MIN_DATE
+    _sync_card_index()
+    matches = CARD_INDEX.nearest(
+        query,
+        k=max(1, min(req.k, 100)),
+        metric=req.metric,
+        since=since,
+        source=None if req.source == ALL_SOURCES else req.source,
+        approx=req.approx,
+    )
+
+    return {
+        "source": req.source,
+        "since": str(since),
+        "metric": req.metric,
+        "approx": req.approx,
+        "indexed_decks": len(CARD_INDEX),
+        "population": _card_population(since, req.source),
+        "input_cards": sum(query.values()),
+        "matches": matches,
+    }
+
+
+# ================== JOBS ==================
+
+class JobRequest(BaseModel):
+    kind: str = "deck"          # "deck" (um Pokémon) ou "meta" (top_n arquétipos)
+    pokemon: str | None = None
+    source: str = DEFAULT_SOURCE
+    top_n: int = 10             # meta: nº de arquétipos; standings: colocações por torneio
+    classify: bool = False      # meta: arquétipos pelo conteúdo das listas, não pelos sprites
+
+
+def _job_status(job) -> dict:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "params": job.params,
+        "status": job.status,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+    }
+
+
+@app.post("/v1/jobs", status_code=202)
+def submit_job(req: JobRequest):
+    _check_source(req.source)
+
+    if req.kind == "deck":
+        if not req.pokemon or not req.pokemon.strip():
+            raise HTTPException(status_code=400, detail="Campo 'pokemon' é obrigatório para jobs 'deck'.")
+        params = {
+            "pokemon": req.pokemon.strip().lower(),
+            "source": req.source,
+            "min_date": str(DEFAULT_MIN_DATE),
+        }
+    elif req.kind == "meta":
+        params = {
+            "top_n": max(1, min(req.top_n, 50)),
+            "source": req.source,
+            "classify": req.classify,
+            "min_date": str(DEFAULT_MIN_DATE),
+        }
+    elif req.kind == "standings":
+        params = {
+            "top_n": max(1, min(req.top_n, MAX_PLACEMENTS)),
+            "source": req.source,
+            "min_date": str(DEFAULT_MIN_DATE),
+        }
+    else:
+        raise HTTPException(status_code=400, detail="Campo 'kind' deve ser 'deck', 'meta' ou 'standings'.")
+
+    job, deduplicated = JOBS.submit(req.kind, params)
+    return {**_job_status(job), "deduplicated": deduplicated}
+
+
+@app.get("/v1/jobs/{job_id}")
+def job_status(job_id: str):
+    job = JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return _job_status(job)
+
+
+@app.get("/v1/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    if job.status == "failed":
+        raise HTTPException(status_code=422, detail={"status": job.status, "error": job.error})
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail={"status": job.status, "error": "Job ainda não terminou."})
+    return {"job_id": job.id, "kind": job.kind, "params": job.params, "result": job.result}
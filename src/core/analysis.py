@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 from collections import defaultdict, Counter
+import math
 
 
 # ================== ACE SPECS ==================
@@ -53,6 +54,15 @@ class CardStat:
     avg_qty_round: int
 
 
+@dataclass
+class CardInterval:
+    presence_lo: float
+    presence_hi: float
+    qty_lo: Optional[float]
+    qty_hi: Optional[float]
+    core_prob: float  # fração das reamostragens em que a carta está em todas as listas
+
+
 @dataclass
 class AnalysisResult:
     n_lists: int
@@ -62,6 +72,7 @@ class AnalysisResult:
     ace_spec: str | None
     remaining: List[CardStat]
     all_stats: List[CardStat]
+    intervals: Dict[str, CardInterval] = field(default_factory=dict)
 
 
 # ================== UTIL ==================
@@ -75,9 +86,18 @@ def _parse_line(line: str) -> Tuple[int, str]:
     return int(parts[0]), parts[1].strip()
 
 
+def placement_weight(placing: int) -> float:
+    """
+    Peso de uma lista pela colocação no torneio: 1 / log2(placing + 1).
+    1º = 1.0, 2º ≈ 0.63, 4º ≈ 0.43, 8º ≈ 0.32, 16º ≈ 0.24.
+    """
+    return 1.0 / math.log2(max(1, placing) + 1)
+
+
 def compute_category_averages_force_60(
     totals_by_cat_each: List[Dict[str, int]],
     target_total: int = 60,
+    weights: Optional[Sequence[float]] = None,
 ) -> Dict[str, int]:
 
     cats = ["Pokemon", "Trainer", "Energy"]
@@ -85,9 +105,13 @@ def compute_category_averages_force_60(
     raw = {}
     rounded = {}
 
+    if weights is None:
+        weights = [1.0] * len(totals_by_cat_each)
+    weight_sum = sum(weights)
+
     for cat in cats:
         vals = [t[cat] for t in totals_by_cat_each]
-        avg = sum(vals) / len(vals) if vals else 0.0
+        avg = sum(w * v for w, v in zip(weights, vals)) / weight_sum if vals else 0.0
         raw[cat] = avg
         rounded[cat] = _round_half_up_int(avg)
 
@@ -150,9 +174,30 @@ def normalize_deck(deck: Dict[str, List[str]]) -> Tuple[Dict[str, int], Dict[str
     return card_qty, card_cat
 
 
-def analyze_decklists(decklists: List[Dict[str, List[str]]]) -> AnalysisResult:
+def analyze_decklists(
+    decklists: List[Dict[str, List[str]]],
+    bootstrap: int = 0,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+    weights: Optional[Sequence[float]] = None,
+) -> AnalysisResult:
+    """
+    bootstrap > 0 liga o modo estatístico: preenche result.intervals com
+    intervalos de confiança (bootstrap com `bootstrap` reamostragens).
+
+    weights: um peso > 0 por lista, na ordem de decklists (ex.: placement_weight
+    da colocação). presence_pct, avg_qty e as médias por categoria viram médias
+    ponderadas; present_in continua sendo contagem e o cerne continua sendo
+    "em todas as listas".
+    """
 
     n = len(decklists)
+    if weights is not None:
+        weights = [float(w) for w in weights]
+        if len(weights) != n:
+            raise ValueError(f"weights tem {len(weights)} valores para {n} listas.")
+        if any(w <= 0 for w in weights):
+            raise ValueError("Todos os pesos devem ser > 0.")
     if n == 0:
         return AnalysisResult(
             0, {}, 0,
@@ -182,22 +227,26 @@ def analyze_decklists(decklists: List[Dict[str, List[str]]]) -> AnalysisResult:
     def best_cat(name: str) -> str:
         return cat_votes[name].most_common(1)[0][0]
 
+    w_each = weights if weights is not None else [1.0] * n
+    weight_sum = sum(w_each)
+
     appear_counts = Counter()
-    qty_lists = defaultdict(list)
+    appear_weight = defaultdict(float)
+    qty_weighted = defaultdict(float)
 
-    for deck in decks_qty:
+    for deck, w in zip(decks_qty, w_each):
         for name, qty in deck.items():
             appear_counts[name] += 1
-            qty_lists[name].append(qty)
+            appear_weight[name] += w
+            qty_weighted[name] += w * qty
 
     core = {}
     all_stats = []
     remaining = []
 
-    for name, qtys in qty_lists.items():
-        present = appear_counts[name]
-        pct = (present / n) * 100
-        avg_raw = sum(qtys) / len(qtys)
+    for name, present in appear_counts.items():
+        pct = (present / n) * 100 if weights is None else appear_weight[name] / weight_sum * 100
+        avg_raw = qty_weighted[name] / appear_weight[name]
         avg_round = _round_half_up_int(avg_raw)
 
         stat = CardStat(
@@ -217,7 +266,7 @@ def analyze_decklists(decklists: List[Dict[str, List[str]]]) -> AnalysisResult:
             remaining.append(stat)
 
     # ACE SPEC
-    ace_counts = {s.name: s.present_in for s in all_stats if s.name in ACE_SPECS}
+    ace_counts = {s.name: s.presence_pct for s in all_stats if s.name in ACE_SPECS}
     ace_spec = None
     if ace_counts:
         max_count = max(ace_counts.values())
@@ -227,7 +276,7 @@ def analyze_decklists(decklists: List[Dict[str, List[str]]]) -> AnalysisResult:
         )[0]
 
     avg_category_totals = compute_category_averages_force_60(
-        totals_by_cat_each, 60
+        totals_by_cat_each, 60, weights
     )
 
     core_count_cards = sum(core.values())
@@ -235,6 +284,10 @@ def analyze_decklists(decklists: List[Dict[str, List[str]]]) -> AnalysisResult:
     remaining.sort(key=lambda s: (-s.presence_pct, s.name.lower()))
     all_stats.sort(key=lambda s: (-s.presence_pct, s.name.lower()))
 
+    intervals = {}
+    if bootstrap > 0:
+        intervals = bootstrap_intervals(decks_qty, bootstrap, confidence, seed, weights)
+
     return AnalysisResult(
         n_lists=n,
         core=core,
@@ -243,9 +296,90 @@ def analyze_decklists(decklists: List[Dict[str, List[str]]]) -> AnalysisResult:
         ace_spec=ace_spec,
         remaining=remaining,
         all_stats=all_stats,
+        intervals=intervals,
     )
 
 
+# ================== BOOTSTRAP ==================
+
+def bootstrap_intervals(
+    decks_qty: List[Dict[str, int]],
+    n_resamples: int = 2000,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+    weights: Optional[Sequence[float]] = None,
+) -> Dict[str, CardInterval]:
+    """
+    Intervalos de confiança (percentil) de presença e quantidade média por carta.
+
+    Todas as B reamostragens saem de uma vez: uma matriz de índices (B x n) vira
+    uma matriz de pesos W (quantas vezes cada lista foi sorteada em cada
+    reamostragem) e as estatísticas saem de dois produtos matriciais com a
+    matriz lista x carta — nada de B execuções em Python.
+
+    Com weights, cada sorteio da lista i conta weights[i] (W vira W * weights)
+    nas médias; core_prob segue contando listas.
+    """
+    import warnings
+
+    import numpy as np
+
+    n = len(decks_qty)
+    if n == 0 or n_resamples <= 0:
+        return {}
+
+    names = sorted({name for d in decks_qty for name in d}, key=str.lower)
+    col = {name: j for j, name in enumerate(names)}
+
+    Q = np.zeros((n, len(names)), dtype=np.float32)
+    for i, d in enumerate(decks_qty):
+        for name, qty in d.items():
+            Q[i, col[name]] = qty
+    P = (Q > 0).astype(np.float32)
+
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, n, size=(n_resamples, n))
+
+    # W[b, i] = nº de vezes que a lista i caiu na reamostragem b
+    offsets = idx + (np.arange(n_resamples) * n)[:, None]
+    W = np.bincount(offsets.ravel(), minlength=n_resamples * n)
+    W = W.reshape(n_resamples, n).astype(np.float32)
+
+    present = W @ P          # (B, cartas): listas com a carta, por reamostragem
+
+    if weights is None:
+        WW, total = W, np.full((n_resamples, 1), float(n))
+    else:
+        w = np.asarray(weights, dtype=np.float32)
+        WW = W * w[None, :]
+        total = WW.sum(axis=1, keepdims=True, dtype=np.float64)
+    present_w = WW @ P
+    qty_sum = WW @ Q
+
+    presence = present_w.astype(np.float64) / total * 100
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_qty = np.where(present_w > 0, qty_sum / present_w, np.nan)
+
+    alpha = (1 - confidence) / 2 * 100
+    p_lo, p_hi = np.percentile(presence, [alpha, 100 - alpha], axis=0)
+    with warnings.catch_warnings():
+        # carta ausente em todas as reamostragens -> coluna toda NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        q_lo, q_hi = np.nanpercentile(avg_qty, [alpha, 100 - alpha], axis=0)
+    core_prob = (present >= n - 0.5).mean(axis=0)
+
+    out = {}
+    for name, j in col.items():
+        out[name] = CardInterval(
+            presence_lo=float(p_lo[j]),
+            presence_hi=float(p_hi[j]),
+            qty_lo=None if np.isnan(q_lo[j]) else float(q_lo[j]),
+            qty_hi=None if np.isnan(q_hi[j]) else float(q_hi[j]),
+            core_prob=float(core_prob[j]),
+        )
+    return out
+
+
 # ================== TXT OUTPUT ==================
 
 def write_analysis_txt(
@@ -293,14 +427,28 @@ def write_analysis_txt(
             lines.append(f"{qty} {name}")
         lines.append("")
 
+    if result.intervals:
+        lines.append("=== ESTABILIDADE DO CERNE (bootstrap) ===")
+        lines.append("Formato: %Reamostragens em que a carta segue no cerne | Carta")
+        lines.append("")
+        for name in sorted(result.core, key=lambda n: (result.intervals[n].core_prob, n.lower())):
+            lines.append(f"{_round_half_up_int(result.intervals[name].core_prob * 100):>3}% | {name}")
+        lines.append("")
+
     lines.append("=== CARTAS RESTANTES (probabilidade de entrar no deck) ===")
-    lines.append("Formato: %Presença | Listas | QtdMédia | Carta | Tipo")
+    if result.intervals:
+        lines.append("Formato: %Presença | Listas | QtdMédia | Carta | Tipo | IC %Presença | IC QtdMédia")
+    else:
+        lines.append("Formato: %Presença | Listas | QtdMédia | Carta | Tipo")
     lines.append("")
 
     for s in result.remaining:
         pct = _round_half_up_int(s.presence_pct)
-        lines.append(
-            f"{pct:>3}% | {s.present_in:>2}/{result.n_lists} | {s.avg_qty_round:>2} | {s.name} | {s.category}"
-        )
+        line = f"{pct:>3}% | {s.present_in:>2}/{result.n_lists} | {s.avg_qty_round:>2} | {s.name} | {s.category}"
+        ci = result.intervals.get(s.name)
+        if ci:
+            qty_ci = f"{ci.qty_lo:.1f}-{ci.qty_hi:.1f}" if ci.qty_lo is not None else "-"
+            line += f" | {ci.presence_lo:.0f}-{ci.presence_hi:.0f}% | {qty_ci}"
+        lines.append(line)
     with open(out_path, "w", encoding="utf-8") as f:
         f.write("\n".join(lines))
\ No newline at end of file
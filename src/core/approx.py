@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import math
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from statistics import NormalDist
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+# Modo aproximado (approx=true): a análise roda sobre uma amostra estratificada
+# por data, com limites de erro, e o cálculo exato segue em segundo plano;
+# a próxima requisição igual sai com o resultado exato guardado.
+
+DEFAULT_TARGET_ERROR = 0.05  # meia-largura do IC de uma proporção (0.05 = ±5 pontos percentuais)
+MIN_TARGET_ERROR = 0.005
+MIN_SAMPLE = 30
+DEFAULT_CONFIDENCE = 0.95
+REFINED_RESULTS = 256  # resultados exatos guardados pelo Refiner (LRU)
+
+
+def _z(confidence: float) -> float:
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def sample_size(
+    target_error: float = DEFAULT_TARGET_ERROR,
+    population: Optional[int] = None,
+    confidence: float = DEFAULT_CONFIDENCE,
+) -> int:
+    """
+    Tamanho de amostra para estimar qualquer proporção (presença de carta,
+    fatia de vitórias) com meia-largura <= target_error:
+        n0 = z² · 0.25 / e²            (pior caso, p = 0.5)
+        n  = n0 / (1 + (n0 - 1) / N)   (correção de população finita)
+    """
+    e = max(MIN_TARGET_ERROR, target_error)
+    n0 = _z(confidence) ** 2 * 0.25 / e ** 2
+    n = n0 if not population else n0 / (1 + (n0 - 1) / population)
+    n = max(MIN_SAMPLE, math.ceil(n))
+    return n if not population else min(n, population)
+
+
+def month_stratum(row) -> Tuple[int, int]:
+    return row.row_date.year, row.row_date.month
+
+
+def stratified_sample(
+    items: Sequence,
+    n: int,
+    key: Callable[[object], Hashable] = month_stratum,
+    seed: int = 0,
+) -> List:
+    """
+    n itens com alocação proporcional por estrato (key(item); padrão: mês da
+    data), maiores restos para fechar n e sorteio simples dentro do estrato.
+    Mantém a ordem original. Mesmo seed = mesma amostra a cada chamada.
+    """
+    if n >= len(items):
+        return list(items)
+
+    strata: Dict[Hashable, List[int]] = {}
+    for i, it in enumerate(items):
+        strata.setdefault(key(it), []).append(i)
+
+    quotas = {k: n * len(ix) / len(items) for k, ix in strata.items()}
+    alloc = {k: int(q) for k, q in quotas.items()}
+    rest = n - sum(alloc.values())
+    for k in sorted(quotas, key=lambda k: (alloc[k] - quotas[k], str(k)))[:rest]:
+        alloc[k] += 1
+
+    rng = random.Random(seed)
+    chosen: List[int] = []
+    for k in sorted(strata, key=str):
+        chosen.extend(rng.sample(strata[k], alloc[k]))
+    return [items[i] for i in sorted(chosen)]
+
+
+def proportion_interval(
+    k: int,
+    n: int,
+    population: Optional[int] = None,
+    confidence: float = DEFAULT_CONFIDENCE,
+) -> Tuple[float, float, float]:
+    """
+    (p, lo, hi) para k "sim" em n amostrados, IC de Wilson (não colapsa em
+    p = 0 ou 1, caso das cartas do cerne). Com population, usa o n efetivo
+    n·(N-1)/(N-n) da correção de população finita: amostra = população -> exato.
+    """
+    if n <= 0:
+        return 0.0, 0.0, 1.0
+    p = k / n
+    if population is not None and n >= population:
+        return p, p, p
+    n_eff = n if not population or population <= 1 else n * (population - 1) / (population - n)
+    z2 = _z(confidence) ** 2
+    denom = 1 + z2 / n_eff
+    center = (p + z2 / (2 * n_eff)) / denom
+    half = math.sqrt(p * (1 - p) / n_eff + z2 / (4 * n_eff ** 2)) * math.sqrt(z2) / denom
+    return p, max(0.0, center - half), min(1.0, center + half)
+
+
+# ================== REFINO EM SEGUNDO PLANO ==================
+
+class Refiner:
+    """
+    Trabalho exato em segundo plano, no máximo um por chave. Usa executor.submit
+    puro de propósito: a thread não herda o prazo (core.deadline) da requisição
+    que disparou o refino. O valor devolvido por fn (se não for None) fica
+    guardado sob a chave, num LRU de `keep` entradas, para result().
+    """
+
+    def __init__(self, workers: int = 2, keep: int = REFINED_RESULTS):
+        self.workers = workers
+        self.keep = keep
+        self._ex: Optional[ThreadPoolExecutor] = None
+        self._running: Dict[Hashable, Future] = {}
+        self._results: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, key: Hashable, fn: Callable, *args, **kwargs) -> bool:
+        """Dispara fn se não houver refino da mesma chave rodando; True se disparou."""
+        with self._lock:
+            fut = self._running.get(key)
+            if fut is not None and not fut.done():
+                return False
+            if self._ex is None:
+                self._ex = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="refine")
+            self._running[key] = self._ex.submit(self._run, key, fn, args, kwargs)
+            return True
+
+    def _run(self, key: Hashable, fn: Callable, args: tuple, kwargs: dict):
+        try:
+            value = fn(*args, **kwargs)
+            if value is not None:
+                with self._lock:
+                    self._results[key] = value
+                    self._results.move_to_end(key)
+                    while len(self._results) > self.keep:
+                        self._results.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                self._running.pop(key, None)
+
+    def running(self, key: Hashable) -> bool:
+        with self._lock:
+            fut = self._running.get(key)
+            return fut is not None and not fut.done()
+
+    def result(self, key: Hashable):
+        """Último resultado guardado para a chave (ou None)."""
+        with self._lock:
+            value = self._results.get(key)
+            if value is not None:
+                self._results.move_to_end(key)
+            return value
+
+
+REFINER = Refiner()
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.analysis import normalize_deck
+
+UNKNOWN = "unknown"
+
+CHUNK = 4096  # decks por bloco na comparação (limita a matriz decks x assinaturas x palavras)
+
+
+@dataclass
+class Archetype:
+    name: str
+    cards: List[str]   # assinatura: cartas que caracterizam o arquétipo
+    support: int       # decks rotulados usados para montar a assinatura
+
+
+class CardVocab:
+    """Interning de nomes de carta -> ids densos (posição do bit)."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def intern(self, name: str) -> int:
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+def _words(n_bits: int) -> int:
+    return max(1, (n_bits + 63) // 64)
+
+
+def _pack(matrix, n_words: int):
+    """Matriz booleana (n, bits) -> bitsets uint64 (n, n_words)."""
+    import numpy as np
+
+    packed = np.packbits(matrix, axis=1, bitorder="little")
+    out = np.zeros((matrix.shape[0], n_words * 8), dtype=np.uint8)
+    out[:, : packed.shape[1]] = packed
+    return out.view("<u8")
+
+
+def card_sets(decks: Iterable[Dict[str, List[str]]]) -> List[frozenset]:
+    return [frozenset(normalize_deck(deck)[0]) for deck in decks]
+
+
+class ArchetypeClassifier:
+    """
+    Classifica decks pelo conteúdo, não pelos sprites do Limitless.
+
+    Cada deck vira um bitset sobre ids de carta (CardVocab) e cada arquétipo
+    uma assinatura (bitset das cartas que o caracterizam). A pontuação é a
+    fração da assinatura presente no deck:
+        score = popcount(deck & assinatura) / popcount(assinatura)
+    calculada para todos os decks x assinaturas de uma vez (NumPy).
+    """
+
+    def __init__(self, archetypes: List[Archetype], vocab: CardVocab):
+        import numpy as np
+
+        self.archetypes = archetypes
+        self.vocab = vocab
+        self.n_words = _words(len(vocab))
+
+        sig = np.zeros((len(archetypes), len(vocab)), dtype=bool)
+        for k, a in enumerate(archetypes):
+            for name in a.cards:
+                sig[k, vocab.ids[name]] = True
+        self.signatures = _pack(sig, self.n_words)
+        self.sizes = np.bitwise_count(self.signatures).sum(axis=1, dtype=np.int64)
+
+    @classmethod
+    def fit(
+        cls,
+        labeled: Sequence[Tuple[str, Dict[str, List[str]]]],
+        min_presence: float = 0.7,
+        min_margin: float = 0.3,
+        min_support: int = 3,
+        max_cards: int = 15,
+    ) -> "ArchetypeClassifier":
+        """
+        Monta as assinaturas a partir de decks já rotulados (ex.: alts[0]).
+        Entram na assinatura as cartas presentes em >= min_presence dos decks do
+        rótulo e pelo menos min_margin acima da presença no resto do meta (tira
+        staples como Ultra Ball), no máximo max_cards por arquétipo.
+        """
+        import numpy as np
+
+        vocab = CardVocab()
+        sets = card_sets(deck for _, deck in labeled)
+        for cards in sets:
+            for name in cards:
+                vocab.intern(name)
+
+        labels = [label for label, _ in labeled]
+        x = np.zeros((len(sets), len(vocab)), dtype=bool)
+        for i, cards in enumerate(sets):
+            x[i, [vocab.ids[n] for n in cards]] = True
+
+        label_arr = np.array(labels, dtype=object)
+        archetypes: List[Archetype] = []
+        for label in sorted(set(labels)):
+            mask = label_arr == label
+            support = int(mask.sum())
+            if support < min_support:
+                continue
+            p_in = x[mask].mean(axis=0)
+            p_out = x[~mask].mean(axis=0) if (~mask).any() else np.zeros(len(vocab))
+            margin = p_in - p_out
+            ok = np.flatnonzero((p_in >= min_presence) & (margin >= min_margin))
+            if ok.size == 0:
+                continue
+            best = ok[np.argsort(-margin[ok], kind="stable")][:max_cards]
+            archetypes.append(Archetype(label, [vocab.names[j] for j in best], support))
+
+        return cls(archetypes, vocab)
+
+    def encode(self, sets: Sequence[frozenset]):
+        """Card sets -> bitsets uint64 (n, n_words); cartas fora do vocabulário são ignoradas."""
+        import numpy as np
+
+        ids = self.vocab.ids
+        x = np.zeros((len(sets), max(1, len(self.vocab))), dtype=bool)
+        for i, cards in enumerate(sets):
+            cols = [ids[n] for n in cards if n in ids]
+            if cols:
+                x[i, cols] = True
+        return _pack(x, self.n_words)
+
+    def scores(self, bits):
+        """(n, K) fração de cada assinatura presente em cada deck."""
+        import numpy as np
+
+        n, k = bits.shape[0], len(self.archetypes)
+        out = np.zeros((n, k), dtype=np.float64)
+        if k == 0:
+            return out
+        for start in range(0, n, CHUNK):
+            block = bits[start:start + CHUNK]
+            overlap = np.bitwise_count(block[:, None, :] & self.signatures[None, :, :]).sum(
+                axis=2, dtype=np.int64
+            )
+            out[start:start + CHUNK] = overlap / self.sizes
+        return out
+
+    def classify(
+        self,
+        decks: Sequence[Dict[str, List[str]]],
+        min_score: float = 0.6,
+    ) -> List[Tuple[Optional[str], float]]:
+        """[(arquétipo ou None se nenhuma assinatura passar de min_score, score)]."""
+        import numpy as np
+
+        if not decks:
+            return []
+        sc = self.scores(self.encode(card_sets(decks)))
+        if sc.shape[1] == 0:
+            return [(None, 0.0)] * len(decks)
+        # empate: assinatura maior (mais específica) ganha
+        best = np.argmax(sc + self.sizes * 1e-9, axis=1)
+        best_score = sc[np.arange(len(decks)), best]
+        return [
+            (self.archetypes[b].name if s >= min_score else None, float(s))
+            for b, s in zip(best.tolist(), best_score.tolist())
+        ]
+
+
+# ================== REROTULAGEM DE LINHAS ==================
+
+@dataclass
+class LabeledRow:
+    row: object                 # MatchRow
+    deck: Optional[dict]
+    label: str                  # arquétipo final
+    sprite_label: Optional[str]  # alts[0] da listagem
+    score: float                # 0.0 quando veio só dos sprites
+
+
+def relabel_rows(
+    fetched: Sequence[Tuple[object, Optional[dict]]],
+    classifier: Optional[ArchetypeClassifier] = None,
+    min_score: float = 0.6,
+) -> List[LabeledRow]:
+    """
+    Rótulo por conteúdo para cada (linha, deck). Sem classifier, treina um com
+    as próprias linhas (alts[0] como rótulo). Se nenhuma assinatura passar de
+    min_score (ou a deck não existir), fica o sprite; sem sprite, UNKNOWN.
+    """
+    def sprite(row) -> Optional[str]:
+        return row.alts[0].strip().lower() if row.alts else None
+
+    if classifier is None:
+        training = [(sprite(r), d) for r, d in fetched if d is not None and sprite(r)]
+        classifier = ArchetypeClassifier.fit(training)
+
+    with_deck = [i for i, (_, d) in enumerate(fetched) if d is not None]
+    results = classifier.classify([fetched[i][1] for i in with_deck], min_score=min_score)
+    by_pos = dict(zip(with_deck, results))
+
+    out = []
+    for i, (row, deck) in enumerate(fetched):
+        label, score = by_pos.get(i, (None, 0.0))
+        s = sprite(row)
+        out.append(LabeledRow(row, deck, label or s or UNKNOWN, s, score if label else 0.0))
+    return out
+
+
+def classify_rows(rows: list, timeout: int = 20, min_score: float = 0.6) -> List[LabeledRow]:
+    """Baixa as decklists das linhas (deduplicadas) e rerrotula pelo conteúdo."""
+    from core.row_index import fetch_decklists
+
+    fetched, _ = fetch_decklists(rows, timeout=timeout)
+    decks = {id(r): d for r, d in fetched}
+    return relabel_rows([(r, decks.get(id(r))) for r in rows], min_score=min_score)
@@ -0,0 +1,431 @@
+from __future__ import annotations
+
+import threading
+from array import array
+from datetime import date
+from typing import Dict, List, Optional
+
+from core.analysis import ACE_SPECS, _parse_line, normalize_deck
+from core.archetype import UNKNOWN, CardVocab
+
+QTY_CAP = 60  # histograma de quantidades vai de 1 a QTY_CAP
+
+METRICS = ("jaccard", "cosine")
+
+
+def parse_decklist_text(text: str) -> Dict[str, int]:
+    """
+    Lista colada pelo usuário, uma carta por linha no formato "N Nome"
+    (o mesmo de _parse_line). Cabeçalhos e linhas sem quantidade são ignorados.
+    """
+    qty_map: Dict[str, int] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            qty, name = _parse_line(line)
+        except (ValueError, IndexError):
+            continue
+        if qty > 0 and name:
+            qty_map[name] = qty_map.get(name, 0) + qty
+    return qty_map
+
+
+class CardIndex:
+    """
+    Índice invertido carta -> decks que a jogam.
+
+    Cada deck entra uma vez (chave: decklist_url) e recebe um id denso; por
+    deck guardamos arquétipo, data, fonte e se joga alguma ACE SPEC em arrays
+    paralelos. Por carta (id interno), duas listas paralelas (deck id, qtd).
+    Uma consulta só faz gathers + bincount sobre essas arrays (NumPy), sem
+    reabrir nenhuma decklist.
+    """
+
+    def __init__(self):
+        self.cards = CardVocab()
+        self.archetypes = CardVocab()
+        self.sources = CardVocab()
+        self._lower: Dict[str, int] = {}
+        self._deck_ids: Dict[str, int] = {}
+        self._deck_arch = array("i")
+        self._deck_date = array("i")     # date.toordinal()
+        self._deck_source = array("i")
+        self._deck_ace = array("b")      # 1 se a deck joga alguma ACE SPEC
+        self._post_deck: List[array] = []
+        self._post_qty: List[array] = []
+        self._ace_ids: set[int] = set()
+        # conteúdo de cada deck em CSR: cartas de d em _deck_cards[_deck_ptr[d]:_deck_ptr[d+1]]
+        self._deck_keys: List[str] = []
+        self._deck_ptr = array("q", [0])
+        self._deck_cards = array("i")
+        self._deck_qtys = array("i")
+        self._deck_total = array("i")    # soma das quantidades
+        self._deck_sq = array("q")       # soma dos quadrados (norma p/ cosseno)
+        self._csr_cache: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._deck_arch)
+
+    def add(
+        self,
+        key: str,
+        deck: Dict[str, List[str]],
+        archetype: Optional[str],
+        row_date: date,
+        source: str,
+    ) -> bool:
+        """Indexa uma deck; False se a chave já estava no índice."""
+        if key in self._deck_ids:
+            return False
+        qty_map, _ = normalize_deck(deck)
+
+        with self._lock:
+            if key in self._deck_ids:
+                return False
+            d = self._deck_ids[key] = len(self._deck_arch)
+            self._deck_arch.append(self.archetypes.intern(archetype or UNKNOWN))
+            self._deck_date.append(row_date.toordinal())
+            self._deck_source.append(self.sources.intern(source))
+
+            has_ace = 0
+            for name, qty in qty_map.items():
+                c = self.cards.intern(name)
+                if c == len(self._post_deck):
+                    self._post_deck.append(array("i"))
+                    self._post_qty.append(array("i"))
+                    self._lower.setdefault(name.lower(), c)
+                    if name in ACE_SPECS:
+                        self._ace_ids.add(c)
+                self._post_deck[c].append(d)
+                self._post_qty[c].append(qty)
+                self._deck_cards.append(c)
+                self._deck_qtys.append(qty)
+                if c in self._ace_ids:
+                    has_ace = 1
+            self._deck_ace.append(has_ace)
+            self._deck_keys.append(key)
+            self._deck_ptr.append(len(self._deck_cards))
+            self._deck_total.append(sum(qty_map.values()))
+            self._deck_sq.append(sum(q * q for q in qty_map.values()))
+        return True
+
+    def add_rows(self, fetched) -> int:
+        """[(MatchRow, deck)] como sai de fetch_decklists; arquétipo = alts[0]."""
+        added = 0
+        for row, deck in fetched:
+            if row.decklist_url and deck:
+                arch = row.alts[0].strip().lower() if row.alts else None
+                added += self.add(row.decklist_url, deck, arch, row.row_date, row.source)
+        return added
+
+    def population(self, since: Optional[date] = None, source: Optional[str] = None) -> dict:
+        """Decks indexadas e quantas passam pelos filtros: a base de usage/nearest."""
+        import numpy as np
+
+        with self._lock:
+            n = len(self._deck_arch)
+            dates = np.frombuffer(self._deck_date, dtype=np.int32, count=n).copy()
+            srcs = np.frombuffer(self._deck_source, dtype=np.int32, count=n).copy()
+            src_names = list(self.sources.names)
+            src_id = self.sources.ids.get(source) if source else None
+
+        mask = np.ones(n, dtype=bool)
+        if since is not None:
+            mask &= dates >= since.toordinal()
+        if source:
+            mask &= srcs == (src_id if src_id is not None else -1)
+
+        per_source = np.bincount(srcs[mask], minlength=len(src_names))
+        kept = dates[mask]
+        return {
+            "indexed_decks": n,
+            "matching_decks": int(mask.sum()),
+            "by_source": {src_names[i]: int(c) for i, c in enumerate(per_source) if c},
+            "first_date": str(date.fromordinal(int(kept.min()))) if kept.size else None,
+            "last_date": str(date.fromordinal(int(kept.max()))) if kept.size else None,
+        }
+
+    def lookup(self, name: str) -> Optional[str]:
+        c = self._lower.get(name.strip().lower())
+        return self.cards.names[c] if c is not None else None
+
+    def similar(self, name: str, limit: int = 10) -> List[str]:
+        q = name.strip().lower()
+        if not q:
+            return []
+        with self._lock:
+            names = list(self._lower.items())
+        hits = sorted((n for n, _ in names if q in n), key=lambda n: (len(n), n))
+        return [self.cards.names[self._lower[n]] for n in hits[:limit]]
+
+    def usage(
+        self,
+        name: str,
+        since: Optional[date] = None,
+        source: Optional[str] = None,
+    ) -> Optional[dict]:
+        """Presença e distribuição de quantidade da carta por arquétipo; None se desconhecida."""
+        import numpy as np
+
+        c = self._lower.get(name.strip().lower())
+        if c is None:
+            return None
+
+        with self._lock:
+            n = len(self._deck_arch)
+            arch = np.frombuffer(self._deck_arch, dtype=np.int32, count=n).copy()
+            dates = np.frombuffer(self._deck_date, dtype=np.int32, count=n).copy()
+            srcs = np.frombuffer(self._deck_source, dtype=np.int32, count=n).copy()
+            ace = np.frombuffer(self._deck_ace, dtype=np.int8, count=n).astype(bool)
+            decks = np.array(self._post_deck[c], dtype=np.int64)
+            qty = np.array(self._post_qty[c], dtype=np.int64)
+            arch_names = list(self.archetypes.names)
+            src_id = self.sources.ids.get(source) if source else None
+            card_name = self.cards.names[c]
+
+        mask = np.ones(n, dtype=bool)
+        if since is not None:
+            mask &= dates >= since.toordinal()
+        if source:
+            mask &= srcs == (src_id if src_id is not None else -1)
+
+        keep = mask[decks]
+        decks, qty = decks[keep], np.clip(qty[keep], 1, QTY_CAP)
+        n_arch = len(arch_names)
+
+        lists_per_arch = np.bincount(arch[mask], minlength=n_arch)
+        card_arch = arch[decks]
+        present_per_arch = np.bincount(card_arch, minlength=n_arch)
+        qty_sum_per_arch = np.bincount(card_arch, weights=qty, minlength=n_arch)
+        hist = np.bincount(card_arch * (QTY_CAP + 1) + qty, minlength=n_arch * (QTY_CAP + 1))
+        hist = hist.reshape(n_arch, QTY_CAP + 1)
+
+        is_ace = card_name in ACE_SPECS
+        ace_per_arch = np.bincount(arch[mask & ace], minlength=n_arch) if is_ace else None
+
+        def dist(row) -> Dict[str, int]:
+            return {str(q): int(row[q]) for q in np.flatnonzero(row)}
+
+        archetypes = []
+        nz = np.flatnonzero(present_per_arch)
+        for a in nz[np.argsort(-present_per_arch[nz], kind="stable")]:
+            p, total = int(present_per_arch[a]), int(lists_per_arch[a])
+            item = {
+                "archetype": arch_names[a],
+                "n_lists": total,
+                "present_in": p,
+                "presence_pct": round(p / total * 100, 1) if total else 0.0,
+                "avg_qty": round(float(qty_sum_per_arch[a]) / p, 2),
+                "qty_distribution": dist(hist[a]),
+            }
+            if is_ace:
+                with_ace = int(ace_per_arch[a])
+                item["ace_spec_share_pct"] = round(p / with_ace * 100, 1) if with_ace else 0.0
+            archetypes.append(item)
+
+        total_lists = int(mask.sum())
+        present = int(len(decks))
+        out = {
+            "name": card_name,
+            "n_lists": total_lists,
+            "present_in": present,
+            "presence_pct": round(present / total_lists * 100, 1) if total_lists else 0.0,
+            "avg_qty": round(float(qty.sum()) / present, 2) if present else None,
+            "qty_distribution": dist(hist.sum(axis=0)),
+            "ace_spec": is_ace,
+            "archetypes": archetypes,
+        }
+        if is_ace:
+            # entre as decks que jogam alguma ACE SPEC, quantas escolheram esta
+            with_ace = int((mask & ace).sum())
+            out["ace_spec_share_pct"] = round(present / with_ace * 100, 1) if with_ace else 0.0
+        return out
+
+    def _csr(self) -> dict:
+        """Arrays NumPy do CSR (chamar com _lock); refeitas só quando entram decks novas."""
+        import numpy as np
+
+        n = len(self._deck_arch)
+        cached = self._csr_cache
+        if cached is not None and cached["n"] == n:
+            return cached
+        ptr = np.frombuffer(self._deck_ptr, dtype=np.int64, count=n + 1).copy()
+        nnz = int(ptr[-1])
+        self._csr_cache = {
+            "n": n,
+            "ptr": ptr,
+            "cards": np.frombuffer(self._deck_cards, dtype=np.int32, count=nnz).copy(),
+            "qtys": np.frombuffer(self._deck_qtys, dtype=np.int32, count=nnz).astype(np.float64),
+            "seg": np.repeat(np.arange(n), np.diff(ptr)),
+            "totals": np.frombuffer(self._deck_total, dtype=np.int32, count=n).astype(np.float64),
+            "sq": np.frombuffer(self._deck_sq, dtype=np.int64, count=n).astype(np.float64),
+            "dates": np.frombuffer(self._deck_date, dtype=np.int32, count=n).copy(),
+            "srcs": np.frombuffer(self._deck_source, dtype=np.int32, count=n).copy(),
+        }
+        return self._csr_cache
+
+    def nearest(
+        self,
+        query: Dict[str, int],
+        k: int = 10,
+        metric: str = "jaccard",
+        since: Optional[date] = None,
+        source: Optional[str] = None,
+        approx: bool = False,
+        probe: int = 8,
+    ) -> List[dict]:
+        """
+        As k decks indexadas mais parecidas com query ({carta: qtd}).
+
+        jaccard (ponderado): soma(min(q, d)) / soma(max(q, d)) por carta
+        cosine: q·d / (|q| |d|) sobre os vetores de quantidade
+
+        O cálculo é vetorizado sobre o CSR de todas as decks: um gather das
+        quantidades da query para cada entrada (carta, deck) e um bincount por
+        deck. Com approx=True, só são pontuadas as decks que jogam alguma das
+        `probe` cartas mais raras da query (listas de postings curtas), o que
+        corta quase todo o corpus sem perder os vizinhos próximos de verdade.
+        """
+        import numpy as np
+
+        if metric not in METRICS:
+            raise ValueError(f"metric inválida: {metric} (use {list(METRICS)})")
+
+        with self._lock:
+            n = len(self._deck_arch)
+            if n == 0 or not query:
+                return []
+            m = self._csr()
+            ptr, cards, qtys, seg_all = m["ptr"], m["cards"], m["qtys"], m["seg"]
+            totals, sq, dates, srcs = m["totals"], m["sq"], m["dates"], m["srcs"]
+            src_id = self.sources.ids.get(source) if source else None
+            n_cards = len(self.cards)
+
+            # cartas da query -> ids (nome exato, senão sem diferenciar maiúsculas)
+            qv = np.zeros(n_cards, dtype=np.float64)
+            known: Dict[int, int] = {}
+            query_canon: Dict[str, int] = {}  # nomes como estão no índice (p/ o diff)
+            for name, q in query.items():
+                c = self.cards.ids.get(name)
+                if c is None:
+                    c = self._lower.get(name.strip().lower())
+                if c is not None:
+                    known[c] = known.get(c, 0) + q
+                    name = self.cards.names[c]
+                query_canon[name] = query_canon.get(name, 0) + q
+            for c, q in known.items():
+                qv[c] = q
+            rare = sorted(known, key=lambda c: len(self._post_deck[c]))[:probe]
+            probe_postings = [np.frombuffer(self._post_deck[c], dtype=np.int32).copy() for c in rare]
+
+        mask = np.ones(n, dtype=bool)
+        if since is not None:
+            mask &= dates >= since.toordinal()
+        if source:
+            mask &= srcs == (src_id if src_id is not None else -1)
+
+        if approx:
+            cand = np.unique(np.concatenate(probe_postings)) if probe_postings else np.zeros(0, dtype=np.int64)
+            cand = cand[mask[cand]]
+        else:
+            cand = np.flatnonzero(mask)
+        if cand.size == 0:
+            return []
+
+        # entradas CSR das decks candidatas
+        starts = ptr[cand]
+        lens = ptr[cand + 1] - starts
+        if cand.size == n:
+            seg, dq, qq = seg_all, qtys, qv[cards]
+        else:
+            offsets = np.cumsum(lens) - lens
+            idx = np.arange(int(lens.sum())) - np.repeat(offsets, lens) + np.repeat(starts, lens)
+            seg = np.repeat(np.arange(cand.size), lens)
+            dq, qq = qtys[idx], qv[cards[idx]]
+
+        q_vals = np.array(list(query.values()), dtype=np.float64)
+        if metric == "jaccard":
+            inter = np.bincount(seg, weights=np.minimum(dq, qq), minlength=cand.size)
+            union = q_vals.sum() + totals[cand] - inter
+            score = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+        else:
+            dot = np.bincount(seg, weights=dq * qq, minlength=cand.size)
+            norm = np.sqrt((q_vals ** 2).sum() * sq[cand])
+            score = np.divide(dot, norm, out=np.zeros_like(dot), where=norm > 0)
+
+        k = min(k, cand.size)
+        top = np.argpartition(-score, k - 1)[:k]
+        top = top[np.argsort(-score[top], kind="stable")]
+
+        out = []
+        with self._lock:
+            names = self.cards.names
+            for t in top.tolist():
+                d = int(cand[t])
+                lo, hi = int(ptr[d]), int(ptr[d + 1])
+                deck = {names[c]: int(q) for c, q in zip(cards[lo:hi].tolist(), qtys[lo:hi].tolist())}
+                out.append({
+                    "decklist_url": self._deck_keys[d],
+                    "archetype": self.archetypes.names[self._deck_arch[d]],
+                    "date": date.fromordinal(self._deck_date[d]).isoformat(),
+                    "source": self.sources.names[self._deck_source[d]],
+                    "score": round(float(score[t]), 4),
+                    **deck_diff(query_canon, deck),
+                })
+        return out
+
+
+def deck_diff(mine: Dict[str, int], theirs: Dict[str, int]) -> dict:
+    """Cartas que faltam (a lista vencedora joga mais) e que sobram (a minha joga mais)."""
+    missing, extra = [], []
+    for name in sorted(set(mine) | set(theirs), key=str.lower):
+        delta = theirs.get(name, 0) - mine.get(name, 0)
+        if delta > 0:
+            missing.append({"name": name, "qty": delta})
+        elif delta < 0:
+            extra.append({"name": name, "qty": -delta})
+    return {
+        "shared_cards": sum(min(q, theirs.get(name, 0)) for name, q in mine.items()),
+        "missing": missing,
+        "extra": extra,
+    }
+
+
+# índice do processo, alimentado conforme decklists são baixadas/parseadas
+CARD_INDEX = CardIndex()
+
+
+def index_snapshot(snapshot, index: CardIndex = CARD_INDEX) -> int:
+    """Carrega as decks de um core.snapshot.Snapshot no índice."""
+    added = 0
+    for iso, alts, _, decklist_url in snapshot.rows:
+        deck = snapshot.decks.get(decklist_url) if decklist_url else None
+        if deck:
+            arch = alts[0] if alts else None
+            added += index.add(decklist_url, deck, arch, date.fromisoformat(iso), snapshot.source)
+    return added
+
+
+def index_shared_store(store, since_ts: float = 0.0, index: CardIndex = CARD_INDEX) -> tuple[int, float]:
+    """
+    Indexa as decks que qualquer processo gravou no core.shared_store depois de
+    since_ts. Data, fonte e arquétipo vêm das linhas vencedoras guardadas; decks
+    sem linha conhecida (ex.: colocações de standings) ficam de fora.
+    Retorna (novas, maior fetched_at lido).
+    """
+    fetched = store.decks_fetched_since(since_ts)
+    if not fetched:
+        return 0, since_ts
+    rows = store.all_rows()
+    added = 0
+    for url, deck, _ in fetched:
+        row = rows.get(url)
+        if row is None:
+            continue
+        iso, alts, _, _, source = row
+        arch = alts[0].strip().lower() if alts else None
+        added += index.add(url, deck, arch, date.fromisoformat(iso), source)
+    return added, fetched[-1][2]
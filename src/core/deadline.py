@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+# Prazo (deadline) de uma requisição, propagado por contextvar: resolve,
+# varredura e download leem o mesmo prazo sem precisar de parâmetro extra.
+# Threads de executores não herdam o contexto sozinhas; use submit().
+
+
+class DeadlineExceeded(TimeoutError):
+    """O prazo da requisição acabou antes da etapa terminar."""
+
+
+@dataclass(frozen=True)
+class Deadline:
+    expires_at: float  # time.monotonic()
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def earlier(self, seconds: float) -> "Deadline":
+        """Mesmo prazo menos uma reserva (ex.: tempo para a análise depois dos downloads)."""
+        return Deadline(self.expires_at - seconds)
+
+
+_CURRENT: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+# etapas que devolveram resultado incompleto por causa do prazo (lista do escopo mais externo)
+_PARTIAL: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("partial", default=None)
+
+
+def current() -> Optional[Deadline]:
+    return _CURRENT.get()
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """
+    Define o prazo do contexto atual. None = sem prazo novo. Escopos aninhados
+    nunca estendem o prazo de fora, só o encurtam.
+    """
+    outer = _CURRENT.get()
+    dl = outer
+    if seconds is not None:
+        new = Deadline.after(seconds)
+        dl = new if outer is None or new.expires_at < outer.expires_at else outer
+    token = _CURRENT.set(dl)
+    notes = _PARTIAL.get()
+    notes_token = _PARTIAL.set(notes if notes is not None else [])
+    try:
+        yield dl
+    finally:
+        _PARTIAL.reset(notes_token)
+        _CURRENT.reset(token)
+
+
+def note_partial(stage: str) -> None:
+    """Registra que `stage` parou no prazo e devolveu só parte do resultado."""
+    notes = _PARTIAL.get()
+    if notes is not None:
+        notes.append(stage)
+
+
+def partial_stages() -> list[str]:
+    """Etapas marcadas por note_partial dentro do deadline_scope atual."""
+    return list(_PARTIAL.get() or [])
+
+
+def bound_timeout(timeout: float, stage: str = "") -> float:
+    """timeout limitado ao que resta do prazo; DeadlineExceeded se já acabou."""
+    dl = _CURRENT.get()
+    if dl is None:
+        return timeout
+    rem = dl.remaining()
+    if rem <= 0:
+        raise DeadlineExceeded(stage or "prazo esgotado")
+    return min(timeout, rem)
+
+
+def submit(executor, fn, *args, **kwargs):
+    """executor.submit levando junto o contexto (e o prazo) de quem chamou."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class LatencyTracker:
+    """Janela das últimas latências observadas; base para decidir quando duplicar (hedge)."""
+
+    def __init__(self, window: int = 256, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._values: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._values.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """None enquanto houver menos de min_samples amostras."""
+        with self._lock:
+            if len(self._values) < self.min_samples:
+                return None
+            values = sorted(self._values)
+        k = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+        return values[k]
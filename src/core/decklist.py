@@ -1,8 +1,6 @@
 from __future__ import annotations
 
 import re
-import requests
-from bs4 import BeautifulSoup
 
 QTY_NAME_RE = re.compile(r"^\s*(\d+)\s+(.+?)\s*$")
 
@@ -15,11 +13,20 @@ def fetch_decklist(decklist_url: str, timeout: int = 20) -> dict:
       "trainer": ["4 Judge", ...],
       "energy":  ["10 Fighting Energy", ...]
     }
+    Usa GET condicional: se a página não mudou (304 ou mesmo sha256),
+    devolve o parse guardado sem rodar o BeautifulSoup de novo.
     """
-    r = requests.get(decklist_url, timeout=timeout)
-    r.raise_for_status()
+    from core.http_cache import conditional_get
 
-    soup = BeautifulSoup(r.text, "html.parser")
+    entry, _ = conditional_get(decklist_url, parse_decklist_html, timeout=timeout)
+    return {k: list(v) for k, v in entry.parsed.items()}
+
+
+def parse_decklist_html(html: str) -> dict:
+    """Parseia o HTML de uma página /decks/list/... (mesmo formato de fetch_decklist)."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
 
     # Estratégia bem estável: coletar todos <a> cujo texto comece com "N Nome"
     # (ignorando links de preços).
@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from core.analysis import normalize_deck
+from core.limitless_jp import MatchRow, make_absolute_url
+
+MANIFEST_NAME = "manifest.json"
+
+# tipo de cada coluna por tabela: vem do esquema, não dos valores (coluna vazia não tem tipo)
+_SCHEMAS: Dict[str, Dict[str, str]] = {
+    "rows": {"row_id": "int64", "date": "date", "source": "str", "tournament_url": "str", "decklist_url": "str"},
+    "row_alts": {"row_id": "int64", "pos": "int64", "alt": "str"},
+    "deck_cards": {"row_id": "int64", "card_id": "int64", "qty": "int64"},
+    "cards": {"card_id": "int64", "name": "str", "category": "str"},
+}
+
+
+@dataclass
+class ExportResult:
+    out_dir: Path
+    fmt: str
+    part: Optional[int]
+    rows_written: int
+    decks_written: int
+    rows_pending: int = 0  # deck não baixada: fora da parte, tentadas de novo no próximo export
+
+
+# ================== UTIL ==================
+
+def _row_key(r: MatchRow) -> str:
+    # chave estável para deduplicar linhas do mesmo dia entre exports
+    return make_absolute_url(r.decklist_url) or f"{make_absolute_url(r.tournament_url)}|{'/'.join(r.alts)}"
+
+
+def _load_manifest(out_dir: Path) -> dict:
+    p = out_dir / MANIFEST_NAME
+    if not p.exists():
+        return {
+            "last_date": None,
+            "last_date_keys": [],
+            "next_row_id": 0,
+            "cards": [],
+            "parts": [],
+            "pending": [],
+        }
+    with open(p, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest.setdefault("pending", [])  # manifests antigos
+    return manifest
+
+
+def _pending_rows(manifest: dict) -> list[MatchRow]:
+    return [
+        MatchRow(
+            row_date=date.fromisoformat(iso),
+            alts=list(alts),
+            tournament_url=tournament_url,
+            decklist_url=decklist_url,
+            source=source,
+        )
+        for iso, alts, tournament_url, decklist_url, source in manifest["pending"]
+    ]
+
+
+def _save_manifest(out_dir: Path, manifest: dict) -> None:
+    tmp = out_dir / (MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    tmp.replace(out_dir / MANIFEST_NAME)
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _write_table(out_dir: Path, name: str, table: str, columns: Dict[str, list], fmt: str) -> None:
+    import numpy as np
+
+    schema = _SCHEMAS[table]
+
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {"int64": pa.int64(), "date": pa.date32(), "str": pa.string()}
+        pa_schema = pa.schema([(col, types[schema[col]]) for col in columns])
+        pq.write_table(pa.table(columns, schema=pa_schema), out_dir / f"{name}.parquet")
+        return
+
+    dtypes = {"int64": np.int64, "date": "datetime64[D]", "str": str}
+    arrays = {col: np.array(values, dtype=dtypes[schema[col]]) for col, values in columns.items()}
+    np.savez(out_dir / f"{name}.npz", **arrays)
+
+
+# ================== EXPORT ==================
+
+def export_rows(
+    out_dir: str | Path,
+    rows: Iterable[MatchRow],
+    decks: Dict[str, Dict[str, List[str]]],
+    fmt: Optional[str] = None,
+) -> ExportResult:
+    """
+    Exporta MatchRows e decklists parseadas como tabelas colunares normalizadas.
+
+    Cada export gera uma nova "parte" contendo apenas as linhas mais novas que o
+    último export registrado no manifest:
+      - rows-NNNNN:       row_id, date, source, tournament_url, decklist_url
+      - row_alts-NNNNN:   row_id, pos, alt
+      - deck_cards-NNNNN: row_id, card_id, qty
+      - qty-NNNNN.npy:    matriz (linhas x cartas) de quantidades, uint8
+    O vocabulário de cartas (card_id -> nome/categoria) fica em cards.* e no manifest.
+
+    `decks` mapeia decklist_url -> deck no formato de fetch_decklist. Linhas
+    com decklist_url sem deck em `decks` (download falhou) ficam fora da parte
+    e do controle de last_date: vão para manifest["pending"] e entram no
+    próximo export, mesmo que sejam anteriores a last_date.
+    fmt: "parquet" (requer pyarrow) ou "npz". Por padrão usa parquet se disponível.
+    """
+    import numpy as np
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if fmt is None:
+        fmt = "parquet" if _has_pyarrow() else "npz"
+    if fmt not in ("parquet", "npz"):
+        raise ValueError(f"Formato de export desconhecido: {fmt}")
+
+    manifest = _load_manifest(out_dir)
+    last_date = date.fromisoformat(manifest["last_date"]) if manifest["last_date"] else None
+    last_keys = set(manifest["last_date_keys"])
+
+    # pendentes do export anterior + linhas novas (e as do último dia que ainda não foram exportadas)
+    candidates: Dict[str, MatchRow] = {_row_key(r): r for r in _pending_rows(manifest)}
+    for r in rows:
+        if last_date is not None:
+            if r.row_date < last_date:
+                continue
+            if r.row_date == last_date and _row_key(r) in last_keys:
+                continue
+        candidates.setdefault(_row_key(r), r)
+
+    new_rows: list[MatchRow] = []
+    pending: list[MatchRow] = []
+    for r in candidates.values():
+        decklist_url = make_absolute_url(r.decklist_url)
+        (pending if decklist_url and not decks.get(decklist_url) else new_rows).append(r)
+
+    pending_json = [
+        [r.row_date.isoformat(), list(r.alts), r.tournament_url, r.decklist_url, r.source]
+        for r in sorted(pending, key=lambda r: (r.row_date, _row_key(r)))
+    ]
+
+    if not new_rows:
+        if pending_json != manifest["pending"]:
+            manifest["pending"] = pending_json
+            _save_manifest(out_dir, manifest)
+        return ExportResult(out_dir, fmt, None, 0, 0, len(pending))
+
+    new_rows.sort(key=lambda r: r.row_date)
+
+    card_ids = {name: i for i, (name, _) in enumerate(manifest["cards"])}
+    cards = list(manifest["cards"])
+
+    row_id0 = manifest["next_row_id"]
+
+    rows_cols = {"row_id": [], "date": [], "source": [], "tournament_url": [], "decklist_url": []}
+    alts_cols = {"row_id": [], "pos": [], "alt": []}
+    deck_cols = {"row_id": [], "card_id": [], "qty": []}
+    decks_written = 0
+
+    for i, r in enumerate(new_rows):
+        row_id = row_id0 + i
+        decklist_url = make_absolute_url(r.decklist_url)
+
+        rows_cols["row_id"].append(row_id)
+        rows_cols["date"].append(r.row_date)
+        rows_cols["source"].append(r.source)
+        rows_cols["tournament_url"].append(make_absolute_url(r.tournament_url) or "")
+        rows_cols["decklist_url"].append(decklist_url or "")
+
+        for pos, alt in enumerate(r.alts):
+            alts_cols["row_id"].append(row_id)
+            alts_cols["pos"].append(pos)
+            alts_cols["alt"].append(alt)
+
+        deck = decks.get(decklist_url) if decklist_url else None
+        if not deck:
+            continue  # linha sem decklist_url
+
+        qty_map, cat_map = normalize_deck(deck)
+        for name, qty in qty_map.items():
+            if name not in card_ids:
+                card_ids[name] = len(cards)
+                cards.append([name, cat_map[name]])
+            deck_cols["row_id"].append(row_id)
+            deck_cols["card_id"].append(card_ids[name])
+            deck_cols["qty"].append(qty)
+        decks_written += 1
+
+    part = len(manifest["parts"]) + 1
+    suffix = f"{part:05d}"
+
+    _write_table(out_dir, f"rows-{suffix}", "rows", rows_cols, fmt)
+    _write_table(out_dir, f"row_alts-{suffix}", "row_alts", alts_cols, fmt)
+    _write_table(out_dir, f"deck_cards-{suffix}", "deck_cards", deck_cols, fmt)
+    _write_table(
+        out_dir,
+        "cards",
+        "cards",
+        {
+            "card_id": list(range(len(cards))),
+            "name": [c[0] for c in cards],
+            "category": [c[1] for c in cards],
+        },
+        fmt,
+    )
+
+    # matriz densa em .npy puro (não comprimido) para permitir mmap sem cópia
+    qty = np.zeros((len(new_rows), len(cards)), dtype=np.uint8)
+    for row_id, card_id, q in zip(deck_cols["row_id"], deck_cols["card_id"], deck_cols["qty"]):
+        qty[row_id - row_id0, card_id] = min(q, 255)
+    np.save(out_dir / f"qty-{suffix}.npy", qty)
+
+    # pendentes antigas exportadas agora não fazem last_date voltar
+    max_date = new_rows[-1].row_date
+    if last_date is not None and max_date <= last_date:
+        max_date = last_date
+        keys = last_keys | {_row_key(r) for r in new_rows if r.row_date == last_date}
+    else:
+        keys = {_row_key(r) for r in new_rows if r.row_date == max_date}
+
+    manifest["last_date"] = max_date.isoformat()
+    manifest["last_date_keys"] = sorted(keys)
+    manifest["pending"] = pending_json
+    manifest["next_row_id"] = row_id0 + len(new_rows)
+    manifest["cards"] = cards
+    manifest["parts"].append(
+        {
+            "part": part,
+            "fmt": fmt,
+            "first_row_id": row_id0,
+            "n_rows": len(new_rows),
+            "n_cards": len(cards),
+        }
+    )
+    _save_manifest(out_dir, manifest)
+
+    return ExportResult(out_dir, fmt, part, len(new_rows), decks_written, len(pending))
+
+
+def export_since(
+    out_dir: str | Path,
+    min_date: date,
+    fmt: Optional[str] = None,
+    timeout: int = 20,
+) -> ExportResult:
+    """
+    Varre o Limitless desde min_date (ou desde o último export, o que for mais
+    recente), baixa as decklists das linhas novas e das pendentes do export
+    anterior e exporta. Linhas cuja deck falhar de novo continuam pendentes.
+    """
+    from core.limitless_jp import list_winner_decks_since
+    from core.pipeline import backfill_decklists
+
+    manifest = _load_manifest(Path(out_dir))
+    if manifest["last_date"]:
+        min_date = max(min_date, date.fromisoformat(manifest["last_date"]))
+    last_keys = set(manifest["last_date_keys"])
+
+    rows = list_winner_decks_since(min_date=min_date, timeout=timeout)
+    retry = _pending_rows(manifest)
+
+    decks, _, _ = backfill_decklists(
+        [make_absolute_url(r.decklist_url) for r in rows if _row_key(r) not in last_keys]
+        + [make_absolute_url(r.decklist_url) for r in retry],
+        timeout=timeout,
+    )
+
+    return export_rows(out_dir, rows, decks, fmt=fmt)
+
+
+# ================== LEITURA ==================
+
+def load_qty_matrix(out_dir: str | Path, part: int):
+    """
+    Abre a matriz de quantidades de uma parte via memory mapping (sem cópia).
+    A linha i corresponde a row_id = first_row_id + i; a coluna j ao card_id j.
+    Partes antigas têm menos colunas (o vocabulário só cresce).
+    """
+    import numpy as np
+
+    return np.load(Path(out_dir) / f"qty-{part:05d}.npy", mmap_mode="r")
+
+
+if __name__ == "__main__":
+    # python -m core.export <pasta> [AAAA-MM-DD] [parquet|npz] -> nova parte com as linhas desde o último export
+    import sys
+
+    if len(sys.argv) < 2:
+        sys.exit("uso: python -m core.export <pasta> [AAAA-MM-DD] [parquet|npz]")
+    since = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else date(2026, 1, 23)
+    out_fmt = sys.argv[3] if len(sys.argv) > 3 else None
+
+    res = export_since(sys.argv[1], since, fmt=out_fmt)
+    if res.part is None:
+        print(f"Nada novo em {res.out_dir} (pendentes: {res.rows_pending})")
+    else:
+        print(
+            f"Parte {res.part} ({res.fmt}) em {res.out_dir}: {res.rows_written} linhas, "
+            f"{res.decks_written} decklists (pendentes: {res.rows_pending})"
+        )
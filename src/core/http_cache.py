@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+    parsed: Any
+
+
+class ValidatorStore:
+    """
+    Guarda, por URL, os validadores HTTP (ETag, Last-Modified), o sha256 do corpo
+    e o resultado já parseado da última resposta 200.
+    Opcionalmente persiste em disco (pickle) para sobreviver entre execuções.
+    Guarda no máximo max_entries URLs (LRU), para a memória não crescer com a
+    profundidade das varreduras.
+    """
+
+    def __init__(self, path: str | Path | None = None, max_entries: int = 4096):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, "rb") as f:
+                    self._entries = OrderedDict(pickle.load(f))
+            except Exception:
+                self._entries = OrderedDict()
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def put(self, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[entry.url] = entry
+            self._entries.move_to_end(entry.url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with self._lock:
+            with open(tmp, "wb") as f:
+                pickle.dump(dict(self._entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(self.path)
+
+
+# store padrão do processo (compartilhado por crawler e decklists)
+VALIDATORS = ValidatorStore()
+
+
+@dataclass
+class RawPage:
+    """Corpo novo (200) ainda não parseado: saída da etapa de I/O de conditional_fetch."""
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+    text: str
+
+
+def conditional_fetch(
+    url: str,
+    timeout: int = 20,
+    store: ValidatorStore | None = None,
+) -> Tuple[Optional[CacheEntry], Optional[RawPage]]:
+    """
+    Só a parte de rede de conditional_get:
+      - (entrada, None) se nada mudou (304 ou mesmo sha256): o parse guardado vale;
+      - (None, RawPage) se o corpo é novo e precisa de parse (ver store_parsed).
+    """
+    from core.scheduler import http_get
+
+    store = store or VALIDATORS
+    entry = store.get(url)
+
+    headers = {}
+    if entry:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    r = http_get(url, timeout=timeout, headers=headers)
+
+    if r.status_code == 304 and entry:
+        return entry, None
+
+    r.raise_for_status()
+
+    etag = r.headers.get("ETag")
+    last_modified = r.headers.get("Last-Modified")
+    h = hashlib.sha256(r.content).hexdigest()
+
+    if entry and entry.content_hash == h:
+        entry.etag = etag or entry.etag
+        entry.last_modified = last_modified or entry.last_modified
+        return entry, None
+
+    return None, RawPage(url, etag, last_modified, h, r.text)
+
+
+def store_parsed(raw: RawPage, parsed: Any, store: ValidatorStore | None = None) -> CacheEntry:
+    """Grava o parse de um RawPage junto com os validadores dele."""
+    entry = CacheEntry(
+        url=raw.url,
+        etag=raw.etag,
+        last_modified=raw.last_modified,
+        content_hash=raw.content_hash,
+        parsed=parsed,
+    )
+    (store or VALIDATORS).put(entry)
+    return entry
+
+
+def conditional_get(
+    url: str,
+    parse: Callable[[str], Any],
+    timeout: int = 20,
+    store: ValidatorStore | None = None,
+) -> Tuple[CacheEntry, bool]:
+    """
+    GET condicional com reaproveitamento do parse.
+
+    - Envia If-None-Match / If-Modified-Since quando há validadores guardados.
+    - 304 -> devolve a entrada guardada, sem parsear.
+    - 200 sem validadores úteis -> compara o sha256 do corpo antes de parsear.
+    Retorna (entrada, changed), onde changed indica se o conteúdo mudou.
+    """
+    entry, raw = conditional_fetch(url, timeout=timeout, store=store)
+    if raw is None:
+        return entry, False
+    return store_parsed(raw, parse(raw.text), store), True
@@ -0,0 +1,420 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_JOBS_DB = Path.home() / "Desktop" / "Deck_Analysis" / "jobs.sqlite3"
+
+JOB_KINDS = ("deck", "meta", "standings")
+
+LEASE_S = 120.0          # job "running" sem heartbeat por mais que isso volta para a fila
+HEARTBEAT_S = 30.0
+MAX_ATTEMPTS = 3         # lease vencida nesta tentativa -> "failed" em vez de voltar para a fila
+RESULT_TTL_S = 6 * 3600  # resultado "done" reaproveitado por submissões iguais
+POLL_S = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           TEXT PRIMARY KEY,
+    kind         TEXT NOT NULL,
+    params       TEXT NOT NULL,
+    dedupe_key   TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    result       TEXT,
+    error        TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    created_at   REAL NOT NULL,
+    started_at   REAL,
+    finished_at  REAL,
+    lease_until  REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at);
+"""
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    params: dict
+    status: str             # queued | running | done | failed
+    attempts: int
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    error: Optional[str]
+    result: Optional[dict]
+
+
+class JobError(Exception):
+    """Falha "esperada" de um job (ex.: Pokémon inexistente); não é re-tentada."""
+
+
+# ================== FILA (SQLite) ==================
+
+def _connect(db_path: str | Path) -> sqlite3.Connection:
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _dedupe_key(kind: str, params: dict) -> str:
+    canon = json.dumps({"kind": kind, "params": params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+
+def _row_to_job(row) -> Job:
+    (id_, kind, params, status, attempts, created_at, started_at, finished_at, error, result) = row
+    return Job(
+        id=id_,
+        kind=kind,
+        params=json.loads(params),
+        status=status,
+        attempts=attempts,
+        created_at=created_at,
+        started_at=started_at,
+        finished_at=finished_at,
+        error=error,
+        result=json.loads(result) if result else None,
+    )
+
+
+_JOB_COLS = "id, kind, params, status, attempts, created_at, started_at, finished_at, error, result"
+
+
+class JobQueue:
+    """Fila durável de jobs num arquivo SQLite (WAL), segura entre processos."""
+
+    def __init__(self, db_path: str | Path = DEFAULT_JOBS_DB):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.db_path)
+        return conn
+
+    def submit(self, kind: str, params: dict) -> tuple[Job, bool]:
+        """
+        Enfileira um job. Submissões iguais (mesmo kind + params) caem no mesmo
+        job se ele estiver na fila, rodando ou pronto há menos de RESULT_TTL_S.
+        Retorna (job, deduplicado).
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Tipo de job desconhecido: {kind!r} (conhecidos: {list(JOB_KINDS)})")
+
+        key = _dedupe_key(kind, params)
+        now = time.time()
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"""
+                SELECT {_JOB_COLS} FROM jobs
+                WHERE dedupe_key = ?
+                  AND (status IN ('queued', 'running')
+                       OR (status = 'done' AND finished_at >= ?))
+                ORDER BY created_at DESC LIMIT 1
+                """,
+                (key, now - RESULT_TTL_S),
+            ).fetchone()
+            if row:
+                conn.execute("COMMIT")
+                return _row_to_job(row), True
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, dedupe_key, status, created_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, kind, json.dumps(params, sort_keys=True, ensure_ascii=False), key, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(job_id), False
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self.conn.execute(f"SELECT {_JOB_COLS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def claim(self) -> Optional[Job]:
+        """
+        Pega o job mais antigo da fila (ou um "running" com lease vencida, cujo
+        worker morreu / o servidor reiniciou) e marca como running. Um job cuja
+        lease venceu na tentativa MAX_ATTEMPTS vira "failed": um job que sempre
+        derruba o worker não volta para a fila para sempre.
+        """
+        now = time.time()
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, lease_until = NULL "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (
+                    f"Abandonado após {MAX_ATTEMPTS} tentativas sem terminar (lease vencida).",
+                    now,
+                    now,
+                    MAX_ATTEMPTS,
+                ),
+            )
+            row = conn.execute(
+                f"""
+                SELECT {_JOB_COLS} FROM jobs
+                WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)
+                ORDER BY created_at LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, lease_until = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (now, now + LEASE_S, row[0]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row[0])
+
+    def heartbeat(self, job_id: str) -> None:
+        self.conn.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running'",
+            (time.time() + LEASE_S, job_id),
+        )
+
+    def finish(self, job_id: str, result: dict) -> None:
+        self.conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ?, "
+            "lease_until = NULL WHERE id = ?",
+            (json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id),
+        )
+
+    def fail(self, job_id: str, error: str) -> None:
+        self.conn.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, lease_until = NULL "
+            "WHERE id = ?",
+            (error, time.time(), job_id),
+        )
+
+
+# ================== EXECUÇÃO ==================
+
+def _analyze_matches(matches: list, found: str, min_date: date, out_path: Path) -> dict:
+    from core.analysis import analyze_decklists, write_analysis_txt
+    from core.row_index import fetch_decklists
+
+    fetched, errors = fetch_decklists(matches)
+    decklists = [deck for _, deck in fetched]
+    if not decklists:
+        raise JobError("Nenhuma decklist pôde ser baixada/parseada.")
+
+    result = analyze_decklists(decklists)
+    write_analysis_txt(
+        out_path=out_path,
+        found_name=found,
+        min_date_br=min_date.strftime("%d/%m/%Y"),
+        result=result,
+    )
+    return {
+        "pokemon_found": found,
+        "matches_found": len(matches),
+        "decklists_parsed": len(decklists),
+        "errors_count": len(errors),
+        "report_path": str(out_path),
+        "analysis": asdict(result),
+    }
+
+
+def _run_deck_job(job: Job, reports_dir: Path) -> dict:
+    from core.pokeapi import build_candidates, resolve_pokemon_name_from_candidates
+    from core.row_index import find_pokemon_in_sources
+
+    p = job.params
+    min_date = date.fromisoformat(p["min_date"])
+
+    candidates = build_candidates(p["pokemon"])
+    found = resolve_pokemon_name_from_candidates(candidates)
+    if not found:
+        raise JobError(f"Pokémon não encontrado na PokéAPI. Tentativas: {candidates}")
+
+    matches = find_pokemon_in_sources(found, min_date, p.get("source"))
+    if not matches:
+        raise JobError(f"Não foram encontradas listas vencedoras de '{found}' desde {min_date}.")
+
+    out = reports_dir / f"analysis_{found}_deck_{job.id[:8]}.txt"
+    return _analyze_matches(matches, found, min_date, out)
+
+
+def _run_meta_job(job: Job, reports_dir: Path) -> dict:
+    """
+    Relatório do meta: analisa os top_n Pokémon principais (alts[0]) do período.
+    Com params["classify"], o arquétipo de cada linha vem do conteúdo da decklist.
+    """
+    from core.row_index import crawl_sources, resolve_sources
+
+    p = job.params
+    min_date = date.fromisoformat(p["min_date"])
+    top_n = int(p.get("top_n", 10))
+
+    rows = crawl_sources(min_date, resolve_sources(p.get("source"))).all()
+
+    by_main: dict[str, list] = {}
+    if p.get("classify"):
+        from core.archetype import UNKNOWN, classify_rows
+
+        for lr in classify_rows(rows):
+            if lr.label != UNKNOWN:
+                by_main.setdefault(lr.label, []).append(lr.row)
+    else:
+        for r in rows:
+            if r.alts:
+                by_main.setdefault(r.alts[0].strip().lower(), []).append(r)
+
+    ranked = sorted(by_main.items(), key=lambda kv: (-len(kv[1]), kv[0]))[:top_n]
+
+    archetypes = []
+    for rank, (main, matches) in enumerate(ranked, start=1):
+        out = reports_dir / f"analysis_{main}_deck_{job.id[:8]}.txt"
+        try:
+            res = _analyze_matches(matches, main, min_date, out)
+        except JobError as e:
+            res = {"pokemon_found": main, "matches_found": len(matches), "error": str(e)}
+        archetypes.append({"rank": rank, "main_pokemon": main, "wins_count": len(matches), **res})
+
+    return {
+        "total_rows_scanned": len(rows),
+        "unique_main_pokemon": len(by_main),
+        "archetypes": archetypes,
+    }
+
+
+def _run_standings_job(job: Job, reports_dir: Path) -> dict:
+    """
+    Varre (ou retoma) o top_n da classificação de cada torneio do período e
+    grava colocações + decklists no banco de standings (POKEMON_STANDINGS_DB).
+    """
+    from core.row_index import crawl_sources, resolve_sources
+    from core.standings import crawl_standings
+
+    p = job.params
+    min_date = date.fromisoformat(p["min_date"])
+
+    rows = crawl_sources(min_date, resolve_sources(p.get("source"))).all()
+    report = crawl_standings(rows, top_n=int(p.get("top_n", 8)))
+    return {**asdict(report), "deck_errors": report.deck_errors[:50], "deck_errors_count": len(report.deck_errors)}
+
+
+_RUNNERS = {"deck": _run_deck_job, "meta": _run_meta_job, "standings": _run_standings_job}
+
+
+def run_job(queue: JobQueue, job: Job, reports_dir: Path) -> None:
+    stop = threading.Event()
+
+    def beat():
+        hb_queue = JobQueue(queue.db_path)
+        while not stop.wait(HEARTBEAT_S):
+            hb_queue.heartbeat(job.id)
+
+    hb = threading.Thread(target=beat, daemon=True)
+    hb.start()
+    try:
+        result = _RUNNERS[job.kind](job, reports_dir)
+    except JobError as e:
+        queue.fail(job.id, str(e))
+    except Exception as e:
+        queue.fail(job.id, f"{type(e).__name__}: {e}")
+    else:
+        queue.finish(job.id, result)
+    finally:
+        stop.set()
+
+
+def _worker_main(db_path: str, reports_dir: str, stop_event) -> None:
+    queue = JobQueue(db_path)
+    reports = Path(reports_dir)
+    reports.mkdir(parents=True, exist_ok=True)
+    while not stop_event.is_set():
+        job = queue.claim()
+        if job is None:
+            stop_event.wait(POLL_S)
+            continue
+        run_job(queue, job, reports)
+
+
+class WorkerPool:
+    """
+    N processos que consomem a fila. Jobs interrompidos (processo morto,
+    servidor reiniciado) voltam para a fila quando a lease vence.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path = DEFAULT_JOBS_DB,
+        workers: int | None = None,
+        reports_dir: str | Path | None = None,
+    ):
+        self.db_path = Path(db_path)
+        self.workers = workers if workers is not None else int(os.environ.get("POKEMON_JOB_WORKERS", "2"))
+        self.reports_dir = Path(reports_dir) if reports_dir else self.db_path.parent / "jobs"
+        self._stop = multiprocessing.Event()
+        self._procs: list[multiprocessing.Process] = []
+        self._lock = None
+
+    def start(self) -> bool:
+        """
+        Sobe os workers, a não ser que outro processo (ex.: outro worker do
+        uvicorn --workers N) já tenha um pool sobre o mesmo banco: quem pega o
+        lock <db>.pool.lock é o dono até stop(). False se não for o dono.
+        """
+        from core.shared_store import FileLock
+
+        lock = FileLock(self.db_path.with_name(self.db_path.name + ".pool.lock"), timeout=0)
+        try:
+            lock.__enter__()
+        except TimeoutError:
+            return False
+        self._lock = lock
+
+        _connect(self.db_path).close()  # cria o schema antes dos workers
+        for _ in range(self.workers):
+            proc = multiprocessing.Process(
+                target=_worker_main,
+                args=(str(self.db_path), str(self.reports_dir), self._stop),
+                daemon=True,
+            )
+            proc.start()
+            self._procs.append(proc)
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        for proc in self._procs:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+        self._procs.clear()
+        if self._lock is not None:
+            self._lock.__exit__(None, None, None)
+            self._lock = None
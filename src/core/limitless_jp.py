@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import date
-from typing import Optional
-import hashlib
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
 
-import requests
-from bs4 import BeautifulSoup
+from core.deadline import DeadlineExceeded
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 BASE_URL = "https://limitlesstcg.com/tournaments/jp"
 SITE_BASE = "https://limitlesstcg.com"
@@ -19,12 +25,45 @@ def make_absolute_url(href: str | None) -> str | None:
     return href
 
 
-@dataclass
+@dataclass(frozen=True)
+class Source:
+    """Uma listagem de torneios do Limitless (mesmo layout de tabela da JP)."""
+    name: str
+    base_url: str
+    winner_col: int = 3
+
+
+# Listagens conhecidas; register_source() adiciona outras
+SOURCES: dict[str, Source] = {
+    "jp": Source("jp", BASE_URL),
+    "intl": Source("intl", f"{SITE_BASE}/tournaments"),
+}
+
+DEFAULT_SOURCE = "jp"
+
+
+def register_source(name: str, base_url: str, winner_col: int = 3) -> Source:
+    src = Source(name, base_url, winner_col)
+    SOURCES[name] = src
+    return src
+
+
+def get_source(source: str | Source) -> Source:
+    if isinstance(source, Source):
+        return source
+    try:
+        return SOURCES[source]
+    except KeyError:
+        raise ValueError(f"Fonte desconhecida: {source!r} (conhecidas: {sorted(SOURCES)})")
+
+
+@dataclass(slots=True)
 class MatchRow:
     row_date: date
     alts: list[str]
     tournament_url: Optional[str]
     decklist_url: Optional[str]
+    source: str = DEFAULT_SOURCE
 
 
 def _parse_iso_date(s: str) -> date:
@@ -33,8 +72,10 @@ def _parse_iso_date(s: str) -> date:
     return date(int(y), int(m), int(d))
 
 
-def _page_url(page: int) -> str:
-    return BASE_URL if page == 1 else f"{BASE_URL}?page={page}"
+def _page_url(page: int, base_url: str | None = None) -> str:
+    base_url = base_url or SOURCES[DEFAULT_SOURCE].base_url
+    sep = "&" if "?" in base_url else "?"
+    return base_url if page == 1 else f"{base_url}{sep}page={page}"
 
 
 def _extract_rows(soup: BeautifulSoup) -> list:
@@ -52,176 +93,445 @@ def _extract_rows(soup: BeautifulSoup) -> list:
     return out
 
 
-def find_pokemon_in_limitless_since(
-    pokemon_name: str,
-    min_date: date,
+def _parse_listing(html: str, winner_col: int = 3) -> list[tuple]:
+    """
+    Parseia uma página da listagem em tuplas simples, na ordem da página:
+      (iso_date, alts, tournament_href, decklist_href)
+    hrefs ficam como vieram do HTML (podem ser relativos).
+    O resultado é o que fica guardado no ValidatorStore para reuso em 304.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    out = []
+    for tr in _extract_rows(soup):
+        data_date = tr.get("data-date")
+        if not data_date:
+            continue
+
+        tds = tr.find_all("td", recursive=False)
+        if len(tds) <= winner_col:
+            # linha sem colunas suficientes ainda conta para o corte de data
+            out.append((data_date, None, None, None))
+            continue
+
+        # link do torneio (coluna Date)
+        a_date = tds[0].find("a", href=True)
+        tournament_href = a_date["href"] if a_date else None
+
+        # coluna Winner
+        winner_td = tds[winner_col]
+
+        # link da decklist (fica dentro do Winner)
+        decklist_href = None
+        a_deck = winner_td.find("a", href=True)
+        if a_deck:
+            href = a_deck["href"]
+            if "/decks/list/" in href:
+                decklist_href = href
+
+        # alts das imgs dentro do Winner
+        alts: list[str] = []
+        for img in winner_td.find_all("img"):
+            alt = (img.get("alt") or "").strip().lower()
+            if alt:
+                alts.append(alt)
+
+        out.append((data_date, tuple(alts), tournament_href, decklist_href))
+
+    # libera a árvore agora (ela tem ciclos pai<->filho e só sairia no GC)
+    soup.decompose()
+    return out
+
+
+# ================== LOCALIZAÇÃO DE PÁGINA ==================
+
+def _page_reached(src: Source, page: int, target: date, timeout: int):
+    """
+    (a página já chegou em target?, entrada do cache). "Chegou" = a linha mais
+    antiga da página tem data <= target, ou a página está vazia (fim da listagem).
+    """
+    from core.http_cache import conditional_get
+
+    parse = partial(_parse_listing, winner_col=src.winner_col)
+    entry, _ = conditional_get(_page_url(page, src.base_url), parse, timeout=timeout)
+    rows = entry.parsed
+    return (not rows or _parse_iso_date(rows[-1][0]) <= target), entry
+
+
+def _locate(src: Source, target: date, timeout: int, max_pages: int):
+    """(primeira página com linhas de data <= target, entrada dela ou None); ver locate_page."""
+    probes: dict[int, tuple] = {}
+
+    def reached(page: int) -> bool:
+        probes[page] = _page_reached(src, page, target, timeout)
+        return probes[page][0]
+
+    # galope: 1, 2, 4, 8... até a primeira sonda que já chegou no alvo
+    lo, hi = 0, 1
+    while hi <= max_pages and not reached(hi):
+        lo, hi = hi, hi * 2
+    hi = min(hi, max_pages + 1)
+
+    # busca binária em (lo, hi]: lo ainda não chegou, hi já chegou (ou passou de max_pages)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if reached(mid):
+            hi = mid
+        else:
+            lo = mid
+
+    entry = probes.get(hi, (None, None))[1]
+    return hi, entry
+
+
+def locate_page(
+    target: date,
     timeout: int = 20,
     max_pages: int = 500,
-) -> list[MatchRow]:
+    source: str | Source = DEFAULT_SOURCE,
+) -> int:
     """
-    Varre páginas (?page=N) da lista JP, coletando linhas cujo tr[data-date] >= min_date.
-    Em cada linha, extrai:
-      - data
-      - alts das imgs da coluna Winner
-      - tournament_url (link na coluna Date)
-      - decklist_url (link /decks/list/... dentro da coluna Winner)
-    Retorna somente as linhas em que pokemon_name aparece em alts.
+    Primeira página (?page=N) da listagem `source` com alguma linha de data <= target.
+
+    A listagem vem em ordem decrescente de data, então "a página já chegou em
+    target" é falso até certa página e verdadeiro dali em diante: sondas
+    galopantes (1, 2, 4, 8...) acham um intervalo e a busca binária no
+    data-date acha a página, com O(log páginas) requisições.
+    Retorna max_pages + 1 se target for anterior a todas as max_pages páginas.
     """
+    return _locate(get_source(source), target, timeout, max_pages)[0]
 
-    pokemon_name = pokemon_name.strip().lower()
-    matches: list[MatchRow] = []
 
+def _fetch_page_rows(src: Source, page: int, timeout: int) -> tuple[str, list]:
+    """
+    (sha256 do corpo, linhas parseadas) de uma página, sem passar pelo
+    ValidatorStore: guardar o parse de cada página varrida faria a memória
+    crescer com a profundidade da varredura. Só a página 1 (versão dos dados)
+    e as sondas de _locate usam GET condicional.
+    """
+    from core.scheduler import http_get
+
+    r = http_get(_page_url(page, src.base_url), timeout=timeout)
+    r.raise_for_status()
+    return hashlib.sha256(r.content).hexdigest(), _parse_listing(r.text, winner_col=src.winner_col)
+
+
+def _iter_rows(
+    src: Source,
+    min_date: date,
+    timeout: int,
+    max_pages: int,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    first_entry=None,
+    max_date: Optional[date] = None,
+    start_page: int = 1,
+) -> Iterator[MatchRow]:
+    from core.http_cache import conditional_get
+
+    parse = partial(_parse_listing, winner_col=src.winner_col)
     prev_hash: Optional[str] = None
+    yielded = 0
 
-    for page in range(1, max_pages + 1):
-        url = _page_url(page)
-        r = requests.get(url, timeout=timeout)
-        r.raise_for_status()
+    for page in range(start_page, max_pages + 1):
+        if page == start_page and first_entry is not None:
+            content_hash, rows = first_entry.content_hash, first_entry.parsed
+        elif page == 1:
+            entry, _ = conditional_get(_page_url(page, src.base_url), parse, timeout=timeout)
+            content_hash, rows = entry.content_hash, entry.parsed
+        else:
+            content_hash, rows = _fetch_page_rows(src, page, timeout)
 
         # anti-loop: se o conteúdo repetir, paramos
-        h = hashlib.sha256(r.content).hexdigest()
-        if prev_hash == h:
-            break
-        prev_hash = h
-
-        soup = BeautifulSoup(r.text, "html.parser")
-        trs = _extract_rows(soup)
+        if prev_hash == content_hash:
+            return
+        prev_hash = content_hash
 
         # acabou a paginação
-        if not trs:
-            break
+        if not rows:
+            return
 
         should_stop = False
 
-        for tr in trs:
-            data_date = tr.get("data-date")
-            if not data_date:
-                continue
-
-            row_date = _parse_iso_date(data_date)
+        for iso, alts, tournament_href, decklist_href in rows:
+            row_date = _parse_iso_date(iso)
 
             # atingiu data anterior ao corte -> para tudo
             if row_date < min_date:
                 should_stop = True
                 break
 
-            tds = tr.find_all("td", recursive=False)
-            if len(tds) < 4:
+            if alts is None or (max_date is not None and row_date > max_date):
                 continue
 
-            # link do torneio (coluna Date)
-            a_date = tds[0].find("a", href=True)
-            tournament_url = make_absolute_url(a_date["href"]) if a_date else None
-
-            # coluna Winner
-            winner_td = tds[3]
-
-            # link da decklist (fica dentro do Winner)
-            decklist_url = None
-            a_deck = winner_td.find("a", href=True)
-            if a_deck:
-                href = a_deck["href"]
-                if "/decks/list/" in href:
-                    decklist_url = make_absolute_url(href)
-
-            # alts das imgs dentro do Winner
-            imgs = winner_td.find_all("img")
-            alts: list[str] = []
-            for img in imgs:
-                alt = (img.get("alt") or "").strip().lower()
-                if alt:
-                    alts.append(alt)
-
-            if pokemon_name in alts:
-                matches.append(
-                    MatchRow(
-                        row_date=row_date,
-                        alts=alts,
-                        tournament_url=tournament_url,
-                        decklist_url=decklist_url,
-                    )
-                )
+            yielded += 1
+            yield MatchRow(
+                row_date=row_date,
+                alts=list(alts),
+                tournament_url=make_absolute_url(tournament_href),
+                decklist_url=make_absolute_url(decklist_href),
+                source=src.name,
+            )
+
+        if progress:
+            progress(src.name, page, yielded)
 
         if should_stop:
-            break
+            return
 
-    return matches
 
-def list_winner_decks_since(
+def iter_winner_rows(
     min_date: date,
     timeout: int = 20,
     max_pages: int = 500,
-) -> list[MatchRow]:
+    source: str | Source = DEFAULT_SOURCE,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    max_date: Optional[date] = None,
+) -> Iterator[MatchRow]:
     """
-    Varre páginas do Limitless JP e retorna todas as linhas vencedoras (MatchRow)
-    com row_date >= min_date, sem filtrar por pokemon específico.
+    Gera as linhas vencedoras (MatchRow, URLs absolutas) da listagem `source`
+    com row_date >= min_date, página a página, conforme são parseadas.
+
+    Cada página vira tuplas compactas logo no parse (a árvore do BeautifulSoup é
+    descartada na hora) e só a página 1 e as O(log páginas) sondas de
+    locate_page ficam no ValidatorStore; as demais são lidas e descartadas.
+    Então o consumo de memória não cresce com o número de páginas varridas —
+    o consumidor decide o que guardar.
+    progress(fonte, página, linhas_até_agora) é chamado após cada página.
+
+    Com max_date, só linhas com row_date <= max_date, e a varredura começa na
+    página localizada por locate_page (sem ler as páginas mais recentes).
     """
+    src = get_source(source)
+    if max_date is None:
+        return _iter_rows(src, min_date, timeout, max_pages, progress)
+    start, entry = _locate(src, max_date, timeout, max_pages)
+    return _iter_rows(
+        src, min_date, timeout, max_pages, progress,
+        first_entry=entry, max_date=max_date, start_page=start,
+    )
+
+
+class PartialCrawl(DeadlineExceeded):
+    """O prazo acabou no meio da varredura; rows = linhas já coletadas."""
+
+    def __init__(self, stage: str, rows: list[MatchRow]):
+        super().__init__(stage)
+        self.rows = rows
+
+
+# (função, parâmetros) -> (sha256 da página 1, resultado)
+# Se a página 1 não mudou, nenhum torneio novo entrou e o resultado continua válido.
+# LRU limitado pelo total de linhas guardadas (não pelo número de chaves):
+# resultados grandes ("all" de uma listagem longa) expulsam os menores.
+CRAWL_MEMO_MAX_ROWS = 50_000
+_CRAWL_MEMO: OrderedDict[tuple, tuple[str, list[MatchRow]]] = OrderedDict()
+_CRAWL_MEMO_LOCK = threading.Lock()
+_crawl_memo_rows = 0
+
+
+def _memo_put(memo_key: tuple, page1_hash: str, matches: list[MatchRow]) -> None:
+    global _crawl_memo_rows
+    if len(matches) > CRAWL_MEMO_MAX_ROWS:
+        return
+    with _CRAWL_MEMO_LOCK:
+        old = _CRAWL_MEMO.pop(memo_key, None)
+        if old is not None:
+            _crawl_memo_rows -= len(old[1])
+        _CRAWL_MEMO[memo_key] = (page1_hash, list(matches))
+        _crawl_memo_rows += len(matches)
+        while _crawl_memo_rows > CRAWL_MEMO_MAX_ROWS:
+            _, (_, evicted) = _CRAWL_MEMO.popitem(last=False)
+            _crawl_memo_rows -= len(evicted)
+
+
+def _collect(
+    memo_key: tuple,
+    src: Source,
+    min_date: date,
+    timeout: int,
+    max_pages: int,
+    keep: Callable[[MatchRow], bool],
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    max_date: Optional[date] = None,
+) -> list[MatchRow]:
+    from core.http_cache import conditional_get
+
+    parse = partial(_parse_listing, winner_col=src.winner_col)
+    first, _ = conditional_get(_page_url(1, src.base_url), parse, timeout=timeout)
+    _VERSION[src.name] = (time.monotonic(), first.content_hash)
+
+    with _CRAWL_MEMO_LOCK:
+        memo = _CRAWL_MEMO.get(memo_key)
+        if memo is not None:
+            _CRAWL_MEMO.move_to_end(memo_key)
+    if memo and memo[0] == first.content_hash:
+        if progress:
+            progress(src.name, 1, len(memo[1]))
+        return list(memo[1])
+
+    # a página 1 acabou de entrar no ValidatorStore: dentro de iter_winner_rows
+    # ela é só revalidada (304 ou mesmo sha256, sem parse de novo)
+    rows = iter_winner_rows(min_date, timeout, max_pages, src, progress, max_date)
     matches: list[MatchRow] = []
-    prev_hash: Optional[str] = None
+    try:
+        for r in rows:
+            if keep(r):
+                matches.append(r)
+    except DeadlineExceeded as e:
+        # resultado incompleto: não vai para o memo
+        raise PartialCrawl(str(e), matches) from e
+
+    _memo_put(memo_key, first.content_hash, matches)
+    return matches
 
-    for page in range(1, max_pages + 1):
-        url = _page_url(page)
-        r = requests.get(url, timeout=timeout)
-        r.raise_for_status()
 
-        # anti-loop: se o conteúdo repetir, paramos
-        h = hashlib.sha256(r.content).hexdigest()
-        if prev_hash == h:
-            break
-        prev_hash = h
+_VERSION: dict[str, tuple[float, str]] = {}
+_VERSION_REFRESHING: set[str] = set()
+_VERSION_LOCK = threading.Lock()
 
-        soup = BeautifulSoup(r.text, "html.parser")
-        trs = _extract_rows(soup)
 
-        if not trs:
-            break
+def _combine_versions(hashes: list[str]) -> str:
+    if len(hashes) == 1:
+        return hashes[0]
+    return hashlib.sha256("|".join(hashes).encode("ascii")).hexdigest()
 
-        should_stop = False
 
-        for tr in trs:
-            data_date = tr.get("data-date")
-            if not data_date:
-                continue
+def listing_version(
+    sources: list[str] | None = None,
+    timeout: int = 20,
+    max_age: float = 60.0,
+) -> str:
+    """
+    Versão atual dos dados: hash das páginas 1 das listagens (muda quando entra
+    torneio novo). Cada fonte é revalidada com GET condicional no máximo a cada
+    max_age segundos. Sem `sources`, considera todas as fontes registradas.
+    """
+    from core.http_cache import conditional_get
 
-            row_date = _parse_iso_date(data_date)
+    names = sorted(sources or SOURCES)
+    now = time.monotonic()
+
+    hashes = []
+    for name in names:
+        cached = _VERSION.get(name)
+        if cached and now - cached[0] < max_age:
+            hashes.append(cached[1])
+            continue
+        src = get_source(name)
+        parse = partial(_parse_listing, winner_col=src.winner_col)
+        entry, _ = conditional_get(_page_url(1, src.base_url), parse, timeout=timeout)
+        _VERSION[name] = (now, entry.content_hash)
+        hashes.append(entry.content_hash)
+
+    return _combine_versions(hashes)
 
-            if row_date < min_date:
-                should_stop = True
-                break
 
-            tds = tr.find_all("td", recursive=False)
-            if len(tds) < 4:
+def _refresh_version(name: str, timeout: int) -> None:
+    try:
+        listing_version([name], timeout=timeout, max_age=0)
+    except Exception:
+        pass  # fica a versão antiga; a próxima consulta tenta de novo
+    finally:
+        with _VERSION_LOCK:
+            _VERSION_REFRESHING.discard(name)
+
+
+def known_listing_version(
+    sources: list[str] | None = None,
+    timeout: int = 20,
+    max_age: float = 60.0,
+) -> Optional[str]:
+    """
+    listing_version sem esperar a rede: usa o último hash conhecido de cada
+    fonte (de listing_version ou da página 1 lida numa varredura). Fontes com
+    hash mais velho que max_age são revalidadas numa thread em segundo plano.
+    Devolve None enquanto alguma fonte ainda não tiver hash.
+    """
+    names = sorted(sources or SOURCES)
+    now = time.monotonic()
+
+    hashes = []
+    for name in names:
+        cached = _VERSION.get(name)
+        if cached:
+            hashes.append(cached[1])
+        if cached and now - cached[0] < max_age:
+            continue
+        with _VERSION_LOCK:
+            if name in _VERSION_REFRESHING:
                 continue
+            _VERSION_REFRESHING.add(name)
+        threading.Thread(target=_refresh_version, args=(name, timeout), daemon=True).start()
 
-            a_date = tds[0].find("a", href=True)
-            tournament_url = a_date["href"] if a_date else None
-
-            winner_td = tds[3]
-
-            decklist_url = None
-            a_deck = winner_td.find("a", href=True)
-            if a_deck:
-                href = a_deck["href"]
-                if "/decks/list/" in href:
-                    decklist_url = href
-
-            imgs = winner_td.find_all("img")
-            alts: list[str] = []
-            for img in imgs:
-                alt = (img.get("alt") or "").strip().lower()
-                if alt:
-                    alts.append(alt)
-
-            matches.append(
-                MatchRow(
-                    row_date=row_date,
-                    alts=alts,
-                    tournament_url=tournament_url,
-                    decklist_url=decklist_url,
-                )
-            )
+    if len(hashes) < len(names):
+        return None
+    return _combine_versions(hashes)
 
-        if should_stop:
-            break
 
-    return matches
+def find_pokemon_in_limitless_since(
+    pokemon_name: str,
+    min_date: date,
+    timeout: int = 20,
+    max_pages: int = 500,
+    source: str | Source = DEFAULT_SOURCE,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    max_date: Optional[date] = None,
+) -> list[MatchRow]:
+    """
+    Varre páginas (?page=N) da listagem `source` (JP por padrão), coletando linhas cujo tr[data-date] >= min_date.
+    Em cada linha, extrai:
+      - data
+      - alts das imgs da coluna Winner
+      - tournament_url (link na coluna Date)
+      - decklist_url (link /decks/list/... dentro da coluna Winner)
+    Retorna somente as linhas em que pokemon_name aparece em alts
+    (filtro sobre iter_winner_rows).
+
+    progress(fonte, página, linhas_até_agora) é chamado após cada página.
+
+    A página 1 é pedida com GET condicional (ETag / If-Modified-Since); se ela
+    não mudou desde a última varredura, o resultado anterior é reusado.
+
+    max_date fecha a janela (row_date <= max_date) e pula as páginas mais
+    recentes via locate_page.
+    """
+    src = get_source(source)
+    pokemon_name = pokemon_name.strip().lower()
+    return _collect(
+        ("pokemon", src, pokemon_name, min_date, max_date, max_pages),
+        src,
+        min_date,
+        timeout,
+        max_pages,
+        keep=lambda r: pokemon_name in r.alts,
+        progress=progress,
+        max_date=max_date,
+    )
+
+
+def list_winner_decks_since(
+    min_date: date,
+    timeout: int = 20,
+    max_pages: int = 500,
+    source: str | Source = DEFAULT_SOURCE,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    max_date: Optional[date] = None,
+) -> list[MatchRow]:
+    """
+    Varre páginas da listagem `source` (JP por padrão) e retorna todas as linhas vencedoras (MatchRow)
+    com row_date >= min_date (e <= max_date, se dado), sem filtrar por pokemon específico.
+    Lista materializada de iter_winner_rows (URLs absolutas).
+    """
+    src = get_source(source)
+    return _collect(
+        ("all", src, min_date, max_date, max_pages),
+        src,
+        min_date,
+        timeout,
+        max_pages,
+        keep=lambda r: True,
+        progress=progress,
+        max_date=max_date,
+    )
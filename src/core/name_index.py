@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from core.pokeapi import build_candidates, normalize_tokens
+
+
+@dataclass
+class Suggestion:
+    name: str
+    distance: int
+    wins: int
+
+
+def _grams(s: str, n: int = 3) -> Set[str]:
+    s = f"^{s}$"
+    if len(s) <= n:
+        return {s}
+    return {s[i:i + n] for i in range(len(s) - n + 1)}
+
+
+def _levenshtein(a: str, b: str, max_dist: int) -> int:
+    """Distância de edição com corte: devolve max_dist + 1 se passar do limite."""
+    if abs(len(a) - len(b)) > max_dist:
+        return max_dist + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        cur = [i] + [0] * len(b)
+        best = i
+        for j, cb in enumerate(b, start=1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if cur[j] < best:
+                best = cur[j]
+        if best > max_dist:
+            return max_dist + 1
+        prev = cur
+    return prev[-1]
+
+
+class NameIndex:
+    """
+    Índice em memória de nomes de Pokémon (PokéAPI + alts vistos no Limitless).
+
+    - trigramas -> nomes: gera poucos candidatos para a distância de edição;
+    - lista ordenada de nomes: autocomplete por prefixo com bisect.
+    Ranking: distância, forma mais específica, match exato, vitórias (wins), tamanho, nome.
+    """
+
+    def __init__(self, names: Iterable[str] = (), wins: Optional[Dict[str, int]] = None):
+        self.wins: Dict[str, int] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._sorted: List[str] = []
+        for name in names:
+            self.add(name)
+        for name, w in (wins or {}).items():
+            self.add(name, w)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.wins
+
+    def __len__(self) -> int:
+        return len(self.wins)
+
+    def add(self, name: str, wins: int = 0) -> None:
+        name = name.strip().lower()
+        if not name:
+            return
+        if name not in self.wins:
+            self.wins[name] = 0
+            for g in _grams(name):
+                self._grams.setdefault(g, set()).add(name)
+            i = bisect_left(self._sorted, name)
+            self._sorted.insert(i, name)
+        self.wins[name] += wins
+
+    def prefix(self, prefix: str, limit: int = 50) -> List[str]:
+        out = []
+        i = bisect_left(self._sorted, prefix)
+        while i < len(self._sorted) and len(out) < limit and self._sorted[i].startswith(prefix):
+            out.append(self._sorted[i])
+            i += 1
+        return out
+
+    def suggest(self, q: str, limit: int = 10, max_distance: int = 3) -> List[Suggestion]:
+        keys = build_candidates(q)
+        plain = "-".join(normalize_tokens(q))
+        if plain and plain not in keys:
+            keys.append(plain)
+        if not keys:
+            return []
+
+        best: Dict[str, tuple] = {}
+        # keys[0] é a forma mais específica (ex.: charizard-mega-x)
+        for rank, key in enumerate(keys):
+            # candidatos: os que mais compartilham trigramas + prefixo
+            key_grams = _grams(key)
+            overlap: Counter = Counter()
+            for g in key_grams:
+                for name in self._grams.get(g, ()):
+                    overlap[name] += 1
+            candidates = {name for name, _ in overlap.most_common(32)}
+            candidates.update(self.prefix(key, limit=limit * 2))
+
+            for name in candidates:
+                if name == key or name.startswith(key):
+                    d = 0
+                elif len(key_grams) - overlap[name] > 3 * max_distance + 1:
+                    # cada edição destrói no máximo 3 trigramas (+1 pelo "$" final
+                    # no caso de prefixo): não tem como ficar dentro do limite
+                    continue
+                else:
+                    # distância até o nome inteiro ou até o prefixo (autocomplete)
+                    d = _levenshtein(key, name, max_distance)
+                    if d and len(name) > len(key):
+                        d = min(d, _levenshtein(key, name[:len(key)], max_distance))
+                if d > max_distance:
+                    continue
+                score = (d, rank, name != key)
+                if name not in best or score < best[name]:
+                    best[name] = score
+
+        scored = [(*sc, -self.wins[name], len(name), name) for name, sc in best.items()]
+        scored.sort()
+        return [Suggestion(name=s[5], distance=s[0], wins=-s[3]) for s in scored[:limit]]
+
+
+def build_name_index(alts_lists: Iterable[Sequence[str]] = (), timeout: int = 10) -> NameIndex:
+    """
+    Nomes da PokéAPI (se disponível) + alts das linhas vencedoras (MatchRow.alts),
+    com as vitórias contadas pelo alt principal (alts[0], mesma regra do top10).
+    """
+    from core.pokeapi import list_pokemon_names
+
+    try:
+        names = list_pokemon_names(timeout=timeout)
+    except Exception:
+        names = []
+
+    index = NameIndex(names)
+    for alts in alts_lists:
+        for alt in alts:
+            index.add(alt)
+        if alts:
+            index.add(alts[0], 1)
+    return index
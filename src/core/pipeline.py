@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# Pipeline de duas etapas para backfills grandes (milhares de páginas):
+#   I/O:   threads baixam (GET condicional) e entregam o corpo cru + URL;
+#   parse: processos rodam o BeautifulSoup, fora do GIL das threads de rede.
+# Filas limitadas entre as etapas: se o parse atrasa, os downloads esperam
+# (backpressure) em vez de acumular HTML na memória.
+
+DEFAULT_QUEUE_SIZE = 64
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    workers: int
+    items: int = 0
+    busy_s: float = 0.0     # fetch: esperando a rede; parse: parseando (no processo)
+    blocked_s: float = 0.0  # parado com o item pronto, esperando vaga na fila seguinte
+
+    def utilization(self, wall_s: float) -> float:
+        """Fração do tempo (workers x duração) em que a etapa trabalhou."""
+        if wall_s <= 0 or self.workers <= 0:
+            return 0.0
+        return min(1.0, self.busy_s / (wall_s * self.workers))
+
+
+@dataclass
+class PipelineStats:
+    fetch: StageStats
+    parse: StageStats
+    wall_s: float = 0.0
+    unchanged: int = 0      # 304 / mesmo sha256: o parse guardado foi reaproveitado
+    errors: int = 0
+    bytes_in: int = 0
+
+    def as_dict(self) -> dict:
+        out = asdict(self)
+        out["fetch"]["utilization"] = round(self.fetch.utilization(self.wall_s), 3)
+        out["parse"]["utilization"] = round(self.parse.utilization(self.wall_s), 3)
+        return out
+
+
+@dataclass
+class PageResult:
+    url: str
+    parsed: Any = None
+    changed: bool = False
+    error: Optional[str] = None
+
+
+def _timed_parse(parse: Callable[[str], Any], text: str) -> tuple:
+    """Roda no processo de parse: (resultado, segundos parseando)."""
+    t0 = time.perf_counter()
+    result = parse(text)
+    return result, time.perf_counter() - t0
+
+
+class _InlineExecutor:
+    """parse_workers=0: parse na própria thread de despacho (listas pequenas, depuração)."""
+
+    def submit(self, fn, *args) -> Future:
+        fut: Future = Future()
+        try:
+            fut.set_result(fn(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+        return fut
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        pass
+
+
+class FetchParsePipeline:
+    """
+    run(urls) gera PageResult conforme as páginas ficam prontas (ordem de
+    chegada, não a de urls). `parse` precisa ser importável pelos processos
+    filhos (função de módulo ou functools.partial de uma).
+
+    Páginas sem mudança (304 / mesmo hash) saem direto da etapa de I/O com o
+    parse guardado no ValidatorStore; páginas novas passam pelo pool e o
+    resultado é gravado com os validadores (como conditional_get).
+    stats: utilização e tempo bloqueado de cada etapa.
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[str], Any],
+        fetch_workers: int = 8,
+        parse_workers: Optional[int] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        timeout: int = 20,
+        store=None,
+    ):
+        self.parse = parse
+        self.fetch_workers = max(1, fetch_workers)
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else max(0, parse_workers)
+        self.queue_size = max(1, queue_size)
+        self.timeout = timeout
+        self.store = store
+        # parse inline (0 processos) conta como 1 worker: a thread de despacho
+        self.stats = PipelineStats(StageStats(self.fetch_workers), StageStats(self.parse_workers or 1))
+
+    def _executor(self):
+        if self.parse_workers == 0:
+            return _InlineExecutor()
+        import multiprocessing
+
+        # spawn: nada de fork com as threads de rede (e seus locks) já rodando
+        return ProcessPoolExecutor(self.parse_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def run(self, urls: Iterable[str]) -> Iterator[PageResult]:
+        from core.http_cache import conditional_fetch, store_parsed
+
+        stats = self.stats
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        todo: queue.Queue = queue.Queue()
+        for url in dict.fromkeys(urls):
+            todo.put(url)
+        raw_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        out_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        def put(q: queue.Queue, item, stage: StageStats) -> bool:
+            """put com backpressure; False se o pipeline foi interrompido."""
+            t0 = time.perf_counter()
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            with lock:
+                stage.blocked_s += time.perf_counter() - t0
+            return not stop.is_set()
+
+        def fetcher() -> None:
+            while not stop.is_set():
+                try:
+                    url = todo.get_nowait()
+                except queue.Empty:
+                    return
+                t0 = time.perf_counter()
+                try:
+                    entry, raw = conditional_fetch(url, timeout=self.timeout, store=self.store)
+                except Exception as e:
+                    with lock:
+                        stats.fetch.busy_s += time.perf_counter() - t0
+                        stats.errors += 1
+                    if not put(out_q, PageResult(url, error=f"{type(e).__name__}: {e}"), stats.fetch):
+                        return
+                    continue
+                with lock:
+                    stats.fetch.busy_s += time.perf_counter() - t0
+                    stats.fetch.items += 1
+                if raw is None:
+                    with lock:
+                        stats.unchanged += 1
+                    item, target = PageResult(url, entry.parsed, changed=False), out_q
+                else:
+                    with lock:
+                        stats.bytes_in += len(raw.text)
+                    item, target = raw, raw_q
+                if not put(target, item, stats.fetch):
+                    return
+
+        def close_fetch(threads: List[threading.Thread]) -> None:
+            for t in threads:
+                t.join()
+            put(raw_q, _DONE, stats.fetch)
+
+        def dispatcher(executor) -> None:
+            max_inflight = max(1, self.parse_workers) * 2
+            inflight: Dict[Future, Any] = {}
+            fetch_done = False
+            while not stop.is_set():
+                # enche o pool (até max_inflight páginas parseando ou na fila do pool)
+                while not fetch_done and len(inflight) < max_inflight:
+                    try:
+                        raw = raw_q.get(timeout=0.05 if inflight else 0.1)
+                    except queue.Empty:
+                        break
+                    if raw is _DONE:
+                        fetch_done = True
+                        break
+                    inflight[executor.submit(_timed_parse, self.parse, raw.text)] = raw
+                if not inflight:
+                    if fetch_done:
+                        break
+                    continue
+
+                finished, _ = wait(inflight, timeout=0.05, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    raw = inflight.pop(fut)
+                    try:
+                        parsed, busy = fut.result()
+                    except Exception as e:
+                        with lock:
+                            stats.errors += 1
+                        result = PageResult(raw.url, error=f"{type(e).__name__}: {e}")
+                    else:
+                        store_parsed(raw, parsed, self.store)
+                        with lock:
+                            stats.parse.items += 1
+                            stats.parse.busy_s += busy
+                        result = PageResult(raw.url, parsed, changed=True)
+                    if not put(out_q, result, stats.parse):
+                        return
+            put(out_q, _DONE, stats.parse)
+
+        started = time.perf_counter()
+        executor = self._executor()
+        fetchers = [threading.Thread(target=fetcher, daemon=True) for _ in range(self.fetch_workers)]
+        for t in fetchers:
+            t.start()
+        closer = threading.Thread(target=close_fetch, args=(fetchers,), daemon=True)
+        closer.start()
+        disp = threading.Thread(target=dispatcher, args=(executor,), daemon=True)
+        disp.start()
+
+        try:
+            while True:
+                item = out_q.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            # consumidor parou antes do fim: solta quem estiver esperando vaga nas filas
+            stop.set()
+            disp.join()
+            closer.join()
+            executor.shutdown(wait=True, cancel_futures=True)
+            stats.wall_s = time.perf_counter() - started
+
+
+# ================== BACKFILLS ==================
+
+def backfill_decklists(
+    urls: Iterable[str],
+    fetch_workers: int = 8,
+    parse_workers: Optional[int] = None,
+    timeout: int = 20,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> tuple[Dict[str, dict], List[dict], PipelineStats]:
+    """
+    Decklists de muitas URLs pelo pipeline: ({url: deck}, erros, stats).
+    Mesmo formato de fetch_decklist; URLs repetidas são baixadas uma vez.
+    """
+    from core.decklist import parse_decklist_html
+
+    urls = list(dict.fromkeys(u for u in urls if u))
+    pipe = FetchParsePipeline(parse_decklist_html, fetch_workers, parse_workers, timeout=timeout)
+    decks: Dict[str, dict] = {}
+    errors: List[dict] = []
+    for i, res in enumerate(pipe.run(urls), start=1):
+        if res.error:
+            errors.append({"decklist_url": res.url, "error": res.error})
+        else:
+            decks[res.url] = {k: list(v) for k, v in res.parsed.items()}
+        if progress:
+            progress(i, len(urls))
+    return decks, errors, pipe.stats
+
+
+def backfill_listing(
+    min_date: date,
+    max_date: Optional[date] = None,
+    source: str = "jp",
+    fetch_workers: int = 4,
+    parse_workers: Optional[int] = None,
+    timeout: int = 20,
+    max_pages: int = 500,
+) -> tuple[list, PipelineStats]:
+    """
+    Linhas vencedoras de [min_date, max_date] de uma listagem, com as páginas
+    baixadas e parseadas em paralelo: o intervalo de páginas sai de
+    locate_page (O(log páginas) sondas), então não é preciso ler página a
+    página até o corte como em iter_winner_rows. Mesmas linhas, mesma ordem.
+    """
+    from core.limitless_jp import (
+        MatchRow,
+        _page_url,
+        _parse_iso_date,
+        _parse_listing,
+        get_source,
+        locate_page,
+        make_absolute_url,
+    )
+
+    src = get_source(source)
+    first = locate_page(max_date, timeout, max_pages, src) if max_date else 1
+    # última página com linhas >= min_date = primeira que já tem linha anterior a min_date
+    last = min(max_pages, locate_page(min_date - timedelta(days=1), timeout, max_pages, src))
+
+    urls = [_page_url(page, src.base_url) for page in range(first, last + 1)]
+    pipe = FetchParsePipeline(
+        partial(_parse_listing, winner_col=src.winner_col), fetch_workers, parse_workers, timeout=timeout
+    )
+    pages = {res.url: res for res in pipe.run(urls)}
+
+    rows = []
+    prev = None
+    for url in urls:
+        res = pages[url]
+        if res.error:
+            raise RuntimeError(f"Falha na página {url}: {res.error}")
+        # anti-loop, como em _iter_rows: página repetida = fim da listagem
+        if res.parsed == prev:
+            break
+        prev = res.parsed
+        for iso, alts, tournament_href, decklist_href in res.parsed:
+            row_date = _parse_iso_date(iso)
+            if alts is None or row_date < min_date or (max_date and row_date > max_date):
+                continue
+            rows.append(
+                MatchRow(
+                    row_date=row_date,
+                    alts=list(alts),
+                    tournament_url=make_absolute_url(tournament_href),
+                    decklist_url=make_absolute_url(decklist_href),
+                    source=src.name,
+                )
+            )
+    return rows, pipe.stats
+
+
+if __name__ == "__main__":
+    # python -m core.pipeline [AAAA-MM-DD] [fonte] -> backfill da listagem + decklists, com stats por etapa
+    import json
+    import sys
+
+    since = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else date(2026, 1, 23)
+    src_name = sys.argv[2] if len(sys.argv) > 2 else "jp"
+
+    found_rows, listing_stats = backfill_listing(since, source=src_name)
+    found_decks, deck_errors, deck_stats = backfill_decklists(r.decklist_url for r in found_rows)
+    print(f"Linhas: {len(found_rows)} | decklists: {len(found_decks)} (erros: {len(deck_errors)})")
+    print("listagem:", json.dumps(listing_stats.as_dict(), indent=2))
+    print("decklists:", json.dumps(deck_stats.as_dict(), indent=2))
@@ -1,9 +1,9 @@
 import re
 import unicodedata
-import requests
 from typing import Optional
 
 API = "https://pokeapi.co/api/v2/pokemon/{}"
+API_LIST = "https://pokeapi.co/api/v2/pokemon?limit=100000"
 
 IGNORE = {"ex"}
 FORMS = {"mega"}
@@ -54,10 +54,21 @@ def build_candidates(user_input: str) -> list[str]:
 
 
 def resolve_pokemon_name_from_candidates(candidates: list[str], timeout: int = 10) -> Optional[str]:
+    from core.scheduler import http_get
+
     for name in candidates:
-        r = requests.get(API.format(name), timeout=timeout)
+        r = http_get(API.format(name), timeout=timeout)
         if r.status_code == 200:
             return name
         if r.status_code != 404:
             r.raise_for_status()
-    return None
\ No newline at end of file
+    return None
+
+
+def list_pokemon_names(timeout: int = 10) -> list[str]:
+    """Todos os nomes de Pokémon (inclui formas, ex.: 'charizard-mega-x') em uma chamada."""
+    from core.scheduler import http_get
+
+    r = http_get(API_LIST, timeout=timeout)
+    r.raise_for_status()
+    return [item["name"] for item in r.json().get("results", [])]
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional
+
+from core.card_index import CARD_INDEX
+from core.deadline import DeadlineExceeded, current, deadline_scope, note_partial, submit
+from core.limitless_jp import (
+    SOURCES,
+    MatchRow,
+    get_source,
+    list_winner_decks_since,
+)
+
+ALL_SOURCES = "all"
+LISTING_DEADLINE_SHARE = 0.6  # fração do prazo para a varredura; o resto fica para as decklists
+
+
+@dataclass
+class RowIndex:
+    """
+    Índice único de linhas vencedoras de várias fontes (cada MatchRow tem .source).
+    URLs já absolutas; by_alt aponta para posições em rows.
+    """
+    rows: List[MatchRow] = field(default_factory=list)
+    by_alt: Dict[str, List[int]] = field(default_factory=dict)
+    partial_sources: List[str] = field(default_factory=list)  # varredura cortada pelo prazo
+
+    def add(self, rows: Iterable[MatchRow]) -> None:
+        for r in rows:
+            i = len(self.rows)
+            self.rows.append(r)
+            for alt in set(r.alts):
+                self.by_alt.setdefault(alt, []).append(i)
+
+    def find(self, pokemon_name: str, source: Optional[str] = None) -> List[MatchRow]:
+        """Linhas em que pokemon_name aparece em alts (opcionalmente de uma fonte)."""
+        out = [self.rows[i] for i in self.by_alt.get(pokemon_name.strip().lower(), [])]
+        if source and source != ALL_SOURCES:
+            out = [r for r in out if r.source == source]
+        return sorted(out, key=lambda r: r.row_date, reverse=True)
+
+    def all(self, source: Optional[str] = None) -> List[MatchRow]:
+        if not source or source == ALL_SOURCES:
+            return list(self.rows)
+        return [r for r in self.rows if r.source == source]
+
+
+def resolve_sources(source: Optional[str]) -> List[str]:
+    """'all' / None -> todas as fontes registradas; senão valida o nome."""
+    if not source or source == ALL_SOURCES:
+        return sorted(SOURCES)
+    return [get_source(source).name]
+
+
+def crawl_sources(
+    min_date: date,
+    sources: Optional[List[str]] = None,
+    timeout: int = 20,
+    max_pages: int = 500,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    max_date: Optional[date] = None,
+) -> RowIndex:
+    """
+    Varre várias listagens em paralelo (uma thread por fonte; o scheduler limita
+    a taxa por host) e junta tudo num RowIndex.
+    Com POKEMON_SHARED_DB, as linhas vêm do cache compartilhado entre processos.
+    max_date fecha a janela (ver limitless_jp.locate_page).
+    Se o prazo (core.deadline) acabar no meio, fica o que já foi lido: a fonte
+    vai para partial_sources (e note_partial). Sem nenhuma linha, DeadlineExceeded.
+    """
+    from core.shared_store import get_shared_store, shared_winner_rows
+
+    names = sources or sorted(SOURCES)
+    store = get_shared_store()
+
+    def crawl_one(name: str) -> List[MatchRow]:
+        if store is not None:
+            return shared_winner_rows(
+                store, name, min_date, timeout=timeout, max_pages=max_pages, progress=progress,
+                max_date=max_date,
+            )
+        return list_winner_decks_since(
+            min_date=min_date, timeout=timeout, max_pages=max_pages, source=name,
+            progress=progress, max_date=max_date,
+        )
+
+    index = RowIndex()
+    with ThreadPoolExecutor(max_workers=max(1, len(names))) as ex:
+        # submit() leva o prazo da requisição (core.deadline) para as threads
+        futures = {name: submit(ex, crawl_one, name) for name in names}
+        for name, fut in futures.items():
+            try:
+                index.add(fut.result())
+            except DeadlineExceeded as e:
+                index.add(getattr(e, "rows", []))
+                index.partial_sources.append(name)
+                note_partial(f"listagem {name}")
+    if index.partial_sources and not index.rows:
+        raise DeadlineExceeded(f"listagem {', '.join(index.partial_sources)}")
+    return index
+
+
+def find_pokemon_in_sources(
+    pokemon_name: str,
+    min_date: date,
+    source: Optional[str] = None,
+    timeout: int = 20,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    max_date: Optional[date] = None,
+) -> List[MatchRow]:
+    """Equivalente a find_pokemon_in_limitless_since, para uma fonte ou todas."""
+    index = crawl_for_decklists(min_date, source, timeout=timeout, progress=progress, max_date=max_date)
+    return index.find(pokemon_name)
+
+
+def crawl_for_decklists(
+    min_date: date,
+    source: Optional[str] = None,
+    timeout: int = 20,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    max_date: Optional[date] = None,
+) -> RowIndex:
+    """
+    crawl_sources antes de baixar decklists: dentro de um deadline_scope, a
+    varredura usa no máximo LISTING_DEADLINE_SHARE do prazo restante; cortada
+    no meio, ainda sobra tempo para os downloads.
+    """
+    dl = current()
+    budget = LISTING_DEADLINE_SHARE * max(0.0, dl.remaining()) if dl is not None else None
+    with deadline_scope(budget):
+        return crawl_sources(
+            min_date, resolve_sources(source), timeout=timeout, progress=progress, max_date=max_date
+        )
+
+
+# decklist_url -> deck; compartilhado entre fontes (mesma lista = um download).
+# LRU com DECK_CACHE_SIZE decks: a memória não cresce com a profundidade das buscas.
+DECK_CACHE_SIZE = 4096
+_DECKS: OrderedDict[str, dict] = OrderedDict()
+_DECKS_LOCK = threading.Lock()
+_INFLIGHT: Dict[str, threading.Event] = {}
+
+HEDGE_PERCENTILE = 95
+HEDGE_DEFAULT_S = 2.0    # antes de haver amostras suficientes
+HEDGE_MIN_S = 0.05
+HEDGE_BUDGET = 0.1       # no máximo 10% de requisições extras por chamada
+HEDGE_WORKERS = 4
+DEADLINE_RESERVE_S = 0.25        # tempo guardado para a análise depois dos downloads...
+DEADLINE_RESERVE_FRACTION = 0.2  # ...sem passar desta fração do que resta do prazo
+
+
+def _remember_deck(decklist_url: str, deck: dict) -> None:
+    with _DECKS_LOCK:
+        _DECKS[decklist_url] = deck
+        _DECKS.move_to_end(decklist_url)
+        while len(_DECKS) > DECK_CACHE_SIZE:
+            _DECKS.popitem(last=False)
+
+
+def fetch_decklist_once(decklist_url: str, timeout: int = 20) -> dict:
+    """
+    fetch_decklist com deduplicação: cada URL é baixada uma vez por processo,
+    mesmo que apareça em várias fontes ou em pedidos simultâneos.
+    Com POKEMON_SHARED_DB, a deduplicação vale entre processos (e as decks ficam
+    só no SQLite, não em cada processo).
+    """
+    from core.decklist import fetch_decklist
+    from core.shared_store import get_shared_store, shared_decklist
+
+    store = get_shared_store()
+    if store is not None:
+        return shared_decklist(store, decklist_url, timeout=timeout)
+
+    while True:
+        with _DECKS_LOCK:
+            if decklist_url in _DECKS:
+                _DECKS.move_to_end(decklist_url)
+                return {k: list(v) for k, v in _DECKS[decklist_url].items()}
+            ev = _INFLIGHT.get(decklist_url)
+            if ev is None:
+                ev = _INFLIGHT[decklist_url] = threading.Event()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            ev.wait()
+            with _DECKS_LOCK:
+                if decklist_url in _DECKS:
+                    continue
+            # o dono falhou: tenta por conta própria
+            return fetch_decklist(decklist_url, timeout=timeout)
+
+        try:
+            deck = fetch_decklist(decklist_url, timeout=timeout)
+            _remember_deck(decklist_url, deck)
+            return {k: list(v) for k, v in deck.items()}
+        finally:
+            with _DECKS_LOCK:
+                _INFLIGHT.pop(decklist_url, None)
+            ev.set()
+
+
+def cached_decklists(urls: Iterable[str]) -> set:
+    """URLs cuja deck já está guardada (neste processo ou no store compartilhado)."""
+    from core.shared_store import get_shared_store
+
+    store = get_shared_store()
+    if store is not None:
+        return {u for u in urls if store.get_deck(u) is not None}
+    with _DECKS_LOCK:
+        return {u for u in urls if u in _DECKS}
+
+
+def _fetch_hedge(decklist_url: str, timeout: int = 20) -> dict:
+    """Cópia (hedge) de um download lento: ignora o single-flight de propósito."""
+    from core.decklist import fetch_decklist
+    from core.shared_store import get_shared_store
+
+    deck = fetch_decklist(decklist_url, timeout=timeout)
+    store = get_shared_store()
+    if store is not None:
+        store.put_deck(decklist_url, deck)
+    else:
+        _remember_deck(decklist_url, deck)
+    return {k: list(v) for k, v in deck.items()}
+
+
+def _hedge_after(url: str) -> float:
+    from core.scheduler import SCHEDULER
+
+    p = SCHEDULER.host(url).latency.percentile(HEDGE_PERCENTILE)
+    return HEDGE_DEFAULT_S if p is None else max(HEDGE_MIN_S, p)
+
+
+def fetch_decklists(
+    matches: List[MatchRow],
+    timeout: int = 20,
+    max_workers: int = 8,
+    hedge: bool = True,
+) -> tuple[list[tuple[MatchRow, dict]], list[dict]]:
+    """
+    Baixa as decklists das linhas em paralelo (URLs repetidas baixadas uma vez).
+    Retorna ([(linha, deck), ...] na ordem de matches, [erros no formato da API]).
+    As decks baixadas entram no índice invertido de cartas (CARD_INDEX).
+
+    Downloads no ar há mais que o p95 de latência do host ganham uma cópia
+    (hedge), e vale a resposta que chegar primeiro. Dentro de um deadline_scope, para de esperar
+    min(DEADLINE_RESERVE_S, DEADLINE_RESERVE_FRACTION x restante) antes do prazo: as listas que faltarem entram em erros
+    com "skipped": True, e quem chamou segue com análise parcial.
+    """
+    from core.scheduler import SCHEDULER
+
+    urls = sorted({m.decklist_url for m in matches if m.decklist_url})
+
+    results: Dict[str, object] = {}
+    dl = current()
+    stop_at = None
+    if dl is not None:
+        # prazo curto: a reserva fixa comeria tudo e nenhuma lista seria esperada
+        stop_at = dl.earlier(min(DEADLINE_RESERVE_S, DEADLINE_RESERVE_FRACTION * max(0.0, dl.remaining())))
+
+    if urls:
+        ex = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)))
+        hedge_ex = ThreadPoolExecutor(max_workers=HEDGE_WORKERS) if hedge else None
+        pending: Dict[object, str] = {}
+        hedged: set[str] = set()
+        hedge_budget = max(1, int(len(urls) * HEDGE_BUDGET))
+
+        try:
+            for url in urls:
+                pending[submit(ex, fetch_decklist_once, url, timeout)] = url
+
+            while pending and len(results) < len(urls):
+                wait_s = None
+                if hedge_ex is not None and len(hedged) < hedge_budget:
+                    wait_s = 0.05
+                if stop_at is not None:
+                    rem = stop_at.remaining()
+                    if rem <= 0:
+                        break
+                    wait_s = rem if wait_s is None else min(wait_s, rem)
+
+                done, _ = wait(list(pending), timeout=wait_s, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    url = pending.pop(fut)
+                    if url in results:
+                        continue  # a outra cópia já respondeu
+                    err = fut.exception()
+                    if err is not None and url in pending.values():
+                        continue  # falhou, mas a outra cópia ainda pode responder
+                    results[url] = err if err is not None else fut.result()
+
+                # hedge: cópia para quem já está no ar há mais que o p95 do host
+                # (esperar na fila do scheduler não conta: duplicar não ajudaria)
+                if hedge_ex is not None and len(hedged) < hedge_budget:
+                    now = time.monotonic()
+                    for url in set(pending.values()) - hedged:
+                        if len(hedged) >= hedge_budget:
+                            break
+                        sent = SCHEDULER.in_flight_since(url)
+                        if sent is None or url in results or now - sent < _hedge_after(url):
+                            continue
+                        hedged.add(url)
+                        pending[submit(hedge_ex, _fetch_hedge, url, timeout)] = url
+        finally:
+            # não espera downloads que ficaram para trás; eles terminam sozinhos
+            # (o timeout deles já está limitado pelo prazo)
+            ex.shutdown(wait=False, cancel_futures=True)
+            if hedge_ex is not None:
+                hedge_ex.shutdown(wait=False, cancel_futures=True)
+
+    decks: list[tuple[MatchRow, dict]] = []
+    errors: list[dict] = []
+    for m in matches:
+        if not m.decklist_url:
+            errors.append({"date": str(m.row_date), "error": "decklist_url ausente"})
+            continue
+        res = results.get(m.decklist_url)
+        if res is None or isinstance(res, DeadlineExceeded) or (
+            isinstance(res, Exception) and dl is not None and dl.expired()
+        ):
+            errors.append({
+                "date": str(m.row_date),
+                "decklist_url": m.decklist_url,
+                "error": "prazo esgotado",
+                "skipped": True,
+            })
+        elif isinstance(res, Exception):
+            errors.append({"date": str(m.row_date), "decklist_url": m.decklist_url, "error": str(res)})
+        else:
+            decks.append((m, res))
+
+    CARD_INDEX.add_rows(decks)
+    return decks, errors
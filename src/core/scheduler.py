@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from core.deadline import Deadline, DeadlineExceeded, LatencyTracker, bound_timeout
+from core.deadline import current as current_deadline
+
+
+@dataclass
+class HostPolicy:
+    rate: float = 5.0              # requisições/s (reposição do token bucket)
+    burst: int = 5                 # capacidade do bucket
+    min_concurrency: int = 1
+    max_concurrency: int = 8
+    initial_concurrency: int = 2
+    latency_factor: float = 2.0    # latência > base * fator -> reduz
+    max_retries: int = 3
+    backoff_s: float = 1.0         # espera padrão sem Retry-After
+
+
+# Limites conservadores por host; os demais usam HostPolicy()
+DEFAULT_POLICIES: Dict[str, HostPolicy] = {
+    "limitlesstcg.com": HostPolicy(rate=2.0, burst=4, max_concurrency=4),
+    "pokeapi.co": HostPolicy(rate=5.0, burst=10, max_concurrency=8),
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _parse_retry_after(value: str | None) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostScheduler:
+    """
+    Controle de um host:
+      - token bucket limita a taxa de requisições;
+      - limite de concorrência AIMD: +1 a cada `limit` respostas boas com
+        latência estável, metade em 429/5xx ou latência subindo — no máximo
+        uma redução por janela: respostas de requisições enviadas antes da
+        última redução não reduzem de novo (já foram contadas nela);
+      - Retry-After bloqueia o host inteiro até o instante indicado.
+    """
+
+    def __init__(self, host: str, policy: HostPolicy):
+        self.host = host
+        self.policy = policy
+        self.limit = float(policy.initial_concurrency)
+        self.in_flight = 0
+        self.tokens = float(policy.burst)
+        self.blocked_until = 0.0
+        self.base_latency: Optional[float] = None
+        self.latency = LatencyTracker()  # respostas boas; base do hedge (p95)
+        self._good = 0
+        self._last_decrease = 0.0  # monotonic da última redução do limite
+        self._last_refill = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self.tokens = min(float(self.policy.burst), self.tokens + elapsed * self.policy.rate)
+
+    def acquire(self, deadline: Optional[Deadline] = None) -> None:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.in_flight >= int(self.limit):
+                    wait = None  # espera um release
+                elif self.tokens < 1.0:
+                    wait = (1.0 - self.tokens) / self.policy.rate
+                else:
+                    self.tokens -= 1.0
+                    self.in_flight += 1
+                    return
+
+                if deadline is not None:
+                    # esperar pela vez não pode passar do prazo da requisição
+                    rem = deadline.remaining()
+                    if rem <= 0:
+                        raise DeadlineExceeded(f"fila do host {self.host}")
+                    wait = rem if wait is None else min(wait, rem)
+
+                self._cond.wait(timeout=wait)
+
+    def cancel(self) -> None:
+        """Libera a vaga sem mexer no limite AIMD nem na latência de referência."""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def release(
+        self,
+        status: Optional[int],
+        latency: float,
+        retry_after: Optional[float] = None,
+        sent_at: Optional[float] = None,
+    ) -> None:
+        """sent_at: monotonic do envio; sem ele, toda resposta ruim conta como janela nova."""
+        p = self.policy
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            throttled = status is None or status in RETRY_STATUSES
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+            # uma rajada de 429 da mesma janela derruba o limite uma vez só
+            same_window = sent_at is not None and sent_at < self._last_decrease
+            if throttled:
+                if not same_window:
+                    self.limit = max(float(p.min_concurrency), self.limit / 2)
+                    self._last_decrease = now
+                self._good = 0
+            elif self.base_latency is not None and latency > self.base_latency * p.latency_factor:
+                if not same_window:
+                    self.limit = max(float(p.min_concurrency), self.limit * 0.75)
+                    self._last_decrease = now
+                self._good = 0
+            else:
+                self._good += 1
+                if self._good >= int(self.limit):
+                    self.limit = min(float(p.max_concurrency), self.limit + 1)
+                    self._good = 0
+
+            if not throttled:
+                self.latency.record(latency)
+                # média móvel lenta: referência do que é latência "normal"
+                if self.base_latency is None:
+                    self.base_latency = latency
+                else:
+                    self.base_latency = 0.9 * self.base_latency + 0.1 * latency
+
+            self._cond.notify_all()
+
+
+class Scheduler:
+    """Agenda requisições HTTP por host. Um por processo (SCHEDULER)."""
+
+    def __init__(self, policies: Dict[str, HostPolicy] | None = None):
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self._hosts: Dict[str, HostScheduler] = {}
+        self._lock = threading.Lock()
+        self._sent: Dict[str, list] = {}  # url -> instantes de envio das tentativas em voo
+        self._session = None
+
+    def host(self, url: str) -> HostScheduler:
+        host = (urlsplit(url).hostname or "").lower()
+        with self._lock:
+            hs = self._hosts.get(host)
+            if hs is None:
+                policy = self.policies.get(host)
+                if policy is None:
+                    # www.limitlesstcg.com -> limitlesstcg.com
+                    policy = next(
+                        (p for h, p in self.policies.items() if host.endswith("." + h)),
+                        HostPolicy(),
+                    )
+                hs = self._hosts[host] = HostScheduler(host, policy)
+            return hs
+
+    def in_flight_since(self, url: str) -> Optional[float]:
+        """Instante (monotonic) em que a tentativa mais antiga em voo para url saiu; None se nenhuma."""
+        with self._lock:
+            sent = self._sent.get(url)
+            return min(sent) if sent else None
+
+    def _get_session(self):
+        import requests
+
+        with self._lock:
+            if self._session is None:
+                self._session = requests.Session()
+            return self._session
+
+    def get(self, url: str, timeout: float = 20, headers: dict | None = None):
+        """
+        requests.get com controle de taxa/concorrência por host.
+        Em 429/5xx tenta de novo (até max_retries), respeitando Retry-After.
+        Dentro de um deadline_scope, espera na fila e timeouts não passam do prazo.
+        Retorna a última resposta; quem chama decide se faz raise_for_status().
+        """
+        hs = self.host(url)
+        session = self._get_session()
+        dl = current_deadline()
+
+        attempt = 0
+        while True:
+            # prazo da requisição (core.deadline) limita a espera e o timeout de cada tentativa
+            bound_timeout(timeout, f"GET {url}")
+            hs.acquire(dl)
+            attempt_timeout = timeout if dl is None else max(0.001, min(timeout, dl.remaining()))
+            t0 = time.monotonic()
+            with self._lock:
+                self._sent.setdefault(url, []).append(t0)
+            try:
+                r = session.get(url, timeout=attempt_timeout, headers=headers)
+            except Exception as e:
+                if dl is not None and dl.expired():
+                    # cortado pelo nosso prazo, não é sinal de sobrecarga do host
+                    hs.cancel()
+                    raise DeadlineExceeded(f"GET {url}") from e
+                hs.release(None, time.monotonic() - t0, sent_at=t0)
+                raise
+            finally:
+                with self._lock:
+                    sent = self._sent.get(url)
+                    if sent:
+                        sent.remove(t0)
+                        if not sent:
+                            del self._sent[url]
+
+            retry_after = _parse_retry_after(r.headers.get("Retry-After"))
+            if r.status_code in RETRY_STATUSES and retry_after is None:
+                retry_after = hs.policy.backoff_s * (2 ** attempt)
+            hs.release(
+                r.status_code,
+                time.monotonic() - t0,
+                retry_after if r.status_code in RETRY_STATUSES else None,
+                sent_at=t0,
+            )
+
+            if r.status_code not in RETRY_STATUSES or attempt >= hs.policy.max_retries:
+                return r
+            attempt += 1
+
+
+SCHEDULER = Scheduler()
+
+
+def http_get(url: str, timeout: float = 20, headers: dict | None = None):
+    return SCHEDULER.get(url, timeout=timeout, headers=headers)
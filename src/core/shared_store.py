@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Callable, List, Optional, TypeVar
+
+from core.deadline import DeadlineExceeded, bound_timeout
+from core.deadline import current as current_deadline
+
+# Cache compartilhado entre processos (ex.: uvicorn --workers 8).
+# Ativado com POKEMON_SHARED_DB=<arquivo.sqlite3>; sem a variável, cada processo
+# usa só os caches em memória.
+SHARED_DB_ENV = "POKEMON_SHARED_DB"
+
+ROWS_TTL_S = 60.0  # linhas revalidadas (página 1) no máximo a cada ROWS_TTL_S
+LOCK_STRIPES = 64      # chaves de deck espalhadas por hash num conjunto fixo de locks
+LOCK_TIMEOUT_S = 300.0  # espera máxima por um lock fora de um prazo de requisição
+LOCK_POLL_S = 0.05
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows_cache (
+    key         TEXT PRIMARY KEY,
+    page1_hash  TEXT NOT NULL,
+    checked_at  REAL NOT NULL,
+    rows        TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS decks (
+    url         TEXT PRIMARY KEY,
+    deck        TEXT NOT NULL,
+    fetched_at  REAL NOT NULL
+);
+"""
+
+T = TypeVar("T")
+
+
+def _lock_timeout(stage: str, timeout: float = LOCK_TIMEOUT_S) -> TimeoutError:
+    """Prazo da requisição acabou -> DeadlineExceeded; senão, só o limite do lock."""
+    dl = current_deadline()
+    if dl is not None and dl.expired():
+        return DeadlineExceeded(stage)
+    return TimeoutError(f"{stage}: lock ocupado por mais de {timeout:g}s")
+
+
+class FileLock:
+    """
+    Lock exclusivo entre processos via arquivo (fcntl no POSIX, msvcrt no Windows).
+    Tenta sem bloquear e repete a cada LOCK_POLL_S, por no máximo `timeout`
+    segundos e nunca além do prazo da requisição (core.deadline).
+    """
+
+    def __init__(self, path: str | Path, timeout: float = LOCK_TIMEOUT_S):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._f = None
+
+    def _try_lock(self) -> bool:
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+
+    def __enter__(self) -> "FileLock":
+        stage = f"lock {self.path.name}"
+        wait = bound_timeout(self.timeout, stage)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a+b")
+        give_up = time.monotonic() + wait
+        while not self._try_lock():
+            rem = give_up - time.monotonic()
+            if rem <= 0:
+                self._f.close()
+                self._f = None
+                raise _lock_timeout(stage, self.timeout)
+            time.sleep(min(LOCK_POLL_S, rem))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._f.close()
+            self._f = None
+
+
+@dataclass
+class RowsEntry:
+    page1_hash: str
+    checked_at: float
+    rows: list
+
+
+class SharedStore:
+    """
+    Linhas vencedoras e decks parseadas num SQLite em modo WAL (leitores não
+    bloqueiam o escritor), com single-flight por chave via FileLock: só um
+    processo atualiza uma chave; os outros esperam o lock e leem o resultado.
+    As chaves de deck caem (por hash) em LOCK_STRIPES arquivos de lock fixos: o
+    número de arquivos não cresce com o número de URLs. Chaves com lock próprio
+    (as poucas varreduras de listagem) usam um arquivo por chave, para uma
+    varredura longa não travar downloads de deck que caiam no mesmo stripe.
+    """
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.lock_dir = self.db_path.parent / (self.db_path.name + ".locks")
+        self._local = threading.local()
+        # chaves em cálculo neste processo: as outras threads esperam o Event
+        # (sem segurar lock nenhum) e releem o resultado
+        self._inflight: dict = {}
+        self._inflight_guard = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # ---------- single-flight ----------
+
+    def single_flight(
+        self,
+        key: str,
+        load: Callable[[], Optional[T]],
+        compute: Callable[[], T],
+        own_lock: bool = False,
+    ) -> T:
+        """
+        load() devolve o valor válido guardado (ou None); compute() recalcula e
+        grava. Só quem segura o lock da chave chama compute(). Esperar pelo lock
+        respeita o prazo da requisição (DeadlineExceeded).
+
+        Em processo, uma única thread por chave calcula; as outras esperam o
+        Event dela e chamam load() de novo. Entre processos, o FileLock da chave
+        (stripe, ou arquivo próprio se own_lock) serializa o cálculo.
+        """
+        value = load()
+        if value is not None:
+            return value
+
+        stage = f"lock {key}"
+        while True:
+            with self._inflight_guard:
+                event = self._inflight.get(key)
+                owner = event is None
+                if owner:
+                    event = self._inflight[key] = threading.Event()
+            if owner:
+                break
+            if not event.wait(bound_timeout(LOCK_TIMEOUT_S, stage)):
+                raise _lock_timeout(stage)
+            value = load()
+            if value is not None:
+                return value
+            # o dono falhou: tenta de novo (vira dono ou espera o próximo)
+
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        if own_lock:
+            lock_path = self.lock_dir / f"key-{digest[:16]}.lock"
+        else:
+            lock_path = self.lock_dir / f"stripe-{int(digest[:8], 16) % LOCK_STRIPES:02d}.lock"
+        try:
+            with FileLock(lock_path):
+                value = load()  # outro processo pode ter acabado de calcular
+                if value is not None:
+                    return value
+                return compute()
+        finally:
+            with self._inflight_guard:
+                self._inflight.pop(key, None)
+            event.set()
+
+    # ---------- linhas ----------
+
+    def get_rows(self, key: str) -> Optional[RowsEntry]:
+        row = self.conn.execute(
+            "SELECT page1_hash, checked_at, rows FROM rows_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+        return RowsEntry(row[0], row[1], json.loads(row[2]))
+
+    def put_rows(self, key: str, page1_hash: str, rows: list) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO rows_cache (key, page1_hash, checked_at, rows) VALUES (?, ?, ?, ?)",
+            (key, page1_hash, time.time(), json.dumps(rows, ensure_ascii=False)),
+        )
+
+    def touch_rows(self, key: str) -> None:
+        self.conn.execute("UPDATE rows_cache SET checked_at = ? WHERE key = ?", (time.time(), key))
+
+    def all_rows(self) -> dict:
+        """decklist_url -> linha (formato _rows_to_json), juntando todas as chaves guardadas."""
+        out = {}
+        for (data,) in self.conn.execute("SELECT rows FROM rows_cache"):
+            for row in json.loads(data):
+                if row[3]:
+                    out[row[3]] = row
+        return out
+
+    # ---------- decks ----------
+
+    def get_deck(self, url: str) -> Optional[dict]:
+        row = self.conn.execute("SELECT deck FROM decks WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def decks_fetched_since(self, ts: float) -> list[tuple[str, dict, float]]:
+        """(url, deck, fetched_at) gravadas depois de ts, da mais antiga para a mais nova."""
+        return [
+            (url, json.loads(deck), fetched_at)
+            for url, deck, fetched_at in self.conn.execute(
+                "SELECT url, deck, fetched_at FROM decks WHERE fetched_at > ? ORDER BY fetched_at", (ts,)
+            )
+        ]
+
+    def put_deck(self, url: str, deck: dict) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO decks (url, deck, fetched_at) VALUES (?, ?, ?)",
+            (url, json.dumps(deck, ensure_ascii=False), time.time()),
+        )
+
+
+_STORE: Optional[SharedStore] = None
+_STORE_GUARD = threading.Lock()
+
+
+def get_shared_store() -> Optional[SharedStore]:
+    global _STORE
+    path = os.environ.get(SHARED_DB_ENV)
+    if not path:
+        return None
+    with _STORE_GUARD:
+        if _STORE is None or _STORE.db_path != Path(path):
+            _STORE = SharedStore(path)
+        return _STORE
+
+
+# ================== USO PELO CRAWLER ==================
+
+def _rows_to_json(rows) -> list:
+    return [[str(r.row_date), list(r.alts), r.tournament_url, r.decklist_url, r.source] for r in rows]
+
+
+def _rows_from_json(data: list) -> list:
+    from core.limitless_jp import MatchRow
+
+    return [
+        MatchRow(
+            row_date=date.fromisoformat(iso),
+            alts=list(alts),
+            tournament_url=tournament_url,
+            decklist_url=decklist_url,
+            source=source,
+        )
+        for iso, alts, tournament_url, decklist_url, source in data
+    ]
+
+
+def shared_winner_rows(
+    store: SharedStore,
+    source: str,
+    min_date: date,
+    timeout: int = 20,
+    max_pages: int = 500,
+    progress=None,
+    max_date: Optional[date] = None,
+) -> List:
+    """
+    list_winner_decks_since compartilhado: entre ROWS_TTL_S, todos os processos
+    leem o SQLite; depois disso um único processo revalida a página 1 e só
+    re-varre a listagem se ela mudou.
+    """
+    from core.limitless_jp import list_winner_decks_since, listing_version
+
+    key = f"rows|{source}|{min_date}|{max_pages}" + (f"|{max_date}" if max_date else "")
+
+    def load():
+        ent = store.get_rows(key)
+        if ent and time.time() - ent.checked_at < ROWS_TTL_S:
+            return ent.rows
+        return None
+
+    def compute():
+        ent = store.get_rows(key)
+        page1_hash = listing_version([source], timeout=timeout, max_age=0)
+        if ent and ent.page1_hash == page1_hash:
+            store.touch_rows(key)
+            return ent.rows
+        rows = list_winner_decks_since(
+            min_date=min_date, timeout=timeout, max_pages=max_pages, source=source, progress=progress,
+            max_date=max_date,
+        )
+        data = _rows_to_json(rows)
+        store.put_rows(key, page1_hash, data)
+        return data
+
+    return _rows_from_json(store.single_flight(key, load, compute, own_lock=True))
+
+
+def shared_decklist(store: SharedStore, decklist_url: str, timeout: int = 20) -> dict:
+    """fetch_decklist compartilhado: cada URL é baixada por um único processo."""
+    from core.decklist import fetch_decklist
+
+    def compute():
+        deck = fetch_decklist(decklist_url, timeout=timeout)
+        store.put_deck(decklist_url, deck)
+        return deck
+
+    return store.single_flight(
+        f"deck|{decklist_url}",
+        lambda: store.get_deck(decklist_url),
+        compute,
+    )
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import pickle
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Este módulo é carregado no início da CLI: não importa requests/bs4
+# (nem os módulos do core que dependem deles) no topo.
+
+SNAPSHOT_VERSION = 1
+
+DEFAULT_SNAPSHOT_PATH = Path.home() / "Desktop" / "Deck_Analysis" / "snapshot.bin"
+
+
+@dataclass
+class Snapshot:
+    """
+    Índice pré-construído das linhas vencedoras + decklists já parseadas.
+
+    rows guarda tuplas simples (iso_date, alts, tournament_url, decklist_url)
+    para que o unpickle não precise importar nenhum módulo do projeto.
+    """
+    built_at: str
+    min_date: str
+    rows: List[tuple] = field(default_factory=list)
+    decks: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)
+    by_alt: Dict[str, List[int]] = field(default_factory=dict)
+    listing_hash: Optional[str] = None  # listing_version([source]) quando foi gerado
+    source: str = "jp"                  # listagem de onde vieram as linhas
+
+    def match_rows(self, pokemon_name: str) -> list:
+        """Retorna MatchRows (mesma semântica de find_pokemon_in_limitless_since)."""
+        from core.limitless_jp import MatchRow
+
+        out = []
+        for i in self.by_alt.get(pokemon_name.strip().lower(), []):
+            iso, alts, tournament_url, decklist_url = self.rows[i]
+            out.append(
+                MatchRow(
+                    row_date=date.fromisoformat(iso),
+                    alts=list(alts),
+                    tournament_url=tournament_url,
+                    decklist_url=decklist_url,
+                    source=self.source,
+                )
+            )
+        return out
+
+    def has_pokemon(self, pokemon_name: str) -> bool:
+        return pokemon_name.strip().lower() in self.by_alt
+
+
+def _build_index(rows: List[tuple]) -> Dict[str, List[int]]:
+    by_alt: Dict[str, List[int]] = {}
+    for i, (_, alts, _, _) in enumerate(rows):
+        for alt in set(alts):
+            by_alt.setdefault(alt, []).append(i)
+    return by_alt
+
+
+def build_snapshot(
+    out_path: str | Path,
+    min_date: date,
+    timeout: int = 20,
+    source: str = "jp",
+) -> Snapshot:
+    """
+    Varre o Limitless desde min_date, baixa todas as decklists e grava o
+    snapshot em um único arquivo binário.
+    Listagem e decklists passam pelo pipeline de backfill (downloads em
+    threads, parse em processos; core.pipeline).
+    """
+    from core.limitless_jp import listing_version, make_absolute_url
+    from core.pipeline import backfill_decklists, backfill_listing
+
+    # antes da varredura: torneio que entrar durante ela deixa o snapshot já desatualizado
+    listing_hash = listing_version([source], timeout=timeout, max_age=0)
+
+    rows = []
+    for r in backfill_listing(min_date, source=source, timeout=timeout)[0]:
+        rows.append(
+            (
+                r.row_date.isoformat(),
+                tuple(r.alts),
+                make_absolute_url(r.tournament_url),
+                make_absolute_url(r.decklist_url),
+            )
+        )
+
+    # decklists que falharem ficam de fora (a linha entra mesmo assim)
+    decks, _, _ = backfill_decklists((row[3] for row in rows), timeout=timeout)
+
+    snap = Snapshot(
+        built_at=datetime.now().isoformat(timespec="seconds"),
+        min_date=min_date.isoformat(),
+        rows=rows,
+        decks=decks,
+        by_alt=_build_index(rows),
+        listing_hash=listing_hash,
+        source=source,
+    )
+    save_snapshot(out_path, snap)
+    return snap
+
+
+def save_snapshot(out_path: str | Path, snap: Snapshot) -> None:
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "built_at": snap.built_at,
+        "min_date": snap.min_date,
+        "rows": snap.rows,
+        "decks": snap.decks,
+        "by_alt": snap.by_alt,
+        "listing_hash": snap.listing_hash,
+        "source": snap.source,
+    }
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(out_path)
+
+
+def load_snapshot(path: str | Path) -> Optional[Snapshot]:
+    """Carrega o snapshot; retorna None se não existir ou for de outra versão."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != SNAPSHOT_VERSION:
+        return None
+    return Snapshot(
+        built_at=payload["built_at"],
+        min_date=payload["min_date"],
+        rows=payload["rows"],
+        decks=payload["decks"],
+        by_alt=payload["by_alt"],
+        listing_hash=payload.get("listing_hash"),  # ausentes em snapshots antigos
+        source=payload.get("source", "jp"),
+    )
+
+
+if __name__ == "__main__":
+    # python -m core.snapshot [AAAA-MM-DD] [fonte] -> gera o snapshot usado pela CLI
+    import os
+    import sys
+
+    since = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else date(2026, 1, 23)
+    src_name = sys.argv[2] if len(sys.argv) > 2 else "jp"
+    target = Path(os.environ.get("POKEMON_SNAPSHOT", DEFAULT_SNAPSHOT_PATH))
+    snap = build_snapshot(target, since, source=src_name)
+    print(f"Snapshot gerado em {target}: {len(snap.rows)} linhas, {len(snap.decks)} decklists")
@@ -0,0 +1,454 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Classificação completa dos torneios (top-N de cada um), não só a lista vencedora.
+# Como snapshot.py, não importa requests/bs4 no topo.
+
+STANDINGS_DB_ENV = "POKEMON_STANDINGS_DB"
+DEFAULT_STANDINGS_DB = Path.home() / "Desktop" / "Deck_Analysis" / "standings.sqlite3"
+
+DEFAULT_TOP_N = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tournaments (
+    url         TEXT PRIMARY KEY,
+    source      TEXT NOT NULL,
+    row_date    TEXT NOT NULL,
+    status      TEXT NOT NULL,      -- done | failed
+    top_n       INTEGER NOT NULL,
+    error       TEXT,
+    fetched_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS placements (
+    tournament_url  TEXT NOT NULL,
+    placing         INTEGER NOT NULL,
+    player          TEXT,
+    decklist_url    TEXT,
+    alts            TEXT NOT NULL,
+    row_date        TEXT NOT NULL,
+    source          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS placements_tournament ON placements (tournament_url);
+CREATE INDEX IF NOT EXISTS placements_date ON placements (row_date);
+CREATE TABLE IF NOT EXISTS decks (
+    url         TEXT PRIMARY KEY,
+    deck        TEXT NOT NULL,
+    fetched_at  REAL NOT NULL
+);
+"""
+
+
+@dataclass(slots=True)
+class Placement:
+    """Uma linha da classificação; tem os campos de MatchRow que o resto do core usa."""
+    tournament_url: str
+    placing: int
+    player: str
+    decklist_url: Optional[str]
+    alts: list[str]
+    row_date: date
+    source: str
+
+    @property
+    def weight(self) -> float:
+        from core.analysis import placement_weight
+
+        return placement_weight(self.placing)
+
+
+@dataclass
+class CrawlReport:
+    tournaments: int = 0
+    tournaments_resumed: int = 0   # já estavam no banco com top_n suficiente
+    tournaments_failed: int = 0
+    placements: int = 0
+    decks_fetched: int = 0
+    decks_reused: int = 0          # já estavam no banco
+    deck_errors: List[dict] = field(default_factory=list)
+
+
+# ================== PARSE ==================
+
+def _placing(text: str) -> Optional[int]:
+    digits = "".join(ch for ch in text if ch.isdigit())
+    return int(digits) if digits else None
+
+
+def parse_standings_html(html: str) -> list[tuple]:
+    """
+    Parseia a classificação de uma página de torneio em tuplas simples,
+    ordenadas pela colocação:
+      (placing, player, decklist_href, alts)
+    Colocação = número da primeira coluna ("1", "2nd"...); a decklist é o link
+    /decks/list/ da linha e os alts vêm das imgs (sprites) da linha.
+    Guarda todas as colocações: o corte top-N fica com quem chama, para que o
+    parse em cache (ValidatorStore) sirva para qualquer N.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    out = []
+    for tr in soup.find_all("tr"):
+        tds = tr.find_all("td", recursive=False)
+        if len(tds) < 2:
+            continue
+        placing = _placing(tds[0].get_text(" ", strip=True))
+        if placing is None:
+            continue
+
+        decklist_href = None
+        for a in tr.find_all("a", href=True):
+            if "/decks/list/" in a["href"]:
+                decklist_href = a["href"]
+                break
+
+        alts: list[str] = []
+        for img in tr.find_all("img"):
+            alt = (img.get("alt") or "").strip().lower()
+            if alt:
+                alts.append(alt)
+
+        player = tds[1].get_text(" ", strip=True)
+        out.append((placing, player, decklist_href, tuple(alts)))
+
+    soup.decompose()
+    out.sort(key=lambda t: t[0])
+    return out
+
+
+def fetch_standings(
+    tournament_url: str,
+    row_date: date,
+    source: str,
+    top_n: int = DEFAULT_TOP_N,
+    timeout: int = 20,
+) -> List[Placement]:
+    """Top-N da classificação de um torneio (GET condicional, como as listagens)."""
+    from core.http_cache import conditional_get
+    from core.limitless_jp import make_absolute_url
+
+    entry, _ = conditional_get(tournament_url, parse_standings_html, timeout=timeout)
+    return [
+        Placement(
+            tournament_url=tournament_url,
+            placing=placing,
+            player=player,
+            decklist_url=make_absolute_url(href),
+            alts=list(alts),
+            row_date=row_date,
+            source=source,
+        )
+        for placing, player, href, alts in entry.parsed
+        if placing <= top_n
+    ]
+
+
+# ================== STORE (SQLite) ==================
+
+class StandingsStore:
+    """
+    Classificações e decks já baixadas num SQLite (WAL). É o que torna a
+    varredura retomável: torneios "done" e decks gravadas não são baixados de
+    novo, e cada item é gravado assim que chega.
+    """
+
+    def __init__(self, db_path: str | Path = DEFAULT_STANDINGS_DB):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # ---------- torneios ----------
+
+    def done_tournaments(self, top_n: int) -> set:
+        """URLs já varridas com pelo menos top_n colocações."""
+        rows = self.conn.execute(
+            "SELECT url FROM tournaments WHERE status = 'done' AND top_n >= ?", (top_n,)
+        ).fetchall()
+        return {r[0] for r in rows}
+
+    def put_tournament(self, url: str, row_date: date, source: str, top_n: int, placements: List[Placement]) -> None:
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM placements WHERE tournament_url = ?", (url,))
+            conn.executemany(
+                "INSERT INTO placements (tournament_url, placing, player, decklist_url, alts, row_date, source) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (url, p.placing, p.player, p.decklist_url, json.dumps(p.alts, ensure_ascii=False),
+                     p.row_date.isoformat(), p.source)
+                    for p in placements
+                ],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO tournaments (url, source, row_date, status, top_n, error, fetched_at) "
+                "VALUES (?, ?, ?, 'done', ?, NULL, ?)",
+                (url, source, row_date.isoformat(), top_n, time.time()),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def fail_tournament(self, url: str, row_date: date, source: str, top_n: int, error: str) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tournaments (url, source, row_date, status, top_n, error, fetched_at) "
+            "VALUES (?, ?, ?, 'failed', ?, ?, ?)",
+            (url, source, row_date.isoformat(), top_n, error, time.time()),
+        )
+
+    # ---------- colocações ----------
+
+    def placements(
+        self,
+        min_date: Optional[date] = None,
+        source: Optional[str] = None,
+        top_n: Optional[int] = None,
+        tournament_urls: Optional[Iterable[str]] = None,
+    ) -> List[Placement]:
+        sql = "SELECT tournament_url, placing, player, decklist_url, alts, row_date, source FROM placements WHERE 1=1"
+        args: list = []
+        if min_date is not None:
+            sql += " AND row_date >= ?"
+            args.append(min_date.isoformat())
+        if source is not None:
+            sql += " AND source = ?"
+            args.append(source)
+        if top_n is not None:
+            sql += " AND placing <= ?"
+            args.append(top_n)
+        rows = self.conn.execute(sql + " ORDER BY row_date DESC, tournament_url, placing", args).fetchall()
+
+        wanted = set(tournament_urls) if tournament_urls is not None else None
+        return [
+            Placement(t, placing, player, d, json.loads(alts), date.fromisoformat(iso), src)
+            for t, placing, player, d, alts, iso, src in rows
+            if wanted is None or t in wanted
+        ]
+
+    def find(
+        self,
+        pokemon_name: str,
+        min_date: Optional[date] = None,
+        source: Optional[str] = None,
+        top_n: Optional[int] = None,
+    ) -> List[Placement]:
+        """Colocações com o Pokémon entre os sprites (mesma regra de find_pokemon_in_limitless_since)."""
+        target = pokemon_name.strip().lower()
+        return [p for p in self.placements(min_date, source, top_n) if target in p.alts]
+
+    # ---------- decks ----------
+
+    def stored_decks(self, urls: Iterable[str]) -> set:
+        urls = list(urls)
+        out = set()
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            out.update(r[0] for r in self.conn.execute(f"SELECT url FROM decks WHERE url IN ({marks})", chunk))
+        return out
+
+    def get_decks(self, urls: Iterable[str]) -> Dict[str, dict]:
+        urls = list(urls)
+        out = {}
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for url, deck in self.conn.execute(f"SELECT url, deck FROM decks WHERE url IN ({marks})", chunk):
+                out[url] = json.loads(deck)
+        return out
+
+    def put_deck(self, url: str, deck: dict) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO decks (url, deck, fetched_at) VALUES (?, ?, ?)",
+            (url, json.dumps(deck, ensure_ascii=False), time.time()),
+        )
+
+
+_STORE: Optional[StandingsStore] = None
+_STORE_GUARD = threading.Lock()
+
+
+def get_standings_store() -> StandingsStore:
+    global _STORE
+    path = Path(os.environ.get(STANDINGS_DB_ENV) or DEFAULT_STANDINGS_DB)
+    with _STORE_GUARD:
+        if _STORE is None or _STORE.db_path != path:
+            _STORE = StandingsStore(path)
+        return _STORE
+
+
+# ================== VARREDURA ==================
+
+def crawl_standings(
+    rows: list,
+    top_n: int = DEFAULT_TOP_N,
+    store: Optional[StandingsStore] = None,
+    timeout: int = 20,
+    tournament_workers: int = 4,
+    deck_workers: int = 8,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+) -> CrawlReport:
+    """
+    Baixa o top-N de cada torneio das linhas (MatchRows da listagem) e as
+    decklists dessas colocações.
+
+    Em pipeline: as decklists de um torneio entram na fila de downloads assim
+    que a classificação dele é parseada, enquanto os outros torneios ainda
+    estão sendo baixados. Decks já gravadas (nesta ou em varreduras anteriores)
+    e URLs repetidas não são baixadas de novo; a taxa por host fica com o
+    Scheduler, como no resto do crawler. Interrompida, a varredura retoma de
+    onde parou na próxima chamada.
+
+    progress(etapa, feitos, total), com etapa "torneios" ou "decklists".
+    """
+    from core.card_index import CARD_INDEX
+    from core.deadline import submit
+    from core.limitless_jp import make_absolute_url
+    from core.row_index import fetch_decklist_once
+
+    store = store or get_standings_store()
+    report = CrawlReport()
+
+    tournaments: Dict[str, object] = {}
+    for r in rows:
+        url = make_absolute_url(r.tournament_url)
+        if url:
+            tournaments.setdefault(url, r)
+    report.tournaments = len(tournaments)
+
+    done = store.done_tournaments(top_n) & set(tournaments)
+    report.tournaments_resumed = len(done)
+
+    queued: set = set()
+    deck_futs: dict = {}
+    counts = {"torneios": len(done), "decklists": 0}
+
+    def tick(stage: str, total: int) -> None:
+        if progress:
+            progress(stage, counts[stage], total)
+
+    def fetch_and_store(p: Placement) -> None:
+        deck = fetch_decklist_once(p.decklist_url, timeout=timeout)
+        store.put_deck(p.decklist_url, deck)
+        CARD_INDEX.add_rows([(p, deck)])
+
+    def enqueue(placements: List[Placement], dpool) -> None:
+        report.placements += len(placements)
+        fresh = []
+        for p in placements:
+            if p.decklist_url and p.decklist_url not in queued:
+                queued.add(p.decklist_url)
+                fresh.append(p)
+        stored = store.stored_decks(p.decklist_url for p in fresh)
+        report.decks_reused += len(stored)
+        for p in fresh:
+            if p.decklist_url not in stored:
+                deck_futs[submit(dpool, fetch_and_store, p)] = p
+
+    with ThreadPoolExecutor(max_workers=tournament_workers) as tpool, \
+            ThreadPoolExecutor(max_workers=deck_workers) as dpool:
+        # retomada: decks de torneios já varridos que não chegaram a ser gravadas
+        if done:
+            enqueue(store.placements(top_n=top_n, tournament_urls=done), dpool)
+
+        t_futs = {
+            submit(tpool, fetch_standings, url, r.row_date, r.source, top_n, timeout): (url, r)
+            for url, r in tournaments.items()
+            if url not in done
+        }
+        pending = set(t_futs) | set(deck_futs)
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                if fut in t_futs:
+                    url, r = t_futs[fut]
+                    try:
+                        placements = fut.result()
+                    except Exception as e:
+                        report.tournaments_failed += 1
+                        store.fail_tournament(url, r.row_date, r.source, top_n, f"{type(e).__name__}: {e}")
+                    else:
+                        store.put_tournament(url, r.row_date, r.source, top_n, placements)
+                        before = set(deck_futs)
+                        enqueue(placements, dpool)
+                        pending |= set(deck_futs) - before
+                    counts["torneios"] += 1
+                    tick("torneios", report.tournaments)
+                else:
+                    p = deck_futs[fut]
+                    try:
+                        fut.result()
+                        report.decks_fetched += 1
+                    except Exception as e:
+                        report.deck_errors.append({
+                            "decklist_url": p.decklist_url,
+                            "tournament_url": p.tournament_url,
+                            "placing": p.placing,
+                            "error": f"{type(e).__name__}: {e}",
+                        })
+                    counts["decklists"] += 1
+                    tick("decklists", len(deck_futs))
+
+    return report
+
+
+def standings_decklists(store: StandingsStore, placements: List[Placement]) -> tuple[list, list]:
+    """
+    ([(colocação, deck)], [colocações sem deck gravada]) a partir do banco,
+    sem rede: as decks vêm de crawl_standings.
+    """
+    decks = store.get_decks(p.decklist_url for p in placements if p.decklist_url)
+    found, missing = [], []
+    for p in placements:
+        deck = decks.get(p.decklist_url) if p.decklist_url else None
+        if deck is None:
+            missing.append(p)
+        else:
+            found.append((p, deck))
+    return found, missing
+
+
+if __name__ == "__main__":
+    # python -m core.standings [AAAA-MM-DD] [top_n] [fonte|all] -> varre/retoma as classificações
+    import sys
+
+    from core.row_index import crawl_sources, resolve_sources
+
+    since = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else date(2026, 1, 23)
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_TOP_N
+    src = sys.argv[3] if len(sys.argv) > 3 else "all"
+
+    def show(stage: str, n: int, total: int) -> None:
+        print(f"\r{stage}: {n}/{total}   ", end="", flush=True)
+
+    found_rows = crawl_sources(since, resolve_sources(src)).all()
+    rep = crawl_standings(found_rows, top_n=top, progress=show)
+    print()
+    print(
+        f"Torneios: {rep.tournaments} ({rep.tournaments_resumed} retomados, {rep.tournaments_failed} com erro) | "
+        f"colocações: {rep.placements} | decklists baixadas: {rep.decks_fetched}, "
+        f"reaproveitadas: {rep.decks_reused}, erros: {len(rep.deck_errors)}"
+    )
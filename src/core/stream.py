@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict
+from datetime import date
+from typing import Iterator
+
+from core.analysis import AnalysisResult, analyze_decklists
+from core.limitless_jp import DEFAULT_SOURCE
+
+_DONE = object()
+CANCEL_POLL_S = 0.5  # intervalo máximo entre checagens de cancelamento nos downloads
+
+
+class _Cancelled(Exception):
+    """O consumidor fechou o gerador: a varredura para na próxima página."""
+
+
+def analysis_to_dict(result: AnalysisResult) -> dict:
+    return asdict(result)
+
+
+def iter_deck_analysis(
+    found: str,
+    min_date: date,
+    source: str = DEFAULT_SOURCE,
+    partial_every: int = 5,
+    partial_interval_s: float = 2.0,
+    timeout: int = 20,
+    max_workers: int = 8,
+) -> Iterator[dict]:
+    """
+    Versão incremental de "busca no Limitless + baixa decklists + analisa".
+
+    Gera eventos (dicts) conforme o trabalho avança:
+      {"event": "crawl", "source", "page", "rows"}        a cada página lida
+      {"event": "matches", "matches_found"}               fim da varredura
+      {"event": "decklist", "i", "total", "date", "decklist_url", "deck"}
+      {"event": "decklist_error", "i", "total", "date", "decklist_url", "error"}
+      {"event": "partial", "decklists_parsed", "analysis"} a cada partial_every
+                                                          listas ou partial_interval_s
+      {"event": "done", "matches_found", "decklists_parsed", "errors_count", "analysis"}
+      {"event": "error", "error"}                          falha fatal
+    O trabalho roda numa thread. Fechar o gerador interrompe a varredura na
+    próxima página lida e cancela os downloads que ainda não começaram; os que
+    já estão em andamento terminam em segundo plano (limitados por `timeout`)
+    sem segurar a thread de trabalho.
+    """
+    from core.card_index import CARD_INDEX
+    from core.row_index import fetch_decklist_once, find_pokemon_in_sources
+
+    events: queue.Queue = queue.Queue()
+    stop = threading.Event()
+
+    def progress(src: str, page: int, rows: int) -> None:
+        if stop.is_set():
+            raise _Cancelled()
+        events.put({"event": "crawl", "source": src, "page": page, "rows": rows})
+
+    def worker() -> None:
+        try:
+            matches = find_pokemon_in_sources(found, min_date, source, timeout=timeout, progress=progress)
+            events.put({"event": "matches", "matches_found": len(matches)})
+
+            total = len(matches)
+            ex = ThreadPoolExecutor(max_workers=max_workers)
+            try:
+                futures = {}
+                for m in matches:
+                    if not m.decklist_url:
+                        events.put({
+                            "event": "decklist_error",
+                            "total": total,
+                            "date": str(m.row_date),
+                            "decklist_url": None,
+                            "error": "decklist_url ausente",
+                        })
+                        continue
+                    futures[ex.submit(fetch_decklist_once, m.decklist_url, timeout)] = m
+
+                pending = set(futures)
+                while pending and not stop.is_set():
+                    finished, pending = wait(pending, timeout=CANCEL_POLL_S, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        m = futures[fut]
+                        try:
+                            deck = fut.result()
+                        except Exception as e:
+                            events.put({
+                                "event": "decklist_error",
+                                "total": total,
+                                "date": str(m.row_date),
+                                "decklist_url": m.decklist_url,
+                                "error": str(e),
+                            })
+                            continue
+                        CARD_INDEX.add_rows([(m, deck)])
+                        events.put({
+                            "event": "decklist",
+                            "total": total,
+                            "date": str(m.row_date),
+                            "decklist_url": m.decklist_url,
+                            "deck": deck,
+                        })
+                for fut in pending:
+                    fut.cancel()
+            finally:
+                ex.shutdown(wait=False, cancel_futures=True)
+        except _Cancelled:
+            pass
+        except Exception as e:
+            events.put({"event": "error", "error": str(e)})
+        finally:
+            events.put(_DONE)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+    decklists: list[dict] = []
+    matches_found = 0
+    errors_count = 0
+    done = 0
+    last_partial = time.monotonic()
+    since_partial = 0
+
+    try:
+        while True:
+            ev = events.get()
+            if ev is _DONE:
+                break
+
+            if ev["event"] == "matches":
+                matches_found = ev["matches_found"]
+            elif ev["event"] in ("decklist", "decklist_error"):
+                done += 1
+                ev["i"] = done
+                if ev["event"] == "decklist":
+                    decklists.append(ev["deck"])
+                    since_partial += 1
+                else:
+                    errors_count += 1
+            elif ev["event"] == "error":
+                yield ev
+                return
+
+            yield ev
+
+            if since_partial and (
+                since_partial >= partial_every
+                or time.monotonic() - last_partial >= partial_interval_s
+            ):
+                since_partial = 0
+                last_partial = time.monotonic()
+                yield {
+                    "event": "partial",
+                    "decklists_parsed": len(decklists),
+                    "analysis": analysis_to_dict(analyze_decklists(decklists)),
+                }
+
+        yield {
+            "event": "done",
+            "matches_found": matches_found,
+            "decklists_parsed": len(decklists),
+            "errors_count": errors_count,
+            "analysis": analysis_to_dict(analyze_decklists(decklists)),
+        }
+    finally:
+        stop.set()
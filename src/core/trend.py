@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from core.analysis import normalize_deck
+
+BUCKETS = ("day", "week", "month")
+
+
+@dataclass
+class WindowStat:
+    n_lists: int
+    present_in: int
+    presence_pct: float
+    avg_qty: Optional[float]
+
+
+def bucket_start(d: date, bucket: str) -> date:
+    if bucket == "day":
+        return d
+    if bucket == "week":
+        return d - timedelta(days=d.weekday())  # segunda-feira
+    if bucket == "month":
+        return d.replace(day=1)
+    raise ValueError(f"bucket inválido: {bucket}")
+
+
+def _next_bucket(d: date, bucket: str) -> date:
+    if bucket == "day":
+        return d + timedelta(days=1)
+    if bucket == "week":
+        return d + timedelta(days=7)
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class CardTrend:
+    """
+    Séries temporais de presença por carta.
+
+    As decks são ordenadas por data e, para cada carta, guardamos somas
+    acumuladas (prefix sums) de aparições e de quantidade:
+        appear[c][i] = nº de decks entre as i primeiras que jogam c
+        qty[c][i]    = soma das quantidades de c nas i primeiras decks
+    Assim qualquer janela [start, end] sai com dois bisects + duas subtrações.
+    """
+
+    def __init__(self, dated_decks: List[Tuple[date, Dict[str, List[str]]]]):
+        import numpy as np
+
+        items = sorted(dated_decks, key=lambda x: x[0])
+        self.dates: List[date] = [d for d, _ in items]
+
+        cat_votes: Dict[str, Counter] = defaultdict(Counter)
+        qty_maps = []
+        for _, deck in items:
+            qty_map, cat_map = normalize_deck(deck)
+            qty_maps.append(qty_map)
+            for name, cat in cat_map.items():
+                cat_votes[name][cat] += 1
+
+        self.cards: List[str] = sorted(cat_votes, key=str.lower)
+        self.categories: Dict[str, str] = {
+            name: votes.most_common(1)[0][0] for name, votes in cat_votes.items()
+        }
+        self._col = col = {name: j for j, name in enumerate(self.cards)}
+
+        n, m = len(items), len(self.cards)
+        qty = np.zeros((n, m), dtype=np.int32)
+        for i, qty_map in enumerate(qty_maps):
+            for name, q in qty_map.items():
+                qty[i, col[name]] = q
+
+        # linha 0 = zeros, linha i = soma das i primeiras decks
+        self.appear = np.zeros((n + 1, m), dtype=np.int32)
+        self.qty = np.zeros((n + 1, m), dtype=np.int64)
+        np.cumsum(qty > 0, axis=0, out=self.appear[1:])
+        np.cumsum(qty, axis=0, out=self.qty[1:])
+
+    def _bounds(self, start: date, end: date) -> Tuple[int, int]:
+        return bisect_left(self.dates, start), bisect_right(self.dates, end)
+
+    def window(self, card: str, start: date, end: date) -> WindowStat:
+        """Presença e quantidade média de uma carta nas decks com start <= data <= end."""
+        j = self._col[card]
+        i0, i1 = self._bounds(start, end)
+        n = i1 - i0
+        present = int(self.appear[i1, j] - self.appear[i0, j])
+        total = int(self.qty[i1, j] - self.qty[i0, j])
+        return WindowStat(
+            n_lists=n,
+            present_in=present,
+            presence_pct=(present / n) * 100 if n else 0.0,
+            avg_qty=(total / present) if present else None,
+        )
+
+    def series(self, bucket: str = "week") -> dict:
+        """Todas as cartas, um ponto por bucket (vetorizado por bucket)."""
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket inválido: {bucket}")
+
+        buckets = []
+        if self.dates:
+            b = bucket_start(self.dates[0], bucket)
+            last = self.dates[-1]
+            while b <= last:
+                nxt = _next_bucket(b, bucket)
+                buckets.append((b, nxt - timedelta(days=1)))
+                b = nxt
+
+        presence = {name: [] for name in self.cards}
+        avg_qty = {name: [] for name in self.cards}
+        out_buckets = []
+
+        for start, end in buckets:
+            i0, i1 = self._bounds(start, end)
+            n = i1 - i0
+            out_buckets.append({"start": str(start), "end": str(end), "n_lists": n})
+
+            present = self.appear[i1] - self.appear[i0]
+            total = self.qty[i1] - self.qty[i0]
+            for j, name in enumerate(self.cards):
+                p = int(present[j])
+                presence[name].append(round(p / n * 100, 1) if n else None)
+                avg_qty[name].append(round(int(total[j]) / p, 2) if p else None)
+
+        return {
+            "buckets": out_buckets,
+            "cards": [
+                {
+                    "name": name,
+                    "category": self.categories[name],
+                    "presence_pct": presence[name],
+                    "avg_qty": avg_qty[name],
+                }
+                for name in self.cards
+            ],
+        }
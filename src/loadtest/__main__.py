@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from loadtest.harness import SCENARIOS, compare, load_scenario, run_scenario
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m loadtest",
+        description="Gera carga concorrente na API e mede req/s e p50/p95/p99 por endpoint.",
+    )
+    parser.add_argument("scenario", nargs="?", default="deck-mix",
+                        help=f"cenário embutido ({', '.join(sorted(SCENARIOS))}) ou arquivo .json")
+    parser.add_argument("--target", help="URL de um servidor já rodando (não sobe stub/servidor)")
+    parser.add_argument("--concurrency", help="sobrescreve os passos, ex.: 1,8,32")
+    parser.add_argument("--duration", type=float, help="segundos medidos por passo")
+    parser.add_argument("--warmup", type=float, help="segundos de aquecimento por passo")
+    parser.add_argument("--workers", type=int, help="workers do uvicorn")
+    parser.add_argument("--out", help="grava o relatório completo em JSON")
+    parser.add_argument("--baseline", help="relatório JSON anterior para comparação")
+    args = parser.parse_args(argv)
+
+    try:
+        scenario = load_scenario(args.scenario)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if args.concurrency:
+        scenario.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    if args.duration is not None:
+        scenario.duration_s = args.duration
+    if args.warmup is not None:
+        scenario.warmup_s = args.warmup
+    if args.workers is not None:
+        scenario.server_workers = args.workers
+
+    report = run_scenario(scenario, target=args.target)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        print()
+        print(compare(report, baseline))
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nRelatório salvo em: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
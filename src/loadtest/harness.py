@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote, urlsplit
+
+from loadtest.stub import POKEMON_POOL, StubConfig, StubUpstream
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class MixEntry:
+    """Um tipo de requisição do cenário. path aceita {pokemon} e {source}."""
+    name: str
+    path: str
+    weight: float = 1.0
+
+
+DEFAULT_MIX = [
+    MixEntry("deck/core", "/v1/deck/core?pokemon={pokemon}&source={source}", 4),
+    MixEntry("deck/above50", "/v1/deck/above50?pokemon={pokemon}&source={source}", 2),
+    MixEntry("deck/base", "/v1/deck/base?pokemon={pokemon}&source={source}", 2),
+    MixEntry("deck/trend", "/v1/deck/trend?pokemon={pokemon}&source={source}", 1),
+    MixEntry("limitless/count", "/v1/limitless/count?pokemon={pokemon}&source={source}", 1),
+]
+
+
+@dataclass
+class Scenario:
+    name: str = "deck-mix"
+    concurrency: List[int] = field(default_factory=lambda: [1, 4, 16, 64])  # um passo por valor
+    duration_s: float = 30.0         # duração medida de cada passo
+    warmup_s: float = 5.0            # requisições nesse intervalo não entram no relatório
+    request_timeout_s: float = 60.0
+    mix: List[MixEntry] = field(default_factory=lambda: list(DEFAULT_MIX))
+    pokemon: List[str] = field(default_factory=lambda: POKEMON_POOL[:6])
+    sources: List[str] = field(default_factory=lambda: ["jp"])
+    server_workers: int = 1          # uvicorn --workers
+    server_env: Dict[str, str] = field(default_factory=dict)
+    upstream: StubConfig = field(default_factory=StubConfig)
+    upstream_rate: Optional[float] = None  # req/s do scheduler no stub (None = política do Limitless)
+    bypass_response_cache: bool = False    # query única por requisição: mede o cálculo, não o cache de ETag
+    seed: int = 0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Scenario":
+        data = dict(data)
+        if "mix" in data:
+            data["mix"] = [MixEntry(**m) for m in data["mix"]]
+        if "upstream" in data:
+            data["upstream"] = StubConfig(**data["upstream"])
+        if isinstance(data.get("concurrency"), int):
+            data["concurrency"] = [data["concurrency"]]
+        return cls(**data)
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    # rápido, para conferir que o harness e o servidor sobem
+    "smoke": Scenario(
+        name="smoke",
+        concurrency=[1, 4],
+        duration_s=5.0,
+        warmup_s=2.0,
+        upstream=StubConfig(latency_ms=10.0, jitter_ms=5.0, pages=2),
+        upstream_rate=100.0,
+    ),
+    # mix padrão de /v1/deck/*, subindo a concorrência até a latência desandar
+    "deck-mix": Scenario(),
+    # upstream limitando a taxa: 5% de 429 com Retry-After (backoff e AIMD do scheduler)
+    "deck-mix-throttled": Scenario(
+        name="deck-mix-throttled",
+        upstream=StubConfig(throttle_rate=0.05, retry_after_s=1),
+    ),
+    # mesmo mix com 4 workers do uvicorn e cache compartilhado entre eles
+    "deck-mix-shared": Scenario(
+        name="deck-mix-shared",
+        server_workers=4,
+        server_env={"POKEMON_SHARED_DB": "{tmp}/shared.sqlite3"},
+    ),
+}
+
+
+def load_scenario(name_or_path: str) -> Scenario:
+    if name_or_path in SCENARIOS:
+        return SCENARIOS[name_or_path]
+    path = Path(name_or_path)
+    if not path.exists():
+        raise ValueError(f"Cenário desconhecido: {name_or_path!r} (embutidos: {sorted(SCENARIOS)})")
+    return Scenario.from_dict(json.loads(path.read_text(encoding="utf-8")))
+
+
+# ================== MEDIÇÃO ==================
+
+@dataclass
+class Sample:
+    name: str
+    started: float
+    latency: float
+    status: Optional[int]   # None = erro de conexão/timeout
+    size: int
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank, como a maioria das ferramentas de carga."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(samples: List[Sample], elapsed_s: float) -> dict:
+    lat = sorted(s.latency * 1000 for s in samples)
+    statuses: Dict[str, int] = {}
+    for s in samples:
+        key = str(s.status) if s.status is not None else "conn_error"
+        statuses[key] = statuses.get(key, 0) + 1
+    errors = sum(1 for s in samples if s.status is None or s.status >= 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "statuses": statuses,
+        "rps": round(len(samples) / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        "mean_ms": round(sum(lat) / len(lat), 1) if lat else 0.0,
+        "p50_ms": round(_percentile(lat, 50), 1),
+        "p95_ms": round(_percentile(lat, 95), 1),
+        "p99_ms": round(_percentile(lat, 99), 1),
+        "max_ms": round(lat[-1], 1) if lat else 0.0,
+        "bytes": sum(s.size for s in samples),
+    }
+
+
+def _worker(
+    base_url: str,
+    scenario: Scenario,
+    rng: random.Random,
+    deadline: float,
+    out: List[Sample],
+) -> None:
+    """Loop fechado: uma conexão keep-alive, próxima requisição só depois da resposta."""
+    parts = urlsplit(base_url)
+    conn: Optional[http.client.HTTPConnection] = None
+    weights = [m.weight for m in scenario.mix]
+
+    while time.perf_counter() < deadline:
+        entry = rng.choices(scenario.mix, weights)[0]
+        path = entry.path.format(
+            pokemon=quote(rng.choice(scenario.pokemon)),
+            source=quote(rng.choice(scenario.sources)),
+        )
+        if scenario.bypass_response_cache:
+            path += f"{'&' if '?' in path else '?'}_lt={rng.getrandbits(48):x}"
+        if conn is None:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=scenario.request_timeout_s)
+
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+            resp = conn.getresponse()
+            body = resp.read()
+            status, size = resp.status, len(body)
+            if resp.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            status, size = None, 0
+            conn.close()
+            conn = None
+        out.append(Sample(entry.name, t0, time.perf_counter() - t0, status, size))
+
+    if conn is not None:
+        conn.close()
+
+
+def run_step(base_url: str, scenario: Scenario, concurrency: int) -> dict:
+    """Um passo do cenário: `concurrency` clientes durante warmup_s + duration_s."""
+    start = time.perf_counter()
+    measure_from = start + scenario.warmup_s
+    deadline = measure_from + scenario.duration_s
+
+    per_worker: List[List[Sample]] = [[] for _ in range(concurrency)]
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(base_url, scenario, random.Random(f"{scenario.seed}:{concurrency}:{i}"), deadline, per_worker[i]),
+            daemon=True,
+        )
+        for i in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # requisições em voo no fim do passo terminam depois do deadline; o tempo
+    # efetivo vai até a última resposta contada
+    samples = [s for out in per_worker for s in out if s.started >= measure_from]
+    end = max((s.started + s.latency for s in samples), default=deadline)
+    elapsed = max(end, deadline) - measure_from
+
+    by_name: Dict[str, List[Sample]] = {}
+    for s in samples:
+        by_name.setdefault(s.name, []).append(s)
+
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "total": summarize(samples, elapsed),
+        "endpoints": {name: summarize(v, elapsed) for name, v in sorted(by_name.items())},
+    }
+
+
+# ================== SERVIDOR ==================
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServerProcess:
+    """uvicorn loadtest.serve:app num subprocesso, apontado para o stub."""
+
+    def __init__(self, scenario: Scenario, upstream_url: str, tmp_dir: Path):
+        from loadtest.serve import UPSTREAM_ENV, UPSTREAM_RATE_ENV
+
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH")]))
+        env[UPSTREAM_ENV] = upstream_url
+        if scenario.upstream_rate is not None:
+            env[UPSTREAM_RATE_ENV] = str(scenario.upstream_rate)
+        # sem workers de jobs e com banco próprio: não mexe no Desktop do usuário
+        env["POKEMON_JOB_WORKERS"] = "0"
+        env["POKEMON_JOBS_DB"] = str(tmp_dir / "jobs.sqlite3")
+        for k, v in scenario.server_env.items():
+            env[k] = v.replace("{tmp}", str(tmp_dir))
+
+        self._cmd = [
+            sys.executable, "-m", "uvicorn", "loadtest.serve:app",
+            "--host", "127.0.0.1", "--port", str(self.port),
+            "--workers", str(scenario.server_workers),
+            "--log-level", "warning",
+        ]
+        self._env = env
+        self._proc: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 30.0) -> "ServerProcess":
+        self._proc = subprocess.Popen(self._cmd, env=self._env)
+        limit = time.monotonic() + timeout
+        while time.monotonic() < limit:
+            if self._proc.poll() is not None:
+                raise RuntimeError(f"Servidor saiu com código {self._proc.returncode}")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=1)
+                conn.request("GET", "/openapi.json")
+                conn.getresponse().read()
+                conn.close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"Servidor não respondeu em {timeout:.0f}s")
+
+    def stop(self) -> None:
+        if self._proc and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(10)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+
+
+# ================== EXECUÇÃO ==================
+
+def _git_rev() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SRC_DIR, capture_output=True, text=True, timeout=5,
+        )
+        rev = out.stdout.strip()
+        if not rev:
+            return None
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=SRC_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_scenario(scenario: Scenario, target: Optional[str] = None, progress=print) -> dict:
+    """
+    Roda todos os passos do cenário. Sem target, sobe o stub e o servidor
+    (uvicorn, scenario.server_workers) localmente; com target, só gera carga
+    contra a URL indicada (o servidor já deve estar apontado para um stub).
+    """
+    import tempfile
+
+    report = {
+        "scenario": asdict(scenario),
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "target": target,
+        },
+        "steps": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="pokemon-loadtest-") as tmp:
+        stub = server = None
+        try:
+            if target is None:
+                stub = StubUpstream(scenario.upstream).start()
+                server = ServerProcess(scenario, stub.url, Path(tmp)).start()
+                target = server.url
+                progress(f"Stub em {stub.url}; servidor em {target} ({scenario.server_workers} worker(s))")
+
+            for c in scenario.concurrency:
+                before = stub.requests if stub else None
+                progress(f"Passo: {c} cliente(s), {scenario.warmup_s:.0f}s aquecimento + {scenario.duration_s:.0f}s")
+                step = run_step(target, scenario, c)
+                if stub is not None:
+                    step["upstream_requests"] = stub.requests - before
+                report["steps"].append(step)
+                progress(format_step(step))
+        finally:
+            if server is not None:
+                server.stop()
+            if stub is not None:
+                stub.stop()
+
+    return report
+
+
+# ================== RELATÓRIO ==================
+
+def format_step(step: dict, baseline: Optional[dict] = None) -> str:
+    def delta(new: float, old: Optional[float]) -> str:
+        if old in (None, 0):
+            return ""
+        return f" ({(new - old) / old * 100:+.0f}%)"
+
+    lines = [f"--- concorrência {step['concurrency']} ({step['elapsed_s']}s) ---"]
+    lines.append(f"{'endpoint':<20} {'req':>6} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    rows = list(step["endpoints"].items()) + [("TOTAL", step["total"])]
+    for name, s in rows:
+        old = None
+        if baseline:
+            old = baseline["total"] if name == "TOTAL" else baseline["endpoints"].get(name)
+        line = (
+            f"{name:<20} {s['requests']:>6} {s['errors']:>5} {s['rps']:>8.1f} "
+            f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}"
+        )
+        if old:
+            line += f"   req/s{delta(s['rps'], old['rps'])} p95{delta(s['p95_ms'], old['p95_ms'])}"
+        lines.append(line)
+    if "upstream_requests" in step:
+        lines.append(f"requisições ao stub: {step['upstream_requests']}")
+    return "\n".join(lines)
+
+
+def compare(report: dict, baseline: dict) -> str:
+    """Mesmos passos (por concorrência) lado a lado com um relatório anterior."""
+    old_steps = {s["concurrency"]: s for s in baseline.get("steps", [])}
+    meta = baseline.get("meta", {})
+    out = [f"Comparando com {meta.get('git_rev') or '?'} de {meta.get('started_at') or '?'}"]
+    for step in report["steps"]:
+        out.append(format_step(step, old_steps.get(step["concurrency"])))
+    return "\n".join(out)
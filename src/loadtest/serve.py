@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import os
+from urllib.parse import urlsplit
+
+from api.api import app  # noqa: F401  (uvicorn loadtest.serve:app)
+from core import limitless_jp, pokeapi
+from core.limitless_jp import register_source
+from core.scheduler import DEFAULT_POLICIES, SCHEDULER, HostPolicy
+
+# App da API apontada para o StubUpstream (uvicorn loadtest.serve:app).
+# Cada worker do uvicorn importa este módulo e se configura pelas variáveis:
+UPSTREAM_ENV = "POKEMON_LOADTEST_UPSTREAM"          # ex.: http://127.0.0.1:8765
+UPSTREAM_RATE_ENV = "POKEMON_LOADTEST_UPSTREAM_RATE"  # req/s no stub (padrão: política do Limitless)
+
+
+def configure(upstream: str, rate: float | None = None) -> None:
+    """Troca Limitless/PokéAPI pelo stub e aplica ao host dele a política de taxa do Limitless."""
+    upstream = upstream.rstrip("/")
+    limitless_jp.SITE_BASE = upstream  # hrefs relativos das listagens
+    register_source("jp", f"{upstream}/tournaments/jp")
+    register_source("intl", f"{upstream}/tournaments/intl")
+    pokeapi.API = f"{upstream}/api/v2/pokemon/{{}}"
+    pokeapi.API_LIST = f"{upstream}/api/v2/pokemon?limit=100000"
+
+    base = DEFAULT_POLICIES["limitlesstcg.com"]
+    policy = HostPolicy(
+        rate=rate if rate is not None else base.rate,
+        burst=base.burst if rate is None else max(base.burst, int(rate)),
+        max_concurrency=base.max_concurrency,
+    )
+    SCHEDULER.policies[urlsplit(upstream).hostname or ""] = policy
+
+
+_upstream = os.environ.get(UPSTREAM_ENV)
+if _upstream:
+    _rate = os.environ.get(UPSTREAM_RATE_ENV)
+    configure(_upstream, float(_rate) if _rate else None)
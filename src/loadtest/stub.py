@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import hashlib
+import http.server
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+# Imitação local do Limitless (listagens + decklists) e da PokéAPI, com dados
+# sintéticos determinísticos (seed) e latência injetada por requisição.
+
+POKEMON_POOL = [
+    "zoroark", "charizard", "gardevoir", "dragapult", "gholdengo", "lugia",
+    "miraidon", "pidgeot", "snorlax", "terapagos", "archaludon", "dusknoir",
+]
+
+_SHARED_TRAINERS = [
+    "Professor's Research", "Iono", "Boss's Orders", "Ultra Ball", "Nest Ball",
+    "Rare Candy", "Super Rod", "Night Stretcher", "Earthen Vessel", "Counter Catcher",
+    "Switch", "Lost Vacuum", "Judge", "Arven", "Buddy-Buddy Poffin",
+]
+_ENERGIES = ["Psychic Energy", "Fire Energy", "Dark Energy", "Lightning Energy", "Water Energy"]
+
+STANDINGS_PLAYERS = 32      # colocações na página de cada torneio
+PLACED_DECK_BASE = 1_000_000  # ids das decks não vencedoras: base + torneio * 100 + colocação
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 50.0       # latência média por requisição
+    jitter_ms: float = 25.0        # +- uniforme em volta da média
+    error_rate: float = 0.0        # fração de respostas 503
+    throttle_rate: float = 0.0     # fração de respostas 429 (limite de taxa do servidor)
+    retry_after_s: int = 1         # Retry-After dos 429 (segundos; 0 = sem o cabeçalho)
+    sources: List[str] = field(default_factory=lambda: ["jp", "intl"])
+    pages: int = 6                 # páginas por fonte
+    rows_per_page: int = 50
+    start: Optional[str] = None    # data da 1ª linha (ISO); padrão: hoje
+    days: int = 300                # período coberto pelas linhas de cada fonte
+    seed: int = 0
+
+
+class StubData:
+    """Linhas e decks sintéticos; tudo derivado de config.seed."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        rng = random.Random(config.seed)
+        start = date.fromisoformat(config.start) if config.start else date.today()
+
+        # distribuição de vitórias concentrada em poucos arquétipos (como no meta real)
+        weights = self.weights = [1.0 / (i + 1) for i in range(len(POKEMON_POOL))]
+
+        self.rows: Dict[str, List[tuple]] = {}
+        self.deck_main: Dict[int, str] = {}
+        deck_id = 0
+        for src in config.sources:
+            total = config.pages * config.rows_per_page
+            rows = []
+            for i in range(total):
+                d = start - timedelta(days=int(i * config.days / total))
+                main = rng.choices(POKEMON_POOL, weights)[0]
+                alts = [main]
+                if rng.random() < 0.4:
+                    alts.append(rng.choice([p for p in POKEMON_POOL if p != main]))
+                deck_id += 1
+                self.deck_main[deck_id] = main
+                rows.append((d.isoformat(), alts, deck_id))
+            self.rows[src] = rows
+
+    def listing_html(self, source: str, page: int) -> Optional[str]:
+        rows = self.rows.get(source)
+        if rows is None:
+            return None
+        per = self.config.rows_per_page
+        chunk = rows[(page - 1) * per: page * per]
+        trs = []
+        for iso, alts, deck_id in chunk:
+            imgs = "".join(f'<img alt="{a}">' for a in alts)
+            trs.append(
+                f'<tr data-date="{iso}"><td><a href="/tournaments/{deck_id}">{iso}</a></td>'
+                f"<td>T</td><td>64</td>"
+                f'<td><a href="/decks/list/{deck_id}">{imgs}</a></td></tr>'
+            )
+        return (
+            '<html><body><table class="completed-tournaments"><tbody>'
+            + "".join(trs)
+            + "</tbody></table></body></html>"
+        )
+
+    def placed_main(self, tournament_id: int, placing: int) -> str:
+        if placing == 1 and tournament_id in self.deck_main:
+            return self.deck_main[tournament_id]
+        rng = random.Random(f"{self.config.seed}:standing:{tournament_id}:{placing}")
+        return rng.choices(POKEMON_POOL, self.weights)[0]
+
+    def standings_html(self, tournament_id: int) -> Optional[str]:
+        """Classificação do torneio: o 1º é a linha da listagem (mesma deck), o resto sintético."""
+        if tournament_id not in self.deck_main:
+            return None
+        trs = []
+        for placing in range(1, STANDINGS_PLAYERS + 1):
+            deck_id = tournament_id if placing == 1 else PLACED_DECK_BASE + tournament_id * 100 + placing
+            main = self.placed_main(tournament_id, placing)
+            trs.append(
+                f'<tr><td>{placing}</td><td><a href="/players/{deck_id}">Player {deck_id}</a></td>'
+                f'<td><a href="/decks/list/{deck_id}"><img alt="{main}"></a></td></tr>'
+            )
+        return (
+            "<html><body><table><tr><th>#</th><th>Player</th><th>Deck</th></tr>"
+            + "".join(trs)
+            + "</table></body></html>"
+        )
+
+    def deck_html(self, deck_id: int) -> str:
+        # o arquétipo vem da linha (ou da classificação); o resto da lista varia com o id
+        main = self.deck_main.get(deck_id)
+        if main is None and deck_id > PLACED_DECK_BASE:
+            tournament_id, placing = divmod(deck_id - PLACED_DECK_BASE, 100)
+            main = self.placed_main(tournament_id, placing)
+        main = main or POKEMON_POOL[deck_id % len(POKEMON_POOL)]
+
+        rng = random.Random(f"{self.config.seed}:{deck_id}")
+        arch = random.Random(f"{self.config.seed}:{main}")
+        title = main.capitalize()
+
+        pokemon = [(4, title), (3, f"{title} ex"), (rng.choice([1, 2]), "Pidgey")]
+        core_trainers = arch.sample(_SHARED_TRAINERS, 8)
+        flex = rng.sample([t for t in _SHARED_TRAINERS if t not in core_trainers], 3)
+        trainers = [(4, t) for t in core_trainers[:5]] + [(2, t) for t in core_trainers[5:]]
+        trainers += [(rng.choice([1, 2]), t) for t in flex]
+        energy = [(rng.choice([8, 9, 10]), arch.choice(_ENERGIES))]
+
+        def block(title_: str, cards) -> str:
+            n = sum(q for q, _ in cards)
+            return f"<div>{title_} ({n})</div>" + "".join(f"<a>{q} {c}</a>" for q, c in cards)
+
+        return (
+            "<html><body>"
+            + block("Pokémon", pokemon)
+            + block("Trainer", trainers)
+            + block("Energy", energy)
+            + "</body></html>"
+        )
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_StubHTTPServer"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(
+        self,
+        status: int,
+        body: bytes = b"",
+        content_type: str = "text/html; charset=utf-8",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        etag = f'"{hashlib.md5(body).hexdigest()}"' if status == 200 else None
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        stub = self.server.stub
+        stub.count()
+        cfg = stub.data.config
+        time.sleep(max(0.0, cfg.latency_ms + stub.rng_uniform(-cfg.jitter_ms, cfg.jitter_ms)) / 1000)
+        if cfg.error_rate and stub.rng_uniform(0, 1) < cfg.error_rate:
+            self._send(503)
+            return
+        if cfg.throttle_rate and stub.rng_uniform(0, 1) < cfg.throttle_rate:
+            self._send(429, headers={"Retry-After": str(cfg.retry_after_s)} if cfg.retry_after_s else None)
+            return
+
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        query = parse_qs(parts.query)
+
+        # PokéAPI
+        if path == "/api/v2/pokemon":
+            names = [{"name": n, "url": f"/api/v2/pokemon/{n}"} for n in POKEMON_POOL]
+            self._send(200, json.dumps({"count": len(names), "results": names}).encode(), "application/json")
+            return
+        if path.startswith("/api/v2/pokemon/"):
+            name = path.rsplit("/", 1)[1]
+            if name in POKEMON_POOL:
+                self._send(200, json.dumps({"name": name}).encode(), "application/json")
+            else:
+                self._send(404)
+            return
+
+        # Limitless
+        if path.startswith("/decks/list/"):
+            try:
+                deck_id = int(path.rsplit("/", 1)[1])
+            except ValueError:
+                self._send(404)
+                return
+            self._send(200, stub.data.deck_html(deck_id).encode())
+            return
+
+        if path.startswith("/tournaments"):
+            source = path[len("/tournaments"):].strip("/") or "intl"
+            if source.isdigit():
+                html = stub.data.standings_html(int(source))
+                if html is None:
+                    self._send(404)
+                    return
+                self._send(200, html.encode())
+                return
+            page = int(query.get("page", ["1"])[0])
+            html = stub.data.listing_html(source, page)
+            if html is None:
+                self._send(404)
+                return
+            self._send(200, html.encode())
+            return
+
+        self._send(404)
+
+
+class _StubHTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "StubUpstream"
+
+
+class StubUpstream:
+    """Servidor HTTP local (uma thread por conexão) no lugar de limitlesstcg.com + pokeapi.co."""
+
+    def __init__(self, config: StubConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.data = StubData(config or StubConfig())
+        self._server = _StubHTTPServer((host, port), _Handler)
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.data.config.seed)
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def rng_uniform(self, a: float, b: float) -> float:
+        with self._lock:
+            return self._rng.uniform(a, b)
+
+    def start(self) -> "StubUpstream":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubUpstream":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -1,22 +1,224 @@
 from __future__ import annotations
 
-from datetime import date
-from pathlib import Path
+import os
+import sys
+import time
 from datetime import date, datetime
+from pathlib import Path
 
-from core.pokeapi import (
-    build_candidates,
-    resolve_pokemon_name_from_candidates,
-)
-from core.limitless_jp import find_pokemon_in_limitless_since
-from core.decklist import fetch_decklist
-from core.analysis import analyze_decklists, write_analysis_txt
+# Imports pesados (requests, bs4, core.*) ficam dentro dos métodos: o prompt
+# inicial precisa aparecer rápido mesmo no executável do PyInstaller.
+from core.snapshot import DEFAULT_SNAPSHOT_PATH, Snapshot, load_snapshot
 
 MIN_DATE = date(2026, 1, 23)
 
+# Reamostragens do bootstrap no relatório (0 = sem intervalos de confiança)
+BOOTSTRAP_RESAMPLES = int(os.environ.get("POKEMON_BOOTSTRAP", "0"))
+
+# Distância de edição máxima para usar a sugestão automaticamente
+SUGGEST_MAX_DISTANCE = 2
+
+# Tempo máximo (s) entre o início do processo e o primeiro prompt
+COLD_START_BUDGET_S = 0.5
+
+SNAPSHOT_PATH = Path(os.environ.get("POKEMON_SNAPSHOT", DEFAULT_SNAPSHOT_PATH))
+
+# Snapshot mais velho que isso é ignorado (torneios novos entram toda semana)
+SNAPSHOT_MAX_AGE_S = float(os.environ.get("POKEMON_SNAPSHOT_MAX_AGE", str(3 * 24 * 3600)))
+
+
+def _process_uptime() -> float | None:
+    """
+    Segundos desde a criação do processo (interpretador e imports inclusos).
+    None se o sistema não informar; no executável onefile do PyInstaller conta
+    a partir do processo filho, depois da extração.
+    """
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/stat", "rb") as f:
+                stat = f.read()
+            # campos depois de "(comm)": starttime (22º campo) em ticks desde o boot
+            start_ticks = int(stat[stat.rindex(b")") + 2:].split()[19])
+            with open("/proc/uptime", "rb") as f:
+                uptime = float(f.read().split()[0])
+            return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+        if os.name == "nt":
+            import ctypes
+            from ctypes import wintypes
+
+            creation, exit_, kernel, user, now = (wintypes.FILETIME() for _ in range(5))
+            k32 = ctypes.windll.kernel32
+            if not k32.GetProcessTimes(
+                k32.GetCurrentProcess(),
+                ctypes.byref(creation), ctypes.byref(exit_), ctypes.byref(kernel), ctypes.byref(user),
+            ):
+                return None
+            k32.GetSystemTimeAsFileTime(ctypes.byref(now))
+
+            def ticks(ft) -> int:
+                return (ft.dwHighDateTime << 32) | ft.dwLowDateTime
+
+            return (ticks(now) - ticks(creation)) / 1e7  # FILETIME: unidades de 100 ns
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+    return None
+
 
 class PokemonAnalisysApp:
+    def __init__(self, started_at: float | None = None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.snapshot: Snapshot | None = None
+        self.snapshot_stale = False
+        self.name_index = None
+
+    def _load_snapshot(self) -> None:
+        snap = load_snapshot(SNAPSHOT_PATH)
+        # só serve se cobrir todo o período desde MIN_DATE
+        if not snap or date.fromisoformat(snap.min_date) > MIN_DATE:
+            return
+        age = (datetime.now() - datetime.fromisoformat(snap.built_at)).total_seconds()
+        if age > SNAPSHOT_MAX_AGE_S:
+            print(f"⚠️ Snapshot de {snap.built_at} ignorado: mais velho que {SNAPSHOT_MAX_AGE_S / 3600:.0f}h")
+            return
+        self.snapshot = snap
+        print(f"📦 Snapshot carregado ({len(snap.rows)} linhas, gerado em {snap.built_at})")
+
+    def _snapshot_rows_current(self) -> bool:
+        """
+        As linhas do snapshot ainda valem? Compara a página 1 da listagem com a
+        do momento em que ele foi gerado (na primeira busca, não no início: a
+        checagem usa a rede). Sem rede, ou snapshot antigo sem o hash, vale.
+        As decklists do snapshot continuam valendo de qualquer jeito.
+        """
+        if self.snapshot_stale or not self.snapshot.listing_hash:
+            return not self.snapshot_stale
+        try:
+            from core.limitless_jp import listing_version
+
+            current = listing_version([self.snapshot.source])
+        except Exception:
+            return True
+        if current != self.snapshot.listing_hash:
+            print("🔄 Entraram torneios novos depois do snapshot; buscando no Limitless.")
+            self.snapshot_stale = True
+        return not self.snapshot_stale
+
+    def _resolve(self, q: str) -> tuple[str | None, list[str], str | None]:
+        """(nome, candidatos, quem validou o nome: "snapshot", "pokeapi" ou None)."""
+        from core.pokeapi import build_candidates, resolve_pokemon_name_from_candidates
+
+        candidates = build_candidates(q)
+
+        # nomes já vistos no snapshot vieram do próprio Limitless: dispensa a PokéAPI
+        if self.snapshot:
+            for c in candidates:
+                if self.snapshot.has_pokemon(c):
+                    return c, candidates, "snapshot"
+
+        found = resolve_pokemon_name_from_candidates(candidates)
+        if found:
+            return found, candidates, "pokeapi"
+
+        # fallback: busca aproximada no índice local de nomes
+        suggestions = self._suggest(q)
+        if suggestions and suggestions[0].distance <= SUGGEST_MAX_DISTANCE:
+            best = suggestions[0].name
+            if self.snapshot and self.snapshot.has_pokemon(best):
+                validated_by = "snapshot"
+            elif resolve_pokemon_name_from_candidates([best]):
+                validated_by = "pokeapi"
+            else:
+                validated_by = None
+            if validated_by:
+                print(f"🔁 '{q}' não encontrado; usando a sugestão mais próxima: {best}")
+                return best, candidates + [best], validated_by
+
+        if suggestions:
+            print("💡 Você quis dizer: " + ", ".join(s.name for s in suggestions[:5]) + "?")
+        return None, candidates, None
+
+    def _suggest(self, q: str) -> list:
+        from core.name_index import build_name_index
+
+        if self.name_index is None:
+            alts = [row[1] for row in self.snapshot.rows] if self.snapshot else []
+            self.name_index = build_name_index(alts)
+        return self.name_index.suggest(q, limit=5)
+
+    def _print_found(self, found: str, n: int) -> None:
+        print(
+            f"✅ Foram encontradas {n} listas de {found} no Limitless desde {MIN_DATE.strftime('%d/%m/%Y')}"
+        )
+        print(f"\n🔎 Obtendo as decklists vencedoras...\n")
+
+    def _print_partial(self, n: int, analysis: dict) -> None:
+        print(
+            f"   📊 Parcial com {n} listas: cerne de {analysis['core_count_cards']} cartas, "
+            f"ACE SPEC: {analysis['ace_spec'] or '(não identificada)'}"
+        )
+
+    def _collect_from_snapshot(self, found: str) -> list[dict] | None:
+        matches = [m for m in self.snapshot.match_rows(found) if m.row_date >= MIN_DATE]
+        if not matches:
+            return None
+
+        self._print_found(found, len(matches))
+
+        decklists = []
+        for i, m in enumerate(matches, start=1):
+            if not m.decklist_url:
+                print(f"   ⚠️ [{i}/{len(matches)}] {m.row_date}: decklist_url não encontrada na coluna Winner")
+                continue
+            try:
+                decklists.append(self._fetch_deck(m.decklist_url))
+                print(f"   📥 [{i}/{len(matches)}] {m.row_date}: decklist obtida")
+            except Exception as e:
+                print(f"   ⚠️ [{i}/{len(matches)}] {m.row_date}: falha ao baixar/parsear decklist: {e}")
+        return decklists
+
+    def _collect_streaming(self, found: str) -> list[dict] | None:
+        from core.stream import iter_deck_analysis
+
+        decklists = []
+        for ev in iter_deck_analysis(found, MIN_DATE):
+            kind = ev["event"]
+            if kind == "crawl":
+                print(f"   📄 Página {ev['page']} ({ev['source']}): {ev['rows']} linhas até agora")
+            elif kind == "matches":
+                if not ev["matches_found"]:
+                    return None
+                print()
+                self._print_found(found, ev["matches_found"])
+            elif kind == "decklist":
+                decklists.append(ev["deck"])
+                print(f"   📥 [{ev['i']}/{ev['total']}] {ev['date']}: decklist obtida")
+            elif kind == "decklist_error":
+                print(f"   ⚠️ [{ev['i']}/{ev['total']}] {ev['date']}: {ev['error']}")
+            elif kind == "partial":
+                self._print_partial(ev["decklists_parsed"], ev["analysis"])
+            elif kind == "error":
+                raise RuntimeError(ev["error"])
+        return decklists
+
+    def _fetch_deck(self, decklist_url: str) -> dict:
+        if self.snapshot and decklist_url in self.snapshot.decks:
+            return self.snapshot.decks[decklist_url]
+
+        from core.decklist import fetch_decklist
+
+        return fetch_decklist(decklist_url)
+
     def run(self):
+        self._load_snapshot()
+
+        # orçamento conta desde a criação do processo; sem essa informação,
+        # desde o primeiro import de run.py (sem a subida do interpretador)
+        elapsed = _process_uptime()
+        if elapsed is None:
+            elapsed = time.perf_counter() - self.started_at
+        if elapsed > COLD_START_BUDGET_S:
+            print(f"⚠️ Inicialização levou {elapsed:.2f}s (orçamento: {COLD_START_BUDGET_S:.2f}s)")
+
         while True:
             q = input("Digite o nome do Pokémon (ou 'sair'): ").strip()
             if not q:
@@ -24,69 +226,36 @@ class PokemonAnalisysApp:
             if q.lower() == "sair":
                 break
 
-            # 1) valida pokémon na PokéAPI
-            candidates = build_candidates(q)
-            found = resolve_pokemon_name_from_candidates(candidates)
+            # 1) valida o nome (snapshot ou PokéAPI)
+            found, candidates, validated_by = self._resolve(q)
 
             if not found:
                 print(f"❌ Pokémon não existe na PokéAPI. Tentativas: {candidates}")
                 continue
 
-            print(f"✅ {found} foi encontrado e validado pela PokéAPI")
+            if validated_by == "snapshot":
+                print(f"✅ {found} foi encontrado no snapshot (nome já visto no Limitless)")
+            else:
+                print(f"✅ {found} foi encontrado e validado pela PokéAPI")
             print(f"\n🔎 Localizando decklists vencedoras de {found}...\n")
 
-            # 2) procura no Limitless (JP) desde MIN_DATE
-            matches = find_pokemon_in_limitless_since(found, MIN_DATE)
+            # 2) procura no Limitless (JP) desde MIN_DATE e 3) baixa as decklists,
+            # imprimindo o progresso conforme as listas chegam
+            if self.snapshot and self.snapshot.has_pokemon(found) and self._snapshot_rows_current():
+                decklists = self._collect_from_snapshot(found)
+            else:
+                decklists = self._collect_streaming(found)
 
-            if not matches:
+            if decklists is None:
                 print(f"❌ Não apareceu como winner desde {MIN_DATE.strftime('%d/%m/%Y')}.")
                 continue
 
-            print(
-                f"✅ Foram encontradas {len(matches)} listas de {found} no Limitless desde {MIN_DATE.strftime('%d/%m/%Y')}"
-            )
-            print(f"\n🔎 Obtendo as decklists vencedoras...\n")
-
-            # 3) loop nas matches e baixa decklist de cada uma
-            decklists_dict = {}
-
-            for i, m in enumerate(matches, start=1):
-                key = f"lista_{i}"
-
-                if not m.decklist_url:
-                    decklists_dict[key] = {
-                        "error": "decklist_url não encontrada na coluna Winner",
-                        "date": str(m.row_date),
-                        "alts": m.alts,
-                        "tournament_url": m.tournament_url,
-                        "decklist_url": None,
-                    }
-                    continue
-
-                try:
-                    deck = fetch_decklist(m.decklist_url)
-                    decklists_dict[key] = {
-                        "date": str(m.row_date),
-                        "alts": m.alts,
-                        "tournament_url": m.tournament_url,
-                        "decklist_url": m.decklist_url,
-                        "deck": deck,
-                    }
-                except Exception as e:
-                    decklists_dict[key] = {
-                        "error": f"Falha ao baixar/parsear decklist: {e}",
-                        "date": str(m.row_date),
-                        "alts": m.alts,
-                        "tournament_url": m.tournament_url,
-                        "decklist_url": m.decklist_url,
-                    }
-
-            print(f"✅ Todas as {len(decklists_dict)} decklists foram coletadas\n")
+            print(f"✅ Todas as {len(decklists)} decklists foram coletadas\n")
 
             # 4) roda a análise (cerne + presença + ACE etc.)
-            decklists = [v["deck"] for v in decklists_dict.values() if "deck" in v]
+            from core.analysis import analyze_decklists, write_analysis_txt
 
-            result = analyze_decklists(decklists)
+            result = analyze_decklists(decklists, bootstrap=BOOTSTRAP_RESAMPLES)
 
             # Caminho do Desktop do usuário
             desktop = Path.home() / "Desktop"
@@ -112,8 +281,8 @@ class PokemonAnalisysApp:
 
             print(f"✅ Relatório de análise do deck de {found} foi gerado com sucesso: {out_file}\n")
 
-def main():
-    PokemonAnalisysApp().run()
+def main(started_at: float | None = None):
+    PokemonAnalisysApp(started_at).run()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,8 @@
+import time
+
+_STARTED_AT = time.perf_counter()
+
 from main import main
 
 if __name__ == "__main__":
-    main()
+    main(_STARTED_AT)